@@ -0,0 +1,294 @@
+# Almacén columnar de recetas
+# Cada receta se guarda como arreglos tipados por columna: el texto (IDs,
+# descripciones, predecesores, recursos, componentes) se interna en un
+# vocabulario compartido por todo el almacén y se guarda como códigos enteros,
+# y las duraciones como float64. Los modelos escalados son vistas (receta base
+# + factor) en lugar de copias. Las recetas son inmutables: editar un modelo
+# reemplaza su receta por una nueva (copia al escribir), así que duplicar un
+# modelo o compartir la receta base no copia datos.
+#
+# El catálogo por defecto se arma una sola vez por proceso; cada sesión recibe
+# un almacén derivado que comparte sus recetas y su vocabulario, y sólo el
+# modelo que la sesión edita pasa a tener una receta propia.
+#
+# Un vocabulario sólo crece (los códigos nunca cambian), así que se acota: al
+# llegar a MAX_VALORES_VOCABULARIO quien lo comparte empieza una generación
+# nueva con un vocabulario vacío. Cada receta guarda el suyo, de modo que las
+# ya codificadas siguen valiendo y el vocabulario viejo se libera cuando ya
+# ninguna receta ni sesión lo usa.
+
+import hashlib
+import threading
+from collections.abc import MutableMapping
+
+import numpy as np
+import pandas as pd
+
+from config_modelos import FACTORES_ESCALA, FAMILIAS, RECETA_BASE
+
+COLUMNAS_NUMERICAS = ('Duracion_Min', 'Duracion_Opt', 'Duracion_Prob', 'Duracion_Pes', 'Duracion_Crash', 'Costo_Crash')
+COLUMNAS_BASE = ('ID', 'Actividad', 'Duracion_Min', 'Predecesores', 'Recurso', 'Componente')
+DECIMALES_ESCALA = 1
+# Valores distintos por vocabulario antes de empezar una generación nueva
+MAX_VALORES_VOCABULARIO = 100_000
+
+
+class Vocabulario:
+    """Texto internado: cada valor distinto recibe un código entero estable (-1 = vacío).
+
+    Sólo crece, así que varias sesiones pueden compartirlo: los valores nuevos
+    se agregan bajo un lock y los códigos existentes nunca cambian. Lleno (ver
+    MAX_VALORES_VOCABULARIO) se reemplaza por uno nuevo en lugar de compactarlo.
+    """
+
+    def __init__(self):
+        self._valores = []
+        self._codigo = {}
+        self._categorias = pd.Index([], dtype=object)
+        self._lock = threading.Lock()
+
+    def codificar(self, valores):
+        codigos = np.empty(len(valores), dtype=np.int32)
+        for k, valor in enumerate(valores):
+            if valor is None or valor is pd.NA or (isinstance(valor, float) and valor != valor):
+                codigos[k] = -1
+                continue
+            valor = str(valor)
+            codigo = self._codigo.get(valor)
+            if codigo is None:
+                codigo = self._agregar(valor)
+            codigos[k] = codigo
+        return codigos
+
+    def _agregar(self, valor):
+        with self._lock:
+            codigo = self._codigo.get(valor)
+            if codigo is None:
+                # El valor entra a la lista antes que su código, para quien lea sin el lock
+                self._valores.append(valor)
+                codigo = self._codigo[valor] = len(self._valores) - 1
+            return codigo
+
+    def categorias(self):
+        # El índice sólo se reconstruye cuando el vocabulario creció
+        if len(self._categorias) != len(self._valores):
+            self._categorias = pd.Index(self._valores, dtype=object)
+        return self._categorias
+
+    def __len__(self):
+        return len(self._valores)
+
+    def lleno(self):
+        return len(self._valores) >= MAX_VALORES_VOCABULARIO
+
+
+class RecetaColumnar:
+    """Receta inmutable: códigos de texto y duraciones en arreglos por columna"""
+
+    def __init__(self, vocabulario, codigos, numeros, columnas):
+        self.vocabulario = vocabulario
+        self.codigos = codigos    # {columna de texto: int32}
+        self.numeros = numeros    # {columna numérica: float64}
+        self.columnas = columnas  # orden de columnas de la tabla
+        self.n = len(next(iter(codigos.values()))) if codigos else 0
+        self._marco = None
+        self._huella = None
+        for arreglo in list(codigos.values()) + list(numeros.values()):
+            arreglo.flags.writeable = False
+
+    @classmethod
+    def desde_tabla(cls, vocabulario, receta):
+        """Codifica una lista de dicts o un DataFrame"""
+        if hasattr(receta, 'columns'):
+            columnas = [str(c) for c in receta.columns]
+            datos = {c: receta[c].tolist() for c in receta.columns}
+        else:
+            columnas = list(dict.fromkeys(k for actividad in receta for k in actividad)) or list(COLUMNAS_BASE)
+            datos = {c: [actividad.get(c) for actividad in receta] for c in columnas}
+        for c in COLUMNAS_BASE:
+            if c not in datos:
+                datos[c] = [None] * len(receta)
+                columnas.append(c)
+        codigos, numeros = {}, {}
+        for c in columnas:
+            if c in COLUMNAS_NUMERICAS:
+                numeros[c] = pd.to_numeric(pd.Series(datos[c], dtype=object), errors='coerce').to_numpy(np.float64)
+            else:
+                codigos[c] = vocabulario.codificar(datos[c])
+        return cls(vocabulario, codigos, numeros, columnas)
+
+    def columna(self, nombre):
+        """Arreglo de la columna: float64 para duraciones, Categorical para texto"""
+        if nombre in self.numeros:
+            return self.numeros[nombre]
+        return pd.Categorical.from_codes(self.codigos[nombre], self.vocabulario.categorias(), validate=False)
+
+    def marco(self):
+        """DataFrame armado sobre los arreglos, sin copiarlos"""
+        if self._marco is None:
+            self._marco = pd.DataFrame({c: self.columna(c) for c in self.columnas}, copy=False)
+        return self._marco
+
+    def huella(self):
+        """Hash del contenido como texto (independiente de los códigos internos)"""
+        if self._huella is None:
+            h = hashlib.blake2b(digest_size=16)
+            categorias = self.vocabulario._valores
+            for c in self.columnas:
+                h.update(c.encode('utf-8') + b'\x1e')
+                if c in self.numeros:
+                    h.update(np.ascontiguousarray(self.numeros[c]).tobytes())
+                else:
+                    h.update('\x1f'.join('' if k < 0 else categorias[k] for k in self.codigos[c]).encode('utf-8'))
+            self._huella = h.hexdigest()
+        return self._huella
+
+    def memoria(self):
+        """Bytes ocupados por los arreglos propios de la receta"""
+        return sum(a.nbytes for a in self.codigos.values()) + sum(a.nbytes for a in self.numeros.values())
+
+
+class VistaEscalada(RecetaColumnar):
+    """Receta base con las duraciones multiplicadas por un factor; comparte los códigos de la base.
+
+    Sólo se escalan las columnas Duracion_*; Costo_Crash (costo por minuto) y
+    las demás columnas numéricas son los mismos arreglos de la base.
+    """
+
+    def __init__(self, base, factor):
+        self.base = base
+        self.factor = factor
+        numeros = {c: np.round(v * factor, DECIMALES_ESCALA) if c.startswith('Duracion_') else v
+                   for c, v in base.numeros.items()}
+        super().__init__(base.vocabulario, base.codigos, numeros, base.columnas)
+
+    def memoria(self):
+        return sum(a.nbytes for c, a in self.numeros.items() if a is not self.base.numeros.get(c))
+
+
+class AlmacenRecetas(MutableMapping):
+    """Mapeo modelo -> receta que entrega DataFrames sin copia de los datos.
+
+    Asignar una lista de dicts o un DataFrame la codifica en el vocabulario
+    compartido; la receta anterior no se modifica. Con un origen (p. ej. el
+    repositorio SQLite) los modelos pendientes se piden al primer acceso con
+    origen.receta_compartida(modelo, huella).
+    """
+
+    def __init__(self, vocabulario=None, origen=None):
+        self.vocabulario = Vocabulario() if vocabulario is None else vocabulario
+        self.origen = origen
+        self._recetas = {}     # modelo -> RecetaColumnar (None = pendiente de cargar)
+        self._pendientes = {}  # modelo -> huella conocida sin cargar la receta
+
+    def registrar_pendientes(self, huellas):
+        """Declara modelos que existen en el origen; {modelo: huella}"""
+        for modelo, huella_modelo in huellas.items():
+            if self._recetas.get(modelo) is None:
+                self._recetas[modelo] = None
+                self._pendientes[modelo] = huella_modelo
+
+    def _cargada(self, modelo):
+        receta = self._recetas[modelo]
+        if receta is None:
+            receta = self._recetas[modelo] = self.origen.receta_compartida(modelo, self._pendientes.pop(modelo, None))
+        return receta
+
+    def derivar(self):
+        """Almacén nuevo con los mismos modelos, recetas y vocabulario; editarlo no modifica éste"""
+        derivado = AlmacenRecetas(self.vocabulario, self.origen)
+        derivado._recetas = dict(self._recetas)
+        derivado._pendientes = dict(self._pendientes)
+        return derivado
+
+    def cargados(self):
+        """Modelos con la receta ya en memoria"""
+        return [m for m, r in self._recetas.items() if r is not None]
+
+    def __getitem__(self, modelo):
+        # Copia superficial: comparte los arreglos y pandas copia sólo si se escribe sobre ella
+        return self._cargada(modelo).marco().copy(deep=False)
+
+    def __setitem__(self, modelo, receta):
+        if not isinstance(receta, RecetaColumnar):
+            receta = self.codificar(receta)
+        self._recetas[modelo] = receta
+        self._pendientes.pop(modelo, None)
+
+    def __delitem__(self, modelo):
+        del self._recetas[modelo]
+        self._pendientes.pop(modelo, None)
+
+    def __iter__(self):
+        return iter(self._recetas)
+
+    def __len__(self):
+        return len(self._recetas)
+
+    def receta(self, modelo):
+        """RecetaColumnar del modelo (para consultas por columna sin armar el DataFrame)"""
+        return self._cargada(modelo)
+
+    def codificar(self, receta):
+        """RecetaColumnar en el vocabulario del almacén, sin registrarla como modelo"""
+        if self.vocabulario.lleno():
+            # Generación nueva; las recetas ya codificadas conservan su vocabulario
+            self.vocabulario = Vocabulario() if self.origen is None else self.origen.vocabulario_vigente()
+        return RecetaColumnar.desde_tabla(self.vocabulario, receta)
+
+    def agregar_escalado(self, modelo, base, factor):
+        """Registra el modelo como vista de base (nombre de modelo o RecetaColumnar) escalada por factor"""
+        receta_base = base if isinstance(base, RecetaColumnar) else self._cargada(base)
+        while isinstance(receta_base, VistaEscalada):
+            factor *= receta_base.factor
+            receta_base = receta_base.base
+        self._recetas[modelo] = receta_base if factor == 1 else VistaEscalada(receta_base, factor)
+
+    def duplicar(self, origen, nuevo):
+        """El nuevo modelo comparte la receta del origen hasta que se edite"""
+        self._recetas[nuevo] = self._cargada(origen)
+        self._pendientes.pop(nuevo, None)
+
+    def editable(self, modelo):
+        """Copia del modelo con columnas de texto planas, para el editor de tablas"""
+        marco = self[modelo].copy()
+        for c in marco.columns:
+            if c not in COLUMNAS_NUMERICAS:
+                marco[c] = marco[c].astype(object).where(marco[c].notna(), None)
+        return marco
+
+    def huella_contenido(self):
+        """Huella por modelo (cacheada en cada receta inmutable)"""
+        return {modelo: self._pendientes[modelo] if receta is None else receta.huella()
+                for modelo, receta in self._recetas.items()}
+
+    def memoria(self):
+        """Bytes de arreglos del almacén, contando una sola vez las recetas compartidas"""
+        vistas = {id(r): r for r in self._recetas.values() if r is not None}
+        return sum(r.memoria() for r in vistas.values())
+
+
+def catalogo_default(familias=FAMILIAS, factores=FACTORES_ESCALA, receta_base=RECETA_BASE):
+    """Almacén con la receta base y una vista escalada por modelo configurado"""
+    recetas = AlmacenRecetas()
+    base = recetas.codificar(receta_base)
+    for modelos in familias.values():
+        for modelo in modelos:
+            recetas.agregar_escalado(modelo, base, factores.get(modelo, 1.0))
+    return recetas
+
+
+_catalogo_compartido = None
+_lock_global = threading.Lock()
+
+
+def catalogo_compartido():
+    """Catálogo por defecto armado una vez por proceso; cada sesión debe usar catalogo_compartido().derivar().
+
+    Se rearma con un vocabulario nuevo cuando las sesiones llenaron el actual.
+    """
+    global _catalogo_compartido
+    with _lock_global:
+        if _catalogo_compartido is None or _catalogo_compartido.vocabulario.lleno():
+            _catalogo_compartido = catalogo_default()
+        return _catalogo_compartido
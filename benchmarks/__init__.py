@@ -0,0 +1 @@
+# Benchmarks de los motores de cálculo (ejecutables sin Streamlit)
@@ -0,0 +1,127 @@
+# Benchmark de arranque de la app
+# Cada repetición corre en un proceso nuevo (como un contenedor recién creado):
+# mide la importación de Streamlit, la primera corrida de pert_app.py (importa
+# sus módulos y pinta la primera página), una sesión nueva con el proceso ya
+# caliente y la memoria que agrega cada sesión. Compara contra presupuestos.
+#
+# Uso:
+#   python -m benchmarks.bench_arranque
+#   python -m benchmarks.bench_arranque --sin-db --repeticiones 5 --json historial_arranque.json
+#
+# Termina con código 1 si alguna medida supera su presupuesto o si la primera
+# página cargó un módulo que debía importarse recién al usarlo.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Presupuestos (mediana) por medida; None = sólo informativo
+PRESUPUESTOS = {
+    'importar_streamlit_s': None,
+    'primera_corrida_s': 3.0,
+    'sesion_caliente_s': 1.5,
+    'memoria_sesion_mb': 4.0,
+    'rss_max_mb': 300.0,
+}
+# Módulos que la primera página no debe importar (se cargan al usar su función)
+MODULOS_DIFERIDOS = ('importacion', 'simulacion_pert', 'openpyxl')
+SESIONES_MEMORIA = 3
+
+_SCRIPT = """
+import gc, json, resource, sys, time, tracemalloc
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+importar = time.perf_counter() - inicio
+
+def sesion():
+    at = AppTest.from_file(sys.argv[1], default_timeout=300)
+    at.run()
+    if at.exception:
+        raise SystemExit(f"Excepción en la app: {at.exception[0].value}")
+    return at
+
+inicio = time.perf_counter()
+sesion()
+primera = time.perf_counter() - inicio
+diferidos = [m for m in sys.argv[3].split(',') if m in sys.modules]
+inicio = time.perf_counter()
+sesion()
+caliente = time.perf_counter() - inicio
+
+gc.collect()
+tracemalloc.start()
+antes = tracemalloc.get_traced_memory()[0]
+vivas = [sesion() for _ in range(int(sys.argv[2]))]
+gc.collect()
+por_sesion = (tracemalloc.get_traced_memory()[0] - antes) / len(vivas)
+tracemalloc.stop()
+
+print(json.dumps({'importar_streamlit_s': importar, 'primera_corrida_s': primera, 'sesion_caliente_s': caliente,
+                  'memoria_sesion_mb': por_sesion / 2**20,
+                  'rss_max_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  'diferidos_cargados': diferidos}))
+"""
+
+
+def medir_proceso(sin_db, sesiones=SESIONES_MEMORIA):
+    """Medidas de un proceso nuevo; con base SQLite temporal salvo sin_db"""
+    with tempfile.TemporaryDirectory() as directorio:
+        entorno = dict(os.environ, PERT_PROCESOS='0', PYTHONPATH=RAIZ,
+                       PERT_DB='' if sin_db else os.path.join(directorio, 'arranque.db'))
+        entorno.pop('PERT_PERFIL', None)
+        salida = subprocess.run(
+            [sys.executable, '-c', _SCRIPT, os.path.join(RAIZ, 'pert_app.py'), str(sesiones),
+             ','.join(MODULOS_DIFERIDOS)],
+            env=entorno, cwd=directorio, capture_output=True, text=True, check=False)
+    if salida.returncode != 0:
+        raise RuntimeError(salida.stderr.strip().splitlines()[-1] if salida.stderr.strip() else "sin salida")
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de arranque y memoria por sesión de la app")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Procesos nuevos a medir")
+    parser.add_argument('--sin-db', action='store_true', help="Sin persistencia (PERT_DB vacío)")
+    parser.add_argument('--json', help="Agrega los resultados a este archivo JSON (historial)")
+    args = parser.parse_args(argv)
+
+    corridas = [medir_proceso(args.sin_db) for _ in range(args.repeticiones)]
+    resultados = []
+    print(f"{'Medida':<24}{'Mediana':>10}{'Mín':>10}{'Presupuesto':>13}  Estado")
+    for medida, presupuesto in PRESUPUESTOS.items():
+        valores = [c[medida] for c in corridas]
+        mediana = statistics.median(valores)
+        estado = "—" if presupuesto is None else ("OK" if mediana <= presupuesto else "REGRESIÓN")
+        resultados.append({'medida': medida, 'mediana': mediana, 'min': min(valores), 'presupuesto': presupuesto,
+                           'estado': estado})
+        presupuesto_txt = "-" if presupuesto is None else f"{presupuesto:.2f}"
+        print(f"{medida:<24}{mediana:>10.2f}{min(valores):>10.2f}{presupuesto_txt:>13}  {estado}")
+
+    cargados = sorted({m for c in corridas for m in c['diferidos_cargados']})
+    estado = "REGRESIÓN" if cargados else "OK"
+    resultados.append({'medida': 'modulos_diferidos', 'cargados': cargados, 'estado': estado})
+    print(f"{'modulos_diferidos':<24}{', '.join(cargados) or 'ninguno cargado':>33}  {estado}")
+
+    if args.json:
+        try:
+            with open(args.json, encoding='utf-8') as f:
+                historial = json.load(f)
+        except (OSError, ValueError):
+            historial = []
+        historial.append({'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'), 'sin_db': args.sin_db,
+                          'resultados': resultados})
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(historial, f, indent=2, ensure_ascii=False)
+
+    return 1 if any(r['estado'] == "REGRESIÓN" for r in resultados) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
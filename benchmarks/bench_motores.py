@@ -0,0 +1,222 @@
+# Benchmarks de las rutas críticas de cálculo
+# Mide tiempo (mediana y mínimo de varias repeticiones) y memoria pico
+# (tracemalloc) por etapa, y compara contra umbrales de regresión.
+#
+# Uso:
+#   python -m benchmarks.bench_motores                  # escala completa
+#   python -m benchmarks.bench_motores --escala rapida  # tamaños reducidos
+#   python -m benchmarks.bench_motores --filtro cpm --json resultados.json
+#
+# Termina con código 1 si alguna etapa supera su umbral.
+
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+import networkx as nx
+import numpy as np
+
+from benchmarks.generadores import bom_sintetica, catalogo, plan_sintetico, receta_aleatoria
+from bom import compilar_bom, explotar_bom
+from carga_recursos import carga_por_semana, matriz_modelo_recurso, tabla_carga
+from config_modelos import RECETA_BASE
+from cpm_incremental import CPMIncremental
+from crashing import curva_crashing, limites_crash, sensibilidad_modelos
+from heijunka import secuencia_heijunka
+from horizonte import etiquetas_periodos, tabla_por_bloques, ventana
+from optimizador_capacidad import optimizar_capacidad
+from perfil_carga import cronograma_unidades, perfiles_carga
+from motor_cpm import calcular_cpm, calcular_cpm_lote, compilar_receta, cpm_modelos, separar_predecesores
+from rcpsp import programar_rcpsp
+from simulacion_pert import simular_pert
+from simulacion_planta import Turno, secuencia_plan, simular_planta
+
+ESCALAS = {
+    'rapida': dict(actividades=1000, escenarios=200, modelos=20, semanas=12, unidades_semana=200,
+                   iteraciones_mc=20_000, semanas_sim=4, unidades_rcpsp=40, partes_bom=500,
+                   dias_horizonte=120),
+    'completa': dict(actividades=10_000, escenarios=1000, modelos=200, semanas=52, unidades_semana=1000,
+                     iteraciones_mc=100_000, semanas_sim=13, unidades_rcpsp=200, partes_bom=5000,
+                     dias_horizonte=365),
+}
+
+# Segundos (mediana) máximos por etapa y escala; None = sólo informativo
+UMBRALES = {
+    'rapida': {
+        'compilar_receta': 0.1, 'cpm': 0.02, 'cpm_lote': 0.2, 'cpm_modelos': 0.05, 'cpm_incremental': 0.01,
+        'crashing': 0.5, 'sensibilidad': 0.1, 'carga_semanas': 0.05, 'carga_ventana': 0.02, 'optimizador_capacidad': 0.05, 'perfil_carga': 0.1, 'explosion_bom': 0.05, 'heijunka': 0.05, 'montecarlo': 0.5, 'simulacion_planta': 0.2, 'rcpsp': 0.5,
+    },
+    'completa': {
+        'compilar_receta': 1.0, 'cpm': 0.1, 'cpm_lote': 0.5, 'cpm_modelos': 0.1, 'cpm_incremental': 0.01,
+        'crashing': 1.0, 'sensibilidad': 0.5, 'carga_semanas': 0.2, 'carga_ventana': 0.05, 'optimizador_capacidad': 0.2, 'perfil_carga': 0.5, 'explosion_bom': 0.2, 'heijunka': 0.3, 'montecarlo': 2.0, 'simulacion_planta': 0.5, 'rcpsp': 3.0,
+    },
+}
+
+
+def _cpm_networkx_legado(receta):
+    """CPM con networkx y diccionarios por nodo, como lo hacía la pestaña PERT originalmente"""
+    G = nx.DiGraph()
+    for a in receta:
+        G.add_node(a['ID'], duration=a['Duracion_Min'])
+    for a in receta:
+        for p in separar_predecesores(a['Predecesores']):
+            if p in G.nodes:
+                G.add_edge(p, a['ID'])
+    ES, EF = {}, {}
+    for n in nx.topological_sort(G):
+        preds = list(G.predecessors(n))
+        ES[n] = max([EF[p] for p in preds]) if preds else 0
+        EF[n] = ES[n] + G.nodes[n]['duration']
+    total = max(EF.values())
+    LS, LF = {}, {}
+    for n in reversed(list(nx.topological_sort(G))):
+        succs = list(G.successors(n))
+        LF[n] = min([LS[s] for s in succs]) if succs else total
+        LS[n] = LF[n] - G.nodes[n]['duration']
+    return total
+
+
+def _carga_legado(plan, recetas, semana):
+    carga_total = {}
+    for _, row in plan.iterrows():
+        if row[semana] > 0 and row['Modelo'] in recetas:
+            for actividad in recetas[row['Modelo']]:
+                carga_total[actividad['Recurso']] = (carga_total.get(actividad['Recurso'], 0)
+                                                     + actividad['Duracion_Min'] * row[semana])
+    return carga_total
+
+
+def _heijunka_legado(demanda):
+    demanda = dict(demanda)
+    secuencia = []
+    while sum(demanda.values()) > 0:
+        for modelo, cant in demanda.items():
+            if cant > 0:
+                secuencia.append(modelo)
+                demanda[modelo] -= 1
+    return secuencia
+
+
+def preparar_etapas(p):
+    """Lista de (nombre, función sin argumentos) con los datos ya generados"""
+    receta = receta_aleatoria(p['actividades'], semilla=1)
+    red = compilar_receta(receta)
+    receta_lote = receta_aleatoria(1000, semilla=2)
+    red_lote = compilar_receta(receta_lote)
+    _, minima_lote, costo_lote = limites_crash(receta_lote)
+    recetas_sensibilidad = catalogo(max(p['modelos'] // 10, 1), receta_lote)
+    escenarios = red_lote.duraciones * (0.8 + 0.4 * np.random.default_rng(0).random((p['escenarios'], red_lote.n)))
+    recetas = catalogo(p['modelos'])
+    plan = plan_sintetico(recetas, p['semanas'], p['unidades_semana'])
+    matriz = matriz_modelo_recurso(recetas)
+    tabla_bom = bom_sintetica(recetas, partes=p['partes_bom'])
+    contenido = {m: matriz.minutos[i] for i, m in enumerate(matriz.modelos)}
+    demanda = dict(zip(plan['Modelo'], plan['Sem1']))
+    carga = carga_por_semana(plan, recetas, matriz=matriz)
+    cronograma = cronograma_unidades(recetas, *secuencia_plan(plan, recetas, Turno(5, 8.55, 3), ['Sem1'], contenido))
+    incremental = CPMIncremental(receta)
+    medio = receta[len(receta) // 2]['ID']
+    turno = Turno(5, 8.55, 3)
+    recetas_sim = catalogo(7)
+    plan_sim = plan_sintetico(recetas_sim, p['semanas_sim'], 20)
+    secuencia_sim, liberaciones_sim = secuencia_plan(plan_sim, recetas_sim, turno)
+    secuencia_rcpsp = secuencia_heijunka({m: p['unidades_rcpsp'] // 7 for m in recetas_sim})
+    cambio = [0.0]
+
+    # Horizonte diario largo con memoización por bloque, como en la app
+    plan_diario = plan_sintetico(recetas, p['dias_horizonte'], p['unidades_semana'] // 5)
+    plan_diario.columns = ['Modelo'] + etiquetas_periodos(date(2026, 1, 1), p['dias_horizonte'], 'dia')
+    visibles = ventana(list(plan_diario.columns[1:]), p['dias_horizonte'] // 2, 14)
+    memo = {}
+
+    def calcular(espacio, clave, funcion, *args):
+        if (espacio, clave) not in memo:
+            memo[espacio, clave] = funcion(*args)
+        return memo[espacio, clave]
+
+    def editar_ventana():
+        plan_diario.loc[0, visibles[0]] += 1
+        return tabla_por_bloques(calcular, 'carga', 513, plan_diario, visibles, tabla_carga, None, 513, None, matriz)
+
+    def editar():
+        cambio[0] = 1.0 - cambio[0]
+        incremental.actualizar_duracion(medio, 100.0 + cambio[0])
+
+    return [
+        ('cpm_networkx_legado', lambda: _cpm_networkx_legado(receta)),
+        ('compilar_receta', lambda: compilar_receta(receta)),
+        ('cpm', lambda: calcular_cpm(red)),
+        ('cpm_lote', lambda: calcular_cpm_lote(red_lote, escenarios)),
+        ('cpm_modelos', lambda: cpm_modelos(recetas)),
+        ('cpm_incremental', editar),
+        ('crashing', lambda: curva_crashing(receta_lote, minima_lote, costo_lote, max_pasos=20)),
+        ('sensibilidad', lambda: sensibilidad_modelos(recetas_sensibilidad)),
+        ('carga_legado_1_semana', lambda: _carga_legado(plan, recetas, 'Sem1')),
+        ('carga_semanas', lambda: tabla_carga(plan, recetas, 2565)),
+        ('carga_ventana', editar_ventana),
+        ('optimizador_capacidad', lambda: optimizar_capacidad(*carga, maquinas_max=20)),
+        ('perfil_carga', lambda: perfiles_carga(cronograma, nivelado=True)),
+        ('explosion_bom', lambda: explotar_bom(compilar_bom(tabla_bom), plan)),
+        ('heijunka_legado', lambda: _heijunka_legado(demanda)),
+        ('heijunka', lambda: secuencia_heijunka(demanda, contenido)),
+        ('montecarlo', lambda: simular_pert(RECETA_BASE, p['iteraciones_mc'], variabilidad=0.2, semilla=0, procesos=1)),
+        ('simulacion_planta', lambda: simular_planta(recetas_sim, secuencia_sim, turno, None, liberaciones_sim)),
+        ('rcpsp', lambda: programar_rcpsp(recetas_sim, secuencia_rcpsp, {'Plegadora': 2, 'Soldadura': 2})),
+    ]
+
+
+def medir(funcion, repeticiones):
+    """(mediana_s, minimo_s, pico_MB)"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(tiempos), min(tiempos), pico / 2**20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de CPM, carga y secuenciación")
+    parser.add_argument('--escala', choices=list(ESCALAS), default='completa')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--filtro', default='', help="Sólo etapas cuyo nombre contenga este texto")
+    parser.add_argument('--json', help="Agrega los resultados a este archivo JSON (historial)")
+    args = parser.parse_args(argv)
+
+    umbrales = UMBRALES[args.escala]
+    etapas = [(n, f) for n, f in preparar_etapas(ESCALAS[args.escala]) if args.filtro in n]
+    resultados = []
+    print(f"{'Etapa':<24}{'Mediana (s)':>13}{'Mín (s)':>11}{'Pico (MB)':>11}{'Umbral (s)':>12}  Estado")
+    for nombre, funcion in etapas:
+        mediana, minimo, pico = medir(funcion, args.repeticiones)
+        umbral = umbrales.get(nombre)
+        estado = "—" if umbral is None else ("OK" if mediana <= umbral else "REGRESIÓN")
+        resultados.append({'etapa': nombre, 'mediana_s': mediana, 'min_s': minimo, 'pico_mb': pico,
+                           'umbral_s': umbral, 'estado': estado})
+        umbral_txt = "-" if umbral is None else f"{umbral:.3f}"
+        print(f"{nombre:<24}{mediana:>13.4f}{minimo:>11.4f}{pico:>11.1f}{umbral_txt:>12}  {estado}")
+
+    if args.json:
+        try:
+            with open(args.json, encoding='utf-8') as f:
+                historial = json.load(f)
+        except (OSError, ValueError):
+            historial = []
+        historial.append({'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'), 'escala': args.escala,
+                          'resultados': resultados})
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(historial, f, indent=2, ensure_ascii=False)
+
+    return 1 if any(r['estado'] == "REGRESIÓN" for r in resultados) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
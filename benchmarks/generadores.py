@@ -0,0 +1,71 @@
+# Generadores de datos sintéticos para los benchmarks
+# Recetas escaladas desde RECETA_BASE, DAGs aleatorios de miles de actividades
+# y planes de producción multi-semana.
+
+import numpy as np
+import pandas as pd
+
+from config_modelos import FACTORES_ESCALA, RECETA_BASE
+
+RECURSOS = list(dict.fromkeys(a['Recurso'] for a in RECETA_BASE))
+COMPONENTES = list(dict.fromkeys(a['Componente'] for a in RECETA_BASE))
+
+
+def receta_escalada(factor, receta=RECETA_BASE):
+    """Copia de la receta con duraciones multiplicadas por factor"""
+    return [dict(a, Duracion_Min=round(a['Duracion_Min'] * factor, 1)) for a in receta]
+
+
+def receta_aleatoria(n, semilla=0, ventana=30, max_predecesores=3):
+    """DAG aleatorio de n actividades; cada una depende de hasta max_predecesores de las ventana anteriores"""
+    rng = np.random.default_rng(semilla)
+    ids = [f"T{i:05d}" for i in range(n)]
+    duraciones = np.round(rng.uniform(5, 500, n), 1)
+    recursos = rng.integers(0, len(RECURSOS), n)
+    componentes = rng.integers(0, len(COMPONENTES), n)
+    receta = []
+    for i in range(n):
+        k = int(rng.integers(0, max_predecesores + 1)) if i else 0
+        preds = rng.choice(np.arange(max(0, i - ventana), i), size=min(k, i), replace=False) if k else []
+        receta.append({
+            'ID': ids[i],
+            'Actividad': f"Operación {i}",
+            'Duracion_Min': float(duraciones[i]),
+            'Predecesores': ",".join(ids[p] for p in sorted(preds)),
+            'Recurso': RECURSOS[recursos[i]],
+            'Componente': COMPONENTES[componentes[i]],
+        })
+    return receta
+
+
+def catalogo(n_modelos, receta=RECETA_BASE, semilla=0):
+    """Recetas de n_modelos modelos que comparten topología y difieren en el factor de escala"""
+    rng = np.random.default_rng(semilla)
+    factores = list(FACTORES_ESCALA.values())
+    return {f"M{i:03d}": receta_escalada(factores[i] if i < len(factores) else float(rng.uniform(1, 4)), receta)
+            for i in range(n_modelos)}
+
+
+def plan_sintetico(modelos, semanas=52, unidades_semana=1000, semilla=0):
+    """Plan (Modelo, Sem1..SemN) con unidades_semana unidades repartidas al azar por semana"""
+    rng = np.random.default_rng(semilla)
+    modelos = list(modelos)
+    mezcla = rng.dirichlet(np.ones(len(modelos)), size=semanas)
+    demanda = np.stack([rng.multinomial(unidades_semana, p) for p in mezcla], axis=1)
+    plan = pd.DataFrame(demanda, columns=[f"Sem{k + 1}" for k in range(semanas)])
+    plan.insert(0, 'Modelo', modelos)
+    return plan
+
+
+def bom_sintetica(modelos, partes=3000, por_modelo=20, por_parte=3, semilla=0):
+    """Tabla BOM multinivel: cada modelo lleva por_modelo partes y cada parte por_parte subpartes de índice mayor"""
+    rng = np.random.default_rng(semilla)
+    nombres = [f"P{i:05d}" for i in range(partes)]
+    primer_nivel = max(partes // 6, por_modelo)
+    filas = [(m, nombres[j], float(rng.integers(1, 4)), int(rng.integers(0, 2)))
+             for m in modelos for j in rng.choice(primer_nivel, por_modelo, replace=False)]
+    for i in range(partes - por_parte):
+        for j in rng.choice(np.arange(max(i + 1, primer_nivel), partes), min(por_parte, partes - max(i + 1, primer_nivel)),
+                            replace=False):
+            filas.append((nombres[i], nombres[j], float(rng.integers(1, 3)), int(rng.integers(0, 2))))
+    return pd.DataFrame(filas, columns=['Padre', 'Componente', 'Cantidad', 'Desfase_Semanas'])
@@ -0,0 +1,217 @@
+# Lista de materiales (BOM) y explosión de requerimientos por semana
+# Cada renglón de la BOM dice cuántas unidades de un componente lleva una unidad
+# del padre (modelo o subensamble) y con cuántas semanas de anticipación se
+# necesita (desfase). Los artículos se ordenan por código de nivel bajo (el
+# nivel más profundo en que aparece cada uno), así que al explotar un nivel sus
+# artículos ya tienen todo su requerimiento bruto. Cada nivel se explota con un
+# producto disperso en formato COO: los renglones (padre, hijo, cantidad,
+# desfase) se expanden sobre las semanas y se acumulan con bincount.
+
+import numpy as np
+import pandas as pd
+
+from carga_recursos import columnas_semana
+from motor_cpm import CicloError, leer_columna, valor_numerico
+
+COLUMNAS_BOM = ['Padre', 'Componente', 'Cantidad', 'Desfase_Semanas']
+# Componente de las recetas que representa al equipo terminado (no es una parte a comprar)
+COMPONENTE_FINAL = 'Equipo Completo'
+
+
+def bom_desde_recetas(recetas):
+    """BOM de un nivel: cada modelo lleva una unidad de cada componente distinto de su receta.
+
+    Un componente con varias operaciones (corte, plegado, soldadura) cuenta una
+    sola vez por equipo; el equipo terminado no se lista como componente.
+    """
+    filas = []
+    for modelo, receta in recetas.items():
+        for componente in dict.fromkeys(leer_columna(receta, 'Componente')):
+            if pd.notna(componente) and componente not in ('', COMPONENTE_FINAL):
+                filas.append((modelo, componente, 1.0, 0))
+    return pd.DataFrame(filas, columns=COLUMNAS_BOM)
+
+
+def completar_bom(tabla, defecto):
+    """Agrega los renglones de la BOM por defecto de los padres que no tienen renglones propios en la tabla"""
+    faltantes = defecto[~defecto['Padre'].isin(tabla['Padre'])]
+    if faltantes.empty:
+        return tabla
+    if tabla.empty:
+        return faltantes.reset_index(drop=True)
+    return pd.concat([tabla, faltantes], ignore_index=True)
+
+
+class ListaMateriales:
+    """BOM compilada: artículos con su nivel y renglones en arreglos ordenados por nivel del padre"""
+
+    def __init__(self, articulos, nivel, padre, hijo, cantidad, desfase):
+        self.articulos = articulos
+        self.indice = {a: i for i, a in enumerate(articulos)}
+        self.nivel = nivel            # código de nivel bajo de cada artículo
+        self.padre = padre
+        self.hijo = hijo
+        self.cantidad = cantidad
+        self.desfase = desfase        # semanas de anticipación del hijo respecto al padre
+        # Anticipación acumulada máxima de cada artículo respecto a su modelo
+        self.anticipacion = np.zeros(len(articulos), dtype=np.int64)
+        for a, b in self.bloques():
+            np.maximum.at(self.anticipacion, hijo[a:b], self.anticipacion[padre[a:b]] + desfase[a:b])
+
+    @property
+    def niveles(self):
+        return int(self.nivel.max()) + 1 if len(self.articulos) else 0
+
+    def bloques(self):
+        """Rangos [a, b) de renglones cuyo padre está en el mismo nivel, de arriba hacia abajo"""
+        limites = np.searchsorted(self.nivel[self.padre], np.arange(self.niveles + 1))
+        return [(limites[k], limites[k + 1]) for k in range(self.niveles) if limites[k] < limites[k + 1]]
+
+    def donde_se_usa(self):
+        """Padres directos de cada artículo"""
+        padres = {}
+        for p, h in zip(self.padre, self.hijo):
+            padres.setdefault(self.articulos[h], {})[self.articulos[p]] = None
+        return {a: list(p) for a, p in padres.items()}
+
+
+def compilar_bom(tabla):
+    """ListaMateriales de una tabla Padre / Componente / Cantidad / Desfase_Semanas.
+
+    Renglones repetidos del mismo padre y componente se suman. Lanza
+    CicloError si un artículo termina siendo su propio subcomponente.
+    """
+    padres = [str(p) for p in leer_columna(tabla, 'Padre')]
+    hijos = [str(h) for h in leer_columna(tabla, 'Componente')]
+    cantidades = np.nan_to_num(np.array([valor_numerico(c) for c in leer_columna(tabla, 'Cantidad')], dtype=np.float64))
+    desfases = (np.array([valor_numerico(d) for d in leer_columna(tabla, 'Desfase_Semanas')], dtype=np.float64)
+                if 'Desfase_Semanas' in tabla else np.zeros(len(padres)))
+    desfases = np.maximum(np.nan_to_num(desfases), 0).astype(np.int64)
+
+    articulos = {}
+    padre = np.array([articulos.setdefault(p, len(articulos)) for p in padres], dtype=np.int64)
+    hijo = np.array([articulos.setdefault(h, len(articulos)) for h in hijos], dtype=np.int64)
+    n = len(articulos)
+
+    # Código de nivel bajo por Kahn: un artículo baja de nivel cada vez que aparece bajo un padre más profundo
+    nivel = np.zeros(n, dtype=np.int64)
+    entrantes = np.bincount(hijo, minlength=n)
+    orden_padre = np.argsort(padre, kind='stable')
+    ptr = np.searchsorted(padre[orden_padre], np.arange(n + 1))
+    pendientes = list(np.flatnonzero(entrantes == 0))
+    vistos = 0
+    while pendientes:
+        actual = pendientes.pop()
+        vistos += 1
+        for e in orden_padre[ptr[actual]:ptr[actual + 1]]:
+            h = hijo[e]
+            nivel[h] = max(nivel[h], nivel[actual] + 1)
+            entrantes[h] -= 1
+            if entrantes[h] == 0:
+                pendientes.append(h)
+    if vistos < n:
+        nombres = list(articulos)
+        raise CicloError([nombres[i] for i in np.flatnonzero(entrantes > 0)])
+
+    orden = np.lexsort((hijo, nivel[padre]))
+    return ListaMateriales(list(articulos), nivel, padre[orden], hijo[orden], cantidades[orden], desfases[orden])
+
+
+class ExplosionBOM:
+    """Requerimiento bruto de cada artículo por semana (artículos x semanas)"""
+
+    def __init__(self, lista, semanas, requerido, atrasado):
+        self.lista = lista
+        self.semanas = semanas
+        self.requerido = requerido
+        self.atrasado = atrasado      # unidades que debían estar antes de la primera semana del plan
+
+    def _columnas(self, semanas):
+        if semanas is None:
+            return np.arange(len(self.semanas))
+        posicion = {s: k for k, s in enumerate(self.semanas)}
+        return np.array([posicion[s] for s in semanas if s in posicion], dtype=np.int64)
+
+    def tabla(self, solo_componentes=True, semanas=None):
+        """Tabla larga Articulo / Nivel / Semana / Requerido con las celdas no nulas.
+
+        Lo atrasado aparece primero, con Semana = 'Atrasado'. semanas limita
+        la tabla a esos períodos (p. ej. la ventana visible).
+        """
+        lista = self.lista
+        filas = lista.nivel > 0 if solo_componentes else np.ones(len(lista.articulos), dtype=bool)
+        columnas = self._columnas(semanas)
+        previos = np.flatnonzero((self.atrasado > 0) & filas)
+        articulos, semanas = np.nonzero(self.requerido[:, columnas] * filas[:, None])
+        semanas = columnas[semanas]
+        nombres = np.asarray(lista.articulos, dtype=object)
+        return pd.DataFrame({
+            'Articulo': np.concatenate([nombres[previos], nombres[articulos]]),
+            'Nivel': np.concatenate([lista.nivel[previos], lista.nivel[articulos]]),
+            'Semana': np.concatenate([np.full(len(previos), 'Atrasado', dtype=object),
+                                      np.asarray(self.semanas, dtype=object)[semanas]]),
+            'Requerido': np.concatenate([self.atrasado[previos], self.requerido[articulos, semanas]]),
+        })
+
+    def resumen(self, solo_componentes=True, semanas=None):
+        """Una fila por artículo: Articulo / Nivel / Total / Atrasado / Usado_En y una columna por semana"""
+        lista = self.lista
+        filas = np.flatnonzero(lista.nivel > 0) if solo_componentes else np.arange(len(lista.articulos))
+        columnas = self._columnas(semanas)
+        requerido = self.requerido[np.ix_(filas, columnas)]
+        usos = lista.donde_se_usa()
+        resumen = pd.DataFrame({
+            'Articulo': [lista.articulos[i] for i in filas],
+            'Nivel': lista.nivel[filas],
+            'Total': requerido.sum(axis=1) + self.atrasado[filas],
+            'Atrasado': self.atrasado[filas],
+            'Usado_En': [', '.join(usos.get(lista.articulos[i], [])) for i in filas],
+        })
+        semanal = pd.DataFrame(requerido, columns=[self.semanas[k] for k in columnas])
+        return pd.concat([resumen, semanal], axis=1).sort_values(['Nivel', 'Articulo'], ignore_index=True)
+
+
+def explotar_bom(lista, plan, semanas=None):
+    """Explota la demanda del plan (modelos x semanas) por todos los niveles de la BOM.
+
+    El requerimiento de un hijo en la semana t - desfase suma cantidad x
+    requerimiento del padre en la semana t. Lo que cae antes de la primera
+    semana se acumula como atrasado.
+    """
+    semanas = columnas_semana(plan) if semanas is None else list(semanas)
+    n, m = len(lista.articulos), len(semanas)
+    margen = int(lista.anticipacion.max()) if n else 0
+    columnas = margen + m
+    requerido = np.zeros((n, columnas))
+
+    filas = plan['Modelo'].astype(str).map(lista.indice)
+    presentes = filas.notna().to_numpy()
+    np.add.at(requerido, (filas[presentes].to_numpy(dtype=np.int64), slice(margen, None)),
+              plan.loc[presentes, semanas].to_numpy(dtype=np.float64, na_value=0.0))
+
+    t = np.arange(columnas)
+    for a, b in lista.bloques():
+        padre, hijo = lista.padre[a:b], lista.hijo[a:b]
+        destino = t[None, :] - lista.desfase[a:b, None]
+        validos = destino >= 0
+        aporte = lista.cantidad[a:b, None] * requerido[padre]
+        indices = (hijo[:, None] * columnas + destino)[validos]
+        requerido += np.bincount(indices, weights=aporte[validos], minlength=n * columnas).reshape(n, columnas)
+    return ExplosionBOM(lista, semanas, requerido[:, margen:], requerido[:, :margen].sum(axis=1))
+
+
+def explosion_plan(tabla_bom, plan, recetas=None, semanas=None, hasta=None):
+    """Compila la BOM (completada con la de las recetas si se pasan) y explota el plan.
+
+    Con hasta (un período del plan) sólo se explotan los períodos desde el
+    inicio hasta ése más la anticipación máxima de la BOM: lo necesario para
+    que los requerimientos hasta ese período estén completos.
+    """
+    if recetas is not None:
+        tabla_bom = completar_bom(tabla_bom, bom_desde_recetas(recetas))
+    lista = compilar_bom(tabla_bom)
+    semanas = columnas_semana(plan) if semanas is None else list(semanas)
+    if hasta is not None:
+        margen = int(lista.anticipacion.max()) if len(lista.articulos) else 0
+        semanas = semanas[:semanas.index(hasta) + 1 + margen]
+    return explotar_bom(lista, plan, semanas)
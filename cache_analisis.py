@@ -0,0 +1,180 @@
+# Caché de análisis direccionada por contenido
+# Las claves son huellas (hash) del contenido de recetas y planes, de modo que
+# resultados idénticos se reutilizan entre reruns y entre sesiones del mismo
+# proceso. Nivel en memoria con desalojo LRU acotado y nivel opcional en disco
+# para sobrevivir reinicios de la app. Los archivos en disco llevan la versión
+# de formato en el nombre: al cambiar la forma de un resultado cacheado se
+# incrementa y las entradas viejas dejan de leerse (la poda las borra). Una
+# entrada que no se puede cargar (clase renombrada, archivo dañado) es un fallo.
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+MAX_ENTRADAS_MEMORIA = 512
+MAX_ARCHIVOS_DISCO = 5000
+# Directorio del nivel en disco; vacío o sin definir = sólo memoria
+VARIABLE_DIRECTORIO = "PERT_CACHE_DIR"
+# Versión de formato de las entradas en disco; incrementar al cambiar la forma de un resultado
+# (2: la curva de crashing agrega la columna Alargadas)
+VERSION_FORMATO = 2
+
+
+def _canonico(obj):
+    """Representación JSON estable del objeto (dict ordenado, DataFrame por columnas)"""
+    if hasattr(obj, "huella_contenido"):
+        # Contenedores que ya mantienen su propia huella (p. ej. AlmacenRecetas)
+        return {"__huella__": _canonico(obj.huella_contenido())}
+    if hasattr(obj, "columns") and hasattr(obj, "to_dict"):
+        return {"__df__": [str(c) for c in obj.columns],
+                "datos": [_canonico(v) for v in obj.to_dict("list").values()]}
+    if isinstance(obj, np.ndarray):
+        return {"__nd__": str(obj.dtype), "forma": obj.shape,
+                "sha": hashlib.blake2b(np.ascontiguousarray(obj).tobytes(), digest_size=16).hexdigest()}
+    if isinstance(obj, dict):
+        return {str(k): _canonico(v) for k, v in sorted(obj.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(obj, (list, tuple)):
+        return [_canonico(v) for v in obj]
+    if isinstance(obj, (set, frozenset)):
+        return sorted(_canonico(v) for v in obj)
+    if isinstance(obj, (np.generic,)):
+        return obj.item()
+    if (isinstance(obj, float) and obj != obj) or obj is pd.NA:
+        return "NaN"
+    if hasattr(obj, "isoformat"):
+        # date, datetime, pd.Timestamp
+        return obj.isoformat()
+    return obj
+
+
+def _sin_contenido(obj):
+    # str() de un objeto cualquiera suele incluir su dirección: la huella cambiaría en cada instancia
+    raise TypeError(f"huella: {type(obj).__name__} no tiene representación de contenido "
+                    "(defina huella_contenido())")
+
+
+def huella(*objetos):
+    """Hash hexadecimal del contenido de los objetos (recetas, planes, parámetros).
+
+    Lanza TypeError con objetos que no sean datos simples, DataFrames, arreglos
+    o contenedores con huella_contenido().
+    """
+    texto = json.dumps([_canonico(o) for o in objetos], sort_keys=True, default=_sin_contenido,
+                       separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(texto.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class CacheAnalisis:
+    """Caché LRU en memoria con nivel opcional en disco (pickle por entrada)"""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS_MEMORIA, directorio=None, max_archivos=MAX_ARCHIVOS_DISCO):
+        self.max_entradas = max_entradas
+        self.directorio = directorio
+        self.max_archivos = max_archivos
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, espacio, clave):
+        return os.path.join(self.directorio, f"v{VERSION_FORMATO}-{espacio}-{clave}.pkl")
+
+    def obtener(self, espacio, clave, defecto=None):
+        """Busca en memoria y luego en disco; un acierto en disco se promueve a memoria"""
+        llave = (espacio, clave)
+        with self._lock:
+            if llave in self._memoria:
+                self._memoria.move_to_end(llave)
+                self.aciertos += 1
+                return self._memoria[llave]
+        if self.directorio:
+            ruta = self._ruta(espacio, clave)
+            try:
+                with open(ruta, "rb") as f:
+                    valor = pickle.load(f)
+            except OSError:
+                pass
+            except Exception:
+                # Ilegible con el código actual (AttributeError, ModuleNotFoundError, pickle dañado...)
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+            else:
+                self._guardar_memoria(llave, valor)
+                with self._lock:
+                    self.aciertos += 1
+                return valor
+        with self._lock:
+            self.fallos += 1
+        return defecto
+
+    def guardar(self, espacio, clave, valor):
+        self._guardar_memoria((espacio, clave), valor)
+        if self.directorio:
+            self._guardar_disco(espacio, clave, valor)
+
+    def _guardar_memoria(self, llave, valor):
+        with self._lock:
+            self._memoria[llave] = valor
+            self._memoria.move_to_end(llave)
+            while len(self._memoria) > self.max_entradas:
+                self._memoria.popitem(last=False)
+
+    def _guardar_disco(self, espacio, clave, valor):
+        try:
+            datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        # Escritura atómica: otro proceso nunca ve un archivo a medias
+        fd, temporal = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(datos)
+        os.replace(temporal, self._ruta(espacio, clave))
+        self._podar_disco()
+
+    def _podar_disco(self):
+        archivos = [e for e in os.scandir(self.directorio) if e.name.endswith(".pkl")]
+        if len(archivos) <= self.max_archivos:
+            return
+        archivos.sort(key=lambda e: e.stat().st_mtime)
+        for entrada in archivos[:len(archivos) - self.max_archivos]:
+            try:
+                os.remove(entrada.path)
+            except OSError:
+                pass
+
+    def memoizar(self, espacio, clave, funcion):
+        """Retorna el valor cacheado o lo calcula con funcion() y lo guarda"""
+        faltante = object()
+        valor = self.obtener(espacio, clave, faltante)
+        if valor is faltante:
+            valor = funcion()
+            self.guardar(espacio, clave, valor)
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._memoria.clear()
+
+
+_cache_compartida = None
+_lock_global = threading.Lock()
+
+
+def cache_compartida():
+    """Instancia única por proceso, compartida por todas las sesiones de Streamlit"""
+    global _cache_compartida
+    with _lock_global:
+        if _cache_compartida is None:
+            _cache_compartida = CacheAnalisis(directorio=os.environ.get(VARIABLE_DIRECTORIO) or None)
+        return _cache_compartida
@@ -0,0 +1,88 @@
+# Agregación de carga por recurso
+# Precalcula una matriz modelo x recurso (minutos por unidad) a partir de todas
+# las recetas; la carga de todas las semanas del plan sale de un solo producto
+# matricial (semanas x modelos) @ (modelos x recursos).
+
+import numpy as np
+import pandas as pd
+
+from motor_cpm import leer_columna, valor_numerico
+
+UMBRAL_ALERTA = 85
+UMBRAL_SOBRECARGA = 100
+
+
+class MatrizCarga:
+    """Minutos por unidad de cada modelo en cada recurso"""
+
+    def __init__(self, modelos, recursos, minutos):
+        self.modelos = modelos
+        self.recursos = recursos
+        self.minutos = minutos
+        self.indice_modelo = {m: i for i, m in enumerate(modelos)}
+
+
+def matriz_modelo_recurso(recetas):
+    """Construye la MatrizCarga de todas las recetas (duraciones vacías cuentan como 0)"""
+    modelos = list(recetas)
+    recursos = {}
+    filas, columnas, minutos = [], [], []
+    for i, modelo in enumerate(modelos):
+        receta = recetas[modelo]
+        for recurso, duracion in zip(leer_columna(receta, 'Recurso'), leer_columna(receta, 'Duracion_Min')):
+            filas.append(i)
+            columnas.append(recursos.setdefault(recurso, len(recursos)))
+            minutos.append(valor_numerico(duracion))
+    matriz = np.zeros((len(modelos), len(recursos)))
+    np.add.at(matriz, (np.asarray(filas, dtype=np.int64), np.asarray(columnas, dtype=np.int64)),
+              np.nan_to_num(np.asarray(minutos, dtype=np.float64)))
+    return MatrizCarga(modelos, list(recursos), matriz)
+
+
+def columnas_semana(plan):
+    """Columnas de demanda del plan (todas menos 'Modelo')"""
+    return [c for c in plan.columns if c != 'Modelo']
+
+
+def demanda_alineada(plan, matriz, semanas=None):
+    """Matriz (modelos de la MatrizCarga x semanas) con la demanda del plan"""
+    semanas = columnas_semana(plan) if semanas is None else list(semanas)
+    demanda = np.zeros((len(matriz.modelos), len(semanas)))
+    filas = plan['Modelo'].map(matriz.indice_modelo)
+    presentes = filas.notna().to_numpy()
+    valores = plan[semanas].to_numpy(dtype=np.float64, na_value=0.0)[presentes]
+    np.add.at(demanda, filas[presentes].to_numpy(dtype=np.int64), valores)
+    return demanda
+
+
+def carga_por_semana(plan, recetas, semanas=None, matriz=None):
+    """Retorna (semanas, recursos, carga) con carga de forma (semanas x recursos) en minutos"""
+    semanas = columnas_semana(plan) if semanas is None else list(semanas)
+    matriz = matriz_modelo_recurso(recetas) if matriz is None else matriz
+    demanda = demanda_alineada(plan, matriz, semanas)
+    return semanas, matriz.recursos, demanda.T @ matriz.minutos
+
+
+def estado_capacidad(porcentaje):
+    """Etiqueta de semáforo para uno o varios porcentajes de utilización"""
+    return np.select(
+        [np.asarray(porcentaje) > UMBRAL_SOBRECARGA, np.asarray(porcentaje) > UMBRAL_ALERTA],
+        ["🔴 Sobrecarga", "🟡 Alerta"], "🟢 OK"
+    )
+
+
+def tabla_carga(plan, recetas, tiempo_disponible, semanas=None, matriz=None):
+    """Tabla larga Semana / Recurso / Carga_Min / Capacidad_% / Estado.
+
+    Sólo incluye los recursos con carga en cada semana, como la vista original.
+    """
+    semanas, recursos, carga = carga_por_semana(plan, recetas, semanas, matriz)
+    tabla = pd.DataFrame({
+        'Semana': np.repeat(semanas, len(recursos)),
+        'Recurso': np.tile(recursos, len(semanas)),
+        'Carga_Min': carga.ravel(),
+    })
+    tabla = tabla[tabla['Carga_Min'] > 0].reset_index(drop=True)
+    tabla['Capacidad_%'] = tabla['Carga_Min'] / tiempo_disponible * 100
+    tabla['Estado'] = estado_capacidad(tabla['Capacidad_%'])
+    return tabla
@@ -0,0 +1,148 @@
+# Corrida de capacidad sin interfaz (CPM, carga semanal, Heijunka y requerimientos de componentes)
+# Lee un directorio de recetas (receta_<modelo>.csv, recetas.csv con columna
+# Modelo, Parquet o Excel) y un archivo de plan, y escribe los resultados en
+# Parquet, CSV o JSON. El CPM se reparte por modelos en un pool de procesos.
+# Con --bom los requerimientos de componentes salen de esa lista de materiales
+# (Padre, Componente, Cantidad, Desfase_Semanas); sin ella, de las recetas.
+# No importa Streamlit ni plotly, así que arranca rápido en tareas nocturnas.
+#
+# Uso:
+#   python cli_capacidad.py --recetas recetas/ --plan plan.csv --salida reportes/
+#   python cli_capacidad.py --recetas recetas/ --plan plan.xlsx --formato json --turnos 2
+#   python cli_capacidad.py --recetas recetas/ --plan plan.csv --bom bom.csv
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from bom import COLUMNAS_BOM, explosion_plan
+from carga_recursos import matriz_modelo_recurso, tabla_carga
+from heijunka import secuencia_heijunka
+from importacion import importar_directorio
+from motor_cpm import CicloError, cpm_modelos
+from simulacion_planta import Turno
+
+FORMATOS = ('parquet', 'csv', 'json')
+MODELOS_POR_TAREA = 16
+
+
+def _cpm_bloque(recetas):
+    """Tablas de actividades y resumen del CPM de un bloque de modelos (corre en un proceso hijo)"""
+    actividades, resumen = [], []
+    for modelo, cpm in cpm_modelos(recetas).items():
+        descripciones = recetas[modelo]['Actividad'].astype(object).tolist()
+        actividades.append(pd.DataFrame({
+            'Modelo': modelo, 'ID': cpm.red.ids, 'Actividad': descripciones, 'Duracion': cpm.duraciones,
+            'ES': cpm.es, 'EF': cpm.ef, 'LS': cpm.ls, 'LF': cpm.lf,
+            'Holgura': cpm.holgura, 'Critica': cpm.critica,
+        }))
+        resumen.append({'Modelo': modelo, 'Lead_Time': cpm.duracion_proyecto,
+                        'Actividades': cpm.red.n, 'Criticas': int(np.sum(cpm.critica)),
+                        'Ruta_Critica': ' → '.join(cpm.ruta_critica)})
+    return actividades, resumen
+
+
+def calcular_cpm(recetas, procesos):
+    """(actividades, resumen) del CPM de todos los modelos; reparte bloques entre procesos"""
+    modelos = list(recetas)
+    bloques = [{m: recetas[m] for m in modelos[k:k + MODELOS_POR_TAREA]}
+               for k in range(0, len(modelos), MODELOS_POR_TAREA)]
+    if procesos > 1 and len(bloques) > 1:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(bloques))) as pool:
+            partes = list(pool.map(_cpm_bloque, bloques))
+    else:
+        partes = [_cpm_bloque(b) for b in bloques]
+    actividades = [df for a, _ in partes for df in a]
+    resumen = [r for _, rs in partes for r in rs]
+    return (pd.concat(actividades, ignore_index=True) if actividades else pd.DataFrame(),
+            pd.DataFrame(resumen))
+
+
+def secuencias_heijunka(plan, matriz):
+    """Tabla larga Semana / Posicion / Modelo con la secuencia nivelada de cada semana"""
+    contenido = {m: matriz.minutos[i] for i, m in enumerate(matriz.modelos)}
+    filas = []
+    for semana in [c for c in plan.columns if c != 'Modelo']:
+        demanda = {m: c for m, c in zip(plan['Modelo'], plan[semana]) if m in contenido}
+        secuencia = secuencia_heijunka(demanda, contenido)
+        filas.append(pd.DataFrame({'Semana': semana, 'Posicion': np.arange(1, len(secuencia) + 1),
+                                   'Modelo': secuencia}))
+    return pd.concat(filas, ignore_index=True) if filas else pd.DataFrame(columns=['Semana', 'Posicion', 'Modelo'])
+
+
+def leer_bom(ruta):
+    """Lista de materiales desde CSV, Parquet o Excel"""
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension == '.parquet':
+        return pd.read_parquet(ruta)
+    if extension in ('.xlsx', '.xls'):
+        return pd.read_excel(ruta)
+    return pd.read_csv(ruta)
+
+
+def escribir(tabla, directorio, nombre, formato):
+    ruta = os.path.join(directorio, f"{nombre}.{formato}")
+    if formato == 'parquet':
+        tabla.to_parquet(ruta, index=False)
+    elif formato == 'csv':
+        tabla.to_csv(ruta, index=False)
+    else:
+        tabla.to_json(ruta, orient='records', force_ascii=False, indent=1)
+    return ruta
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CPM, carga semanal por recurso y secuencias Heijunka sin interfaz")
+    parser.add_argument('--recetas', required=True, help="Directorio con las recetas (CSV, Parquet, Excel o ZIP)")
+    parser.add_argument('--plan', required=True, help="Archivo del plan: Modelo + una columna por semana")
+    parser.add_argument('--salida', default='reportes', help="Directorio de salida")
+    parser.add_argument('--formato', choices=FORMATOS, default='parquet')
+    parser.add_argument('--dias', type=int, default=5, help="Días hábiles por semana")
+    parser.add_argument('--horas', type=float, default=8.55, help="Horas por turno")
+    parser.add_argument('--turnos', type=int, default=1, help="Turnos por día")
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--bom', help="Lista de materiales; los modelos sin renglones usan los componentes de su receta")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    importado = importar_directorio(args.recetas, args.plan)
+    if not importado.valido:
+        print(f"{len(importado.errores)} errores en los datos de entrada:", file=sys.stderr)
+        print(importado.tabla_errores().to_string(index=False), file=sys.stderr)
+        return 2
+    recetas, plan = importado.recetas, importado.plan
+
+    try:
+        actividades, resumen = calcular_cpm(recetas, args.procesos)
+    except CicloError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    matriz = matriz_modelo_recurso(recetas)
+    turno = Turno(args.dias, args.horas, args.turnos)
+    carga = tabla_carga(plan, recetas, turno.minutos_semana, matriz=matriz)
+    heijunka = secuencias_heijunka(plan, matriz)
+    try:
+        bom = leer_bom(args.bom) if args.bom else pd.DataFrame(columns=COLUMNAS_BOM)
+        componentes = explosion_plan(bom, plan, recetas).tabla()
+    except CicloError as e:
+        print(f"Error en la lista de materiales: {e}", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.salida, exist_ok=True)
+    for nombre, tabla in (('cpm_actividades', actividades), ('cpm_modelos', resumen),
+                          ('carga_semanal', carga), ('heijunka', heijunka),
+                          ('requerimientos_componentes', componentes)):
+        print(f"{escribir(tabla, args.salida, nombre, args.formato)}: {len(tabla)} filas")
+    sobrecargas = carga[carga['Capacidad_%'] > 100] if not carga.empty else carga
+    print(f"{len(recetas)} modelos, {len(plan.columns) - 1} semanas, "
+          f"{len(sobrecargas)} recurso-semana sobrecargados ({time.perf_counter() - inicio:.1f} s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -21,3 +21,23 @@ FACTORES_ESCALA = {
     "500KW": 3.5,
     "600KW": 4.0
 }
+
+# Receta base (80-100KW)
+RECETA_BASE = [
+    {'ID': 'A', 'Actividad': 'Corte Tanque + Soporteria', 'Duracion_Min': 210.0, 'Predecesores': '', 'Recurso': 'Corte Láser', 'Componente': 'Tanque'},
+    {'ID': 'B', 'Actividad': 'Corte Cabina', 'Duracion_Min': 65.0, 'Predecesores': '', 'Recurso': 'Corte Láser', 'Componente': 'Cabina'},
+    {'ID': 'C', 'Actividad': 'Corte Sist. Escape', 'Duracion_Min': 91.0, 'Predecesores': 'B', 'Recurso': 'Corte Láser', 'Componente': 'Sistema Escape'},
+    {'ID': 'D', 'Actividad': 'Corte Caja Breaker', 'Duracion_Min': 14.3, 'Predecesores': 'C', 'Recurso': 'Corte Láser', 'Componente': 'Caja Breaker'},
+    {'ID': 'E', 'Actividad': 'Plegado Tanque', 'Duracion_Min': 408.0, 'Predecesores': 'A', 'Recurso': 'Plegadora', 'Componente': 'Tanque'},
+    {'ID': 'F', 'Actividad': 'Soldadura Tanque', 'Duracion_Min': 328.2, 'Predecesores': 'E', 'Recurso': 'Soldadura', 'Componente': 'Tanque'},
+    {'ID': 'G', 'Actividad': 'Plegado Cabina', 'Duracion_Min': 510.0, 'Predecesores': 'B', 'Recurso': 'Plegadora', 'Componente': 'Cabina'},
+    {'ID': 'H', 'Actividad': 'Soldadura Cabina', 'Duracion_Min': 360.0, 'Predecesores': 'G', 'Recurso': 'Soldadura', 'Componente': 'Cabina'},
+    {'ID': 'I', 'Actividad': 'Plegado Caja', 'Duracion_Min': 45.0, 'Predecesores': 'D', 'Recurso': 'Plegadora', 'Componente': 'Caja Breaker'},
+    {'ID': 'J', 'Actividad': 'Soldadura Caja', 'Duracion_Min': 90.0, 'Predecesores': 'I', 'Recurso': 'Soldadura', 'Componente': 'Caja Breaker'},
+    {'ID': 'K', 'Actividad': 'Pintura Tanque', 'Duracion_Min': 220.0, 'Predecesores': 'F', 'Recurso': 'Pintura (Auto)', 'Componente': 'Tanque'},
+    {'ID': 'L', 'Actividad': 'Pintura Cabina', 'Duracion_Min': 545.0, 'Predecesores': 'H', 'Recurso': 'Pintura (Semi)', 'Componente': 'Cabina'},
+    {'ID': 'M', 'Actividad': 'Ensamble Mecánico', 'Duracion_Min': 160.0, 'Predecesores': 'K,L', 'Recurso': 'Ensamble', 'Componente': 'Equipo Completo'},
+    {'ID': 'N', 'Actividad': 'Ensamble Eléctrico', 'Duracion_Min': 210.0, 'Predecesores': 'M,J', 'Recurso': 'Ensamble', 'Componente': 'Equipo Completo'},
+    {'ID': 'O', 'Actividad': 'Pruebas Carga', 'Duracion_Min': 37.5, 'Predecesores': 'N', 'Recurso': 'Pruebas', 'Componente': 'Equipo Completo'},
+    {'ID': 'P', 'Actividad': 'Empaque Final', 'Duracion_Min': 15.0, 'Predecesores': 'O', 'Recurso': 'Empaque', 'Componente': 'Equipo Completo'}
+]
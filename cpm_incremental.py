@@ -0,0 +1,252 @@
+# CPM incremental
+# Mantiene el cronograma de un modelo entre ediciones de la receta. Un cambio de
+# duración o de predecesores sólo repropaga los tiempos tempranos aguas abajo y
+# los tardíos aguas arriba del nodo afectado. Los ciclos se detectan al insertar
+# cada arista manteniendo un orden topológico dinámico (Pearce-Kelly), sin
+# revisar el grafo completo.
+
+import heapq
+
+import numpy as np
+
+from motor_cpm import (CicloError, ResultadoCPM, calcular_cpm, compilar_receta, leer_columna, leer_ids,
+                       separar_predecesores, valor_numerico)
+
+
+def _filas_receta(receta):
+    """Lee IDs, duraciones y predecesores (sólo los que existen en la receta)"""
+    ids = leer_ids(receta)
+    existentes = set(ids)
+    duraciones = [valor_numerico(d) for d in leer_columna(receta, "Duracion_Min")]
+    predecesores = [list(dict.fromkeys(p for p in separar_predecesores(v) if p in existentes))
+                    for v in leer_columna(receta, "Predecesores")]
+    return ids, duraciones, predecesores
+
+
+class TopologiaFija:
+    """Copia inmutable de IDs y aristas que acompaña a un ResultadoCPM"""
+
+    def __init__(self, ids, aristas):
+        self.ids = ids
+        self.n = len(ids)
+        self.indice = {id_: i for i, id_ in enumerate(ids)}
+        self._aristas = aristas
+        self.origen = np.array([self.indice[u] for u, _ in aristas], dtype=np.int64)
+        self.destino = np.array([self.indice[v] for _, v in aristas], dtype=np.int64)
+
+    def aristas(self):
+        return list(self._aristas)
+
+    def predecesores(self, i):
+        return self.origen[self.destino == i]
+
+    def sucesores(self, i):
+        return self.destino[self.origen == i]
+
+
+class CPMIncremental:
+    """Cronograma CPM que se actualiza por diferencias"""
+
+    def __init__(self, receta):
+        self._reconstruir(receta)
+
+    def _reconstruir(self, receta):
+        red = compilar_receta(receta)
+        res = calcular_cpm(red)
+        self.ids = list(red.ids)
+        self.dur = dict(zip(self.ids, red.duraciones.tolist()))
+        self.preds = {n: set() for n in self.ids}
+        self.succs = {n: set() for n in self.ids}
+        for u, v in red.aristas():
+            self.preds[v].add(u)
+            self.succs[u].add(v)
+        self.pos = {self.ids[i]: k for k, i in enumerate(red.orden.tolist())}
+        self._siguiente_pos = len(self.ids)
+        self.es = dict(zip(self.ids, res.es.tolist()))
+        self.ef = dict(zip(self.ids, res.ef.tolist()))
+        # cola = camino más largo desde el inicio de la actividad hasta el final (T - LS)
+        self.cola = dict(zip(self.ids, (res.duracion_proyecto - res.ls).tolist()))
+        self._invalida = False
+
+    # --- Orden topológico dinámico ---
+
+    def _agregar_arista(self, u, v):
+        """Inserta u -> v; lanza CicloError (sin modificar nada) si crea un ciclo"""
+        if v in self.succs[u]:
+            return
+        if u == v:
+            raise CicloError([u])
+        inferior, superior = self.pos[v], self.pos[u]
+        if inferior < superior:
+            adelante = self._buscar(v, self.succs, lambda n: self.pos[n] <= superior, u)
+            atras = self._buscar(u, self.preds, lambda n: self.pos[n] > inferior, None)
+            self._reordenar(atras, adelante)
+        self.succs[u].add(v)
+        self.preds[v].add(u)
+
+    def _buscar(self, inicio, vecinos, dentro, objetivo):
+        visitados = {inicio}
+        pila = [inicio]
+        while pila:
+            n = pila.pop()
+            for w in vecinos[n]:
+                if w == objetivo:
+                    raise CicloError(sorted(visitados | {w}, key=self.pos.get))
+                if w not in visitados and dentro(w):
+                    visitados.add(w)
+                    pila.append(w)
+        return visitados
+
+    def _reordenar(self, atras, adelante):
+        atras = sorted(atras, key=self.pos.get)
+        adelante = sorted(adelante, key=self.pos.get)
+        posiciones = sorted(self.pos[n] for n in atras + adelante)
+        for n, p in zip(atras + adelante, posiciones):
+            self.pos[n] = p
+
+    def _quitar_arista(self, u, v):
+        self.succs[u].discard(v)
+        self.preds[v].discard(u)
+
+    # --- Propagación ---
+
+    def _propagar_adelante(self, semillas):
+        heap = [(self.pos[n], n) for n in semillas]
+        heapq.heapify(heap)
+        en_cola = set(semillas)
+        while heap:
+            _, n = heapq.heappop(heap)
+            en_cola.discard(n)
+            es = max((self.ef[p] for p in self.preds[n]), default=0.0)
+            ef = es + self.dur[n]
+            self.es[n] = es
+            if ef != self.ef[n]:
+                self.ef[n] = ef
+                for s in self.succs[n]:
+                    if s not in en_cola:
+                        en_cola.add(s)
+                        heapq.heappush(heap, (self.pos[s], s))
+
+    def _propagar_atras(self, semillas):
+        heap = [(-self.pos[n], n) for n in semillas]
+        heapq.heapify(heap)
+        en_cola = set(semillas)
+        while heap:
+            _, n = heapq.heappop(heap)
+            en_cola.discard(n)
+            cola = self.dur[n] + max((self.cola[s] for s in self.succs[n]), default=0.0)
+            if cola != self.cola[n]:
+                self.cola[n] = cola
+                for p in self.preds[n]:
+                    if p not in en_cola:
+                        en_cola.add(p)
+                        heapq.heappush(heap, (-self.pos[p], p))
+
+    # --- Ediciones ---
+
+    def _editar(self, cambios):
+        """Aplica cambios(adelante, atras) y repropaga desde las semillas acumuladas"""
+        if self._invalida:
+            raise ValueError("Cronograma inconsistente tras un ciclo; use aplicar_receta para reconstruirlo")
+        adelante, atras = set(), set()
+        try:
+            cambios(adelante, atras)
+        except CicloError:
+            # El estado quedó a medio aplicar; la próxima edición reconstruye
+            self._invalida = True
+            raise
+        self._propagar_adelante(adelante & self.dur.keys())
+        self._propagar_atras(atras & self.dur.keys())
+
+    def _nuevo_nodo(self, n, duracion):
+        self.dur[n] = duracion
+        self.preds[n] = set()
+        self.succs[n] = set()
+        self.pos[n] = self._siguiente_pos
+        self._siguiente_pos += 1
+        self.es[n] = 0.0
+        self.ef[n] = np.nan
+        self.cola[n] = np.nan
+
+    def _eliminar_nodo(self, n, adelante, atras):
+        for s in self.succs.pop(n):
+            self.preds[s].discard(n)
+            adelante.add(s)
+        for p in self.preds.pop(n):
+            self.succs[p].discard(n)
+            atras.add(p)
+        for tabla in (self.dur, self.pos, self.es, self.ef, self.cola):
+            del tabla[n]
+
+    def _fijar_predecesores(self, n, nuevos, adelante, atras):
+        nuevos = set(nuevos)
+        actuales = self.preds[n]
+        for p in actuales - nuevos:
+            self._quitar_arista(p, n)
+            atras.add(p)
+        for p in nuevos - actuales:
+            self._agregar_arista(p, n)
+            atras.add(p)
+        adelante.add(n)
+
+    def actualizar_duracion(self, n, duracion):
+        """Cambia la duración de una actividad"""
+        def cambios(adelante, atras):
+            self.dur[n] = float(duracion)
+            adelante.add(n)
+            atras.add(n)
+        self._editar(cambios)
+
+    def actualizar_predecesores(self, n, predecesores):
+        """Reemplaza la lista de predecesores de una actividad (lista o texto 'A,B')"""
+        if isinstance(predecesores, str):
+            predecesores = separar_predecesores(predecesores)
+        predecesores = [p for p in predecesores if p in self.dur]
+        self._editar(lambda adelante, atras: self._fijar_predecesores(n, predecesores, adelante, atras))
+
+    def aplicar_receta(self, receta):
+        """Sincroniza con una receta editada aplicando sólo las diferencias"""
+        if self._invalida:
+            self._reconstruir(receta)
+            return
+        ids, duraciones, predecesores = _filas_receta(receta)
+
+        def cambios(adelante, atras):
+            nuevos = set(ids)
+            for n in [n for n in self.ids if n not in nuevos]:
+                self._eliminar_nodo(n, adelante, atras)
+            for n, d in zip(ids, duraciones):
+                if n not in self.dur:
+                    self._nuevo_nodo(n, d)
+                    adelante.add(n)
+                    atras.add(n)
+                elif d != self.dur[n] and not (np.isnan(d) and np.isnan(self.dur[n])):
+                    self.dur[n] = d
+                    adelante.add(n)
+                    atras.add(n)
+            for n, preds in zip(ids, predecesores):
+                if set(preds) != self.preds[n]:
+                    self._fijar_predecesores(n, preds, adelante, atras)
+            self.ids = ids
+
+        self._editar(cambios)
+
+    # --- Resultados ---
+
+    def aristas(self):
+        """Lista de aristas (predecesor, sucesor) por ID"""
+        indice = {n: i for i, n in enumerate(self.ids)}
+        return [(p, n) for n in self.ids for p in sorted(self.preds[n], key=indice.get)]
+
+    @property
+    def duracion_proyecto(self):
+        return max(self.ef.values(), default=0.0)
+
+    def resultado(self):
+        """ResultadoCPM con los tiempos actuales, en el orden de la receta"""
+        total = self.duracion_proyecto
+        d = np.array([self.dur[n] for n in self.ids], dtype=np.float64)
+        es = np.array([self.es[n] for n in self.ids], dtype=np.float64)
+        ls = total - np.array([self.cola[n] for n in self.ids], dtype=np.float64)
+        topologia = TopologiaFija(list(self.ids), tuple(self.aristas()))
+        return ResultadoCPM(topologia, d, es, es + d, ls, ls + d)
@@ -0,0 +1,230 @@
+# Compresión del proyecto (crashing) y sensibilidad de la ruta crítica
+# Curva tiempo-costo: en cada paso se acorta el conjunto de actividades críticas
+# más barato que corta todas las rutas críticas, hallado como corte mínimo sobre
+# la subred crítica (capacidad = costo por minuto de acortar cada actividad).
+# Como en Phillips-Dessouky, el corte puede volver a alargar actividades ya
+# comprimidas que cruza en sentido inverso (recuperando su costo), así la curva
+# es la óptima para costos lineales y sólo se detiene cuando una ruta crítica
+# tiene todas sus actividades en la duración mínima.
+# Tras cada paso el cronograma se actualiza con CPMIncremental, que sólo
+# repropaga aguas arriba y abajo de las actividades acortadas.
+#
+# La sensibilidad evalúa, para todos los modelos, el Lead Time con cada
+# actividad crítica acortada una a la vez: una fila de duraciones por actividad
+# y el CPM en lote sobre bloques de filas.
+#
+# networkx se importa recién al calcular la curva, que en la app corre en el
+# pool de procesos: la sesión sólo necesita los límites y la sensibilidad.
+
+import numpy as np
+import pandas as pd
+
+from cpm_incremental import CPMIncremental
+from motor_cpm import (TOLERANCIA_CRITICA, calcular_cpm_lote, compilar_receta, firma_topologia, leer_columna,
+                       valor_numerico)
+
+COLUMNAS_CRASH = ('Duracion_Crash', 'Costo_Crash')
+# Valores por defecto de las actividades sin Duracion_Crash / Costo_Crash en la receta
+REDUCCION_MAXIMA = 0.3
+COSTO_MINUTO = 1.0
+MAX_PASOS = 500
+# Fracción de la duración que se acorta en el análisis de sensibilidad
+FRACCION_SENSIBILIDAD = 0.1
+# Elementos (filas x actividades) por bloque del CPM en lote
+ELEMENTOS_POR_BLOQUE = 2_000_000
+
+
+def limites_crash(receta, reduccion_maxima=REDUCCION_MAXIMA, costo_minuto=COSTO_MINUTO):
+    """Retorna arreglos (normal, mínima, costo por minuto acortado) por actividad.
+
+    Las columnas opcionales vacías se completan con la reducción máxima
+    (fracción de Duracion_Min) y el costo por minuto indicados.
+    """
+    normal = np.nan_to_num(np.array([valor_numerico(d) for d in leer_columna(receta, 'Duracion_Min')], dtype=np.float64))
+    minima, costo = (np.array([valor_numerico(v) for v in leer_columna(receta, col)], dtype=np.float64)
+                     for col in COLUMNAS_CRASH)
+    minima = np.clip(np.where(np.isnan(minima), normal * (1 - reduccion_maxima), minima), 0.0, normal)
+    costo = np.where(np.isnan(costo), costo_minuto, costo)
+    if (costo < 0).any():
+        ids = [str(i) for i, malo in zip(leer_columna(receta, 'ID'), costo < 0) if malo]
+        raise ValueError(f"Costo_Crash negativo en: {', '.join(ids)}")
+    return normal, minima, costo
+
+
+class CurvaCrashing:
+    """Puntos de la curva tiempo-costo, del Lead Time normal al mínimo alcanzado"""
+
+    def __init__(self, ids, normal, puntos, duraciones, motivo):
+        self.ids = ids
+        self.normal = normal
+        self.puntos = puntos            # dicts Paso / Lead_Time / Reduccion / Costo_Paso / Costo_Acumulado / Acortadas / Alargadas
+        self.duraciones = duraciones    # duraciones de cada punto
+        self.motivo = motivo            # por qué se detuvo la compresión
+
+    @property
+    def lead_time_minimo(self):
+        return self.puntos[-1]['Lead_Time']
+
+    def tabla(self):
+        return pd.DataFrame(self.puntos)
+
+    def punto_para(self, lead_time):
+        """Índice del primer (más barato) punto que alcanza el Lead Time pedido; el último si ninguno"""
+        for k, punto in enumerate(self.puntos):
+            if punto['Lead_Time'] <= lead_time + TOLERANCIA_CRITICA:
+                return k
+        return len(self.puntos) - 1
+
+    def acortamientos(self, k=-1):
+        """Actividades acortadas en el punto k: ID / Normal / Comprimida / Reduccion"""
+        d = self.duraciones[k]
+        acortada = d < self.normal - TOLERANCIA_CRITICA
+        return pd.DataFrame({'ID': np.asarray(self.ids, dtype=object)[acortada], 'Normal': self.normal[acortada],
+                             'Comprimida': d[acortada], 'Reduccion': (self.normal - d)[acortada]})
+
+
+def _subred_critica(inc, margen, comprimido, costo):
+    """Grafo de flujo de las actividades críticas: cada una es un arco entrada -> salida.
+
+    Cada actividad tiene cota superior = costo por minuto si aún puede
+    acortarse (infinita si no) y cota inferior = costo por minuto si ya está
+    comprimida (puede alargarse), 0 si no. El corte vale lo que se paga por
+    los arcos acortados menos lo que se recupera por los que cruza al revés;
+    la cota inferior se lleva a arcos inicio -> salida y entrada -> fin, así
+    el corte mínimo del grafo resultante excede al real en la suma de las
+    cotas inferiores. Las precedencias tienen capacidad infinita (sin atributo).
+    """
+    import networkx as nx
+
+    total = inc.duracion_proyecto
+    criticas = [n for n in inc.ids if total - inc.cola[n] - inc.es[n] < TOLERANCIA_CRITICA]
+    en_red = set(criticas)
+    G = nx.DiGraph()
+    for n in criticas:
+        inferior = costo[n] if comprimido[n] > TOLERANCIA_CRITICA else 0.0
+        if margen[n] > TOLERANCIA_CRITICA:
+            G.add_edge((n, 0), (n, 1), capacity=costo[n] - inferior)
+        else:
+            G.add_edge((n, 0), (n, 1))
+        if inferior > 0:
+            G.add_edge('inicio', (n, 1), capacity=inferior)
+            G.add_edge((n, 0), 'fin', capacity=inferior)
+        if inc.es[n] < TOLERANCIA_CRITICA:
+            G.add_edge('inicio', (n, 0))
+        if total - inc.ef[n] < TOLERANCIA_CRITICA:
+            G.add_edge((n, 1), 'fin')
+        for s in inc.succs[n]:
+            if s in en_red and abs(inc.ef[n] - inc.es[s]) < TOLERANCIA_CRITICA:
+                G.add_edge((n, 1), (s, 0))
+    return G
+
+
+def curva_crashing(receta, minima, costo, lead_time_objetivo=0.0, max_pasos=MAX_PASOS):
+    """Curva tiempo-costo de una receta acortando por cortes mínimos de la subred crítica.
+
+    minima y costo: duración mínima y costo por minuto de cada actividad (p. ej.
+    de limites_crash). En cada paso se acortan las actividades del corte y se
+    alargan (hasta su duración normal) las comprimidas que el corte cruza al
+    revés; con costos lineales cada punto es el de menor costo para su Lead Time.
+    """
+    import networkx as nx
+
+    red = compilar_receta(receta)
+    ids = red.ids
+    normal = np.nan_to_num(red.duraciones)
+    inc = CPMIncremental(pd.DataFrame({'ID': ids, 'Duracion_Min': normal,
+                                       'Predecesores': leer_columna(receta, 'Predecesores')}))
+    margen = dict(zip(ids, normal - np.asarray(minima, dtype=np.float64)))
+    comprimido = dict.fromkeys(ids, 0.0)  # minutos acortados respecto de la duración normal
+    costos = dict(zip(ids, np.asarray(costo, dtype=np.float64)))
+
+    puntos = [{'Paso': 0, 'Lead_Time': inc.duracion_proyecto, 'Reduccion': 0.0, 'Costo_Paso': 0.0,
+               'Costo_Acumulado': 0.0, 'Acortadas': '', 'Alargadas': ''}]
+    duraciones = [normal.copy()]
+    acumulado = 0.0
+    motivo = "Se alcanzó el máximo de pasos"
+    for paso in range(1, max_pasos + 1):
+        total = inc.duracion_proyecto
+        if total - lead_time_objetivo < TOLERANCIA_CRITICA:
+            motivo = "Se alcanzó el Lead Time objetivo"
+            break
+        try:
+            _, (lado_inicio, _) = nx.minimum_cut(_subred_critica(inc, margen, comprimido, costos), 'inicio', 'fin')
+        except nx.NetworkXUnbounded:
+            motivo = "Una ruta crítica ya no puede acortarse"
+            break
+        corte = [n for n in ids if (n, 0) in lado_inicio and (n, 1) not in lado_inicio]
+        alargadas = [n for n in ids if (n, 1) in lado_inicio and (n, 0) not in lado_inicio
+                     and comprimido[n] > TOLERANCIA_CRITICA]
+        costo_corte = sum(costos[n] for n in corte) - sum(costos[n] for n in alargadas)
+
+        # Cuánto acortar: hasta agotar una actividad del corte, devolver una alargada a
+        # su duración normal o que otra ruta se vuelva crítica. Una ruta no crítica
+        # tiene algún tramo con holgura libre (precedencia o final), aunque sus
+        # actividades sean críticas por otras rutas.
+        holguras = [inc.es[s] - inc.ef[n] for n in ids for s in inc.succs[n]]
+        holguras += [total - inc.ef[n] for n in ids if not inc.succs[n]]
+        delta = min([margen[n] for n in corte] + [comprimido[n] for n in alargadas]
+                    + [h for h in holguras if h >= TOLERANCIA_CRITICA] + [total - lead_time_objetivo])
+        for n in corte:
+            margen[n] -= delta
+            comprimido[n] += delta
+            inc.actualizar_duracion(n, inc.dur[n] - delta)
+        for n in alargadas:
+            margen[n] += delta
+            comprimido[n] -= delta
+            inc.actualizar_duracion(n, inc.dur[n] + delta)
+        acumulado += delta * costo_corte
+        puntos.append({'Paso': paso, 'Lead_Time': inc.duracion_proyecto, 'Reduccion': delta,
+                       'Costo_Paso': delta * costo_corte, 'Costo_Acumulado': acumulado, 'Acortadas': ', '.join(corte),
+                       'Alargadas': ', '.join(alargadas)})
+        duraciones.append(np.array([inc.dur[n] for n in ids]))
+    return CurvaCrashing(ids, normal, puntos, duraciones, motivo)
+
+
+def sensibilidad_modelos(recetas, fraccion=FRACCION_SENSIBILIDAD, elementos_por_bloque=ELEMENTOS_POR_BLOQUE):
+    """Efecto en el Lead Time de acortar cada actividad en `fraccion` de su duración, una a la vez.
+
+    Tabla Modelo / ID / Actividad / Duracion / Holgura / Lead_Time /
+    Reduccion_Lead_Time / Sensibilidad (minutos de Lead Time ganados por minuto
+    acortado). Acortar una actividad con holgura no cambia el Lead Time, así que
+    sólo las críticas se evalúan con el CPM en lote.
+    """
+    grupos = {}
+    for modelo, receta in recetas.items():
+        grupos.setdefault(firma_topologia(receta), []).append(modelo)
+
+    partes = []
+    for modelos in grupos.values():
+        red = compilar_receta(recetas[modelos[0]])
+        duraciones = np.nan_to_num(np.array([[valor_numerico(d) for d in leer_columna(recetas[m], 'Duracion_Min')]
+                                             for m in modelos], dtype=np.float64))
+        base = calcular_cpm_lote(red, duraciones)
+        nuevo = np.broadcast_to(base.lead_times[:, None], duraciones.shape).copy()
+
+        # Una fila por (modelo, actividad crítica) con esa actividad acortada
+        filas_m, filas_a = np.nonzero(base.critica & (duraciones > 0))
+        por_bloque = max(elementos_por_bloque // max(red.n, 1), 1)
+        for a in range(0, len(filas_m), por_bloque):
+            m, k = filas_m[a:a + por_bloque], filas_a[a:a + por_bloque]
+            bloque = duraciones[m]
+            bloque[np.arange(len(m)), k] *= 1 - fraccion
+            nuevo[m, k] = calcular_cpm_lote(red, bloque).lead_times
+
+        reduccion = base.lead_times[:, None] - nuevo
+        acortado = duraciones * fraccion
+        partes.append(pd.DataFrame({
+            'Modelo': np.repeat(np.asarray(modelos, dtype=object), red.n),
+            'ID': np.tile(np.asarray(red.ids, dtype=object), len(modelos)),
+            'Actividad': np.concatenate([np.asarray(leer_columna(recetas[m], 'Actividad'), dtype=object)
+                                         for m in modelos]),
+            'Duracion': duraciones.ravel(),
+            'Holgura': base.holgura.ravel(),
+            'Lead_Time': np.repeat(base.lead_times, red.n),
+            'Reduccion_Lead_Time': reduccion.ravel(),
+            'Sensibilidad': np.divide(reduccion, acortado, out=np.zeros_like(reduccion), where=acortado > 0).ravel(),
+        }))
+    if not partes:
+        return pd.DataFrame(columns=['Modelo', 'ID', 'Actividad', 'Duracion', 'Holgura', 'Lead_Time',
+                                     'Reduccion_Lead_Time', 'Sensibilidad'])
+    return pd.concat(partes, ignore_index=True)
@@ -0,0 +1,84 @@
+# Secuenciación Heijunka (modelo mixto)
+# Cada unidad j de un modelo con demanda d tiene una posición ideal (j - 0.5) / d
+# dentro de la secuencia; un heap entrega siempre la unidad con menor posición
+# ideal, lo que mantiene la producción acumulada de cada modelo cerca de su
+# proporción (mínima desviación, O(n log m)). Si se pasa el contenido de trabajo
+# por recurso, se elige entre los primeros candidatos del heap con el criterio
+# goal-chasing de Toyota sobre el consumo acumulado de cada recurso.
+
+import heapq
+
+import numpy as np
+
+VENTANA_CANDIDATOS = 3
+
+
+def _demanda_entera(demanda):
+    return {m: int(round(c)) for m, c in demanda.items() if c is not None and c == c and round(c) > 0}
+
+
+def secuencia_heijunka(demanda, contenido=None, ventana=VENTANA_CANDIDATOS):
+    """Secuencia nivelada de modelos.
+
+    demanda: {modelo: unidades}. contenido (opcional): {modelo: minutos por
+    recurso (vector)}; con él se nivela además la carga de cada recurso.
+    """
+    demanda = _demanda_entera(demanda)
+    total = sum(demanda.values())
+    if total == 0:
+        return []
+
+    modelos = list(demanda)
+    trabajo = {m: float(np.sum(contenido[m])) if contenido is not None and m in contenido else 0.0
+               for m in modelos}
+    # (posición ideal, desempate: más trabajo primero, orden original, modelo, unidad j)
+    heap = [(0.5 / demanda[m], -trabajo[m], i, m, 1) for i, m in enumerate(modelos)]
+    heapq.heapify(heap)
+
+    if contenido is None or ventana <= 1:
+        secuencia = []
+        while heap:
+            _, neg, i, m, j = heapq.heappop(heap)
+            secuencia.append(m)
+            if j < demanda[m]:
+                heapq.heappush(heap, ((j + 0.5) / demanda[m], neg, i, m, j + 1))
+        return secuencia
+
+    # Consumo por unidad normalizado por el consumo medio por unidad de cada recurso
+    n_recursos = len(next(iter(contenido.values()))) if contenido else 0
+    consumo = np.array([np.asarray(contenido[m], dtype=np.float64) if m in contenido else np.zeros(n_recursos)
+                        for m in modelos]).reshape(len(modelos), n_recursos)
+    cantidades = np.array([demanda[m] for m in modelos], dtype=np.float64)
+    media = (cantidades @ consumo) / total
+    consumo = np.divide(consumo, media, out=np.zeros_like(consumo), where=media > 0)
+
+    acumulado = np.zeros(consumo.shape[1])
+    secuencia = []
+    for k in range(1, total + 1):
+        candidatos = [heapq.heappop(heap) for _ in range(min(ventana, len(heap)))]
+        # Goal-chasing: tras k unidades, lo ideal es haber consumido k veces la media de cada recurso
+        desvios = ((k - acumulado - consumo[[c[2] for c in candidatos]]) ** 2).sum(axis=1)
+        elegido = candidatos.pop(int(np.argmin(desvios)))
+        for c in candidatos:
+            heapq.heappush(heap, c)
+        _, neg, i, m, j = elegido
+        secuencia.append(m)
+        acumulado += consumo[i]
+        if j < demanda[m]:
+            heapq.heappush(heap, ((j + 0.5) / demanda[m], neg, i, m, j + 1))
+    return secuencia
+
+
+def desviacion_secuencia(secuencia, demanda):
+    """Máxima desviación absoluta entre producción acumulada real e ideal de cada modelo"""
+    demanda = _demanda_entera(demanda)
+    total = len(secuencia)
+    if total == 0:
+        return 0.0
+    modelos = list(demanda)
+    indice = {m: i for i, m in enumerate(modelos)}
+    producidas = np.zeros((total, len(modelos)))
+    producidas[np.arange(total), [indice[m] for m in secuencia]] = 1
+    acumulada = np.cumsum(producidas, axis=0)
+    ideal = np.outer(np.arange(1, total + 1), [demanda[m] / total for m in modelos])
+    return float(np.abs(acumulada - ideal).max())
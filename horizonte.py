@@ -0,0 +1,146 @@
+# Horizonte del plan: períodos de cualquier largo y granularidad
+# El plan sigue siendo ancho (Modelo + una columna por período), pero las
+# columnas ya no son fijas: semanas ISO ('2026-S42'), días ('2026-10-17') o
+# etiquetas numeradas ('Sem1', 'Sem2', ...). El horizonte avanza cerrando los
+# primeros períodos y agregando nuevos al final.
+#
+# Para horizontes largos los análisis se evalúan por bloques de períodos
+# alineados al número absoluto de cada período: sólo se calculan los bloques
+# que tocan la ventana visible, cada uno memoizado por su contenido, así que
+# editar un período invalida un solo bloque y avanzar el horizonte reutiliza
+# los bloques ya calculados.
+
+import re
+from datetime import date, timedelta
+
+import pandas as pd
+
+from cache_analisis import huella
+
+GRANULARIDADES = ('semana', 'dia')
+PERIODOS_POR_BLOQUE = 13
+VENTANA_DEFECTO = 8
+
+_PATRON_SEMANA = re.compile(r'^(\d{4})-S(\d{2})$')
+_PATRON_DIA = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_PATRON_NUMERADO = re.compile(r'^(.*?)(\d+)$')
+
+
+def etiquetas_periodos(inicio, n, granularidad='semana'):
+    """n etiquetas consecutivas desde la fecha inicio (semanas ISO desde su lunes, o días)"""
+    if granularidad == 'dia':
+        return [(inicio + timedelta(days=k)).isoformat() for k in range(n)]
+    lunes = inicio - timedelta(days=inicio.weekday())
+    etiquetas = []
+    for k in range(n):
+        anio, semana, _ = (lunes + timedelta(weeks=k)).isocalendar()
+        etiquetas.append(f"{anio}-S{semana:02d}")
+    return etiquetas
+
+
+def granularidad_de(periodos):
+    """'dia' si las etiquetas son fechas, 'semana' en otro caso"""
+    return 'dia' if periodos and all(_PATRON_DIA.match(str(p)) for p in periodos) else 'semana'
+
+
+def numero_periodo(etiqueta):
+    """Número absoluto del período (días o semanas desde el año 1); None si la etiqueta no lo indica"""
+    etiqueta = str(etiqueta)
+    semana = _PATRON_SEMANA.match(etiqueta)
+    if semana:
+        return date.fromisocalendar(int(semana[1]), int(semana[2]), 1).toordinal() // 7
+    if _PATRON_DIA.match(etiqueta):
+        return date.fromisoformat(etiqueta).toordinal()
+    numerado = _PATRON_NUMERADO.match(etiqueta)
+    return int(numerado[2]) if numerado else None
+
+
+def siguientes_periodos(periodos, k, granularidad=None):
+    """k etiquetas que continúan a las del plan con el mismo formato"""
+    if not periodos:
+        return etiquetas_periodos(date.today(), k, granularidad or 'semana')
+    ultima = str(periodos[-1])
+    semana = _PATRON_SEMANA.match(ultima)
+    if semana:
+        lunes = date.fromisocalendar(int(semana[1]), int(semana[2]), 1)
+        return etiquetas_periodos(lunes + timedelta(weeks=1), k, 'semana')
+    if _PATRON_DIA.match(ultima):
+        return etiquetas_periodos(date.fromisoformat(ultima) + timedelta(days=1), k, 'dia')
+    numerado = _PATRON_NUMERADO.match(ultima)
+    if numerado:
+        return [f"{numerado[1]}{int(numerado[2]) + i}" for i in range(1, k + 1)]
+    return [f"P{len(periodos) + i}" for i in range(1, k + 1)]
+
+
+def plan_vacio(modelos, periodos):
+    """Plan con demanda 0 para cada modelo en cada período"""
+    plan = pd.DataFrame(0, index=range(len(modelos)), columns=list(periodos), dtype='int64')
+    plan.insert(0, 'Modelo', list(modelos))
+    return plan
+
+
+def agregar_modelos(plan, modelos):
+    """Agrega con demanda 0 en todos los períodos los modelos que no tienen fila"""
+    faltantes = [m for m in modelos if m not in set(plan['Modelo'])]
+    if not faltantes:
+        return plan
+    return pd.concat([plan, plan_vacio(faltantes, plan.columns[1:])], ignore_index=True)
+
+
+def extender_plan(plan, k, granularidad=None):
+    """Agrega k períodos nuevos (demanda 0) al final del horizonte"""
+    nuevos = siguientes_periodos(list(plan.columns[1:]), k, granularidad)
+    return pd.concat([plan, pd.DataFrame(0, index=plan.index, columns=nuevos, dtype='int64')], axis=1)
+
+
+def avanzar_horizonte(plan, k=1, granularidad=None):
+    """Cierra los primeros k períodos y agrega k nuevos al final; retorna (plan abierto, cerrados)"""
+    periodos = list(plan.columns[1:])
+    k = min(k, len(periodos))
+    cerrados = plan[['Modelo'] + periodos[:k]]
+    abierto = extender_plan(plan.drop(columns=periodos[:k]), k, granularidad or granularidad_de(periodos))
+    return abierto, cerrados
+
+
+def ventana(periodos, inicio=0, largo=VENTANA_DEFECTO):
+    """Períodos visibles: largo períodos a partir de la posición inicio"""
+    inicio = max(min(inicio, len(periodos) - 1), 0)
+    return list(periodos[inicio:inicio + largo])
+
+
+def bloques_periodos(periodos, tamano=PERIODOS_POR_BLOQUE):
+    """Agrupa los períodos en bloques de tamano alineados al número absoluto de cada período.
+
+    Las etiquetas sin número se agrupan por posición.
+    """
+    bloques = {}
+    for k, p in enumerate(periodos):
+        numero = numero_periodo(p)
+        clave = ('n', numero // tamano) if numero is not None else ('p', k // tamano)
+        bloques.setdefault(clave, []).append(p)
+    return list(bloques.values())
+
+
+def tabla_por_bloques(calcular, espacio, clave, plan, visibles, funcion, *args, tamano=PERIODOS_POR_BLOQUE):
+    """Tabla con columna 'Semana' de los períodos visibles, calculada por bloques.
+
+    calcular(espacio, clave, funcion, *args) es el memoizador (p. ej.
+    ServicioComputo.calcular); cada bloque se evalúa como
+    funcion(plan del bloque, *args) con la huella de su contenido como clave.
+    """
+    visibles = set(visibles)
+    partes = []
+    for bloque in bloques_periodos(list(plan.columns[1:]), tamano):
+        if not visibles.intersection(bloque):
+            continue
+        plan_bloque = plan[['Modelo'] + bloque]
+        partes.append(calcular(espacio, huella(clave, plan_bloque), funcion, plan_bloque, *args))
+    if not partes:
+        return pd.DataFrame(columns=['Semana'])
+    tabla = pd.concat(partes, ignore_index=True)
+    return tabla[tabla['Semana'].isin(visibles)].reset_index(drop=True)
+
+
+def dias_por_periodo(granularidad, dias_sem):
+    """Días hábiles de un período: los de la semana, o 1 si el plan es diario"""
+    return 1 if granularidad == 'dia' else dias_sem
@@ -0,0 +1,344 @@
+# Importación masiva de recetas y planes
+# Lee catálogos completos (libro Excel multi-hoja, ZIP de CSV/Parquet o un
+# Parquet) en bloques, con tipos fijos por columna, y valida IDs, referencias
+# de predecesores y ciclos de forma vectorizada sobre todo el catálogo.
+# Cada error se reporta con su archivo/hoja y número de fila.
+
+import io
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from motor_cpm import CicloError, RedCompilada
+
+COLUMNAS_RECETA = ['ID', 'Actividad', 'Duracion_Min', 'Predecesores', 'Recurso', 'Componente']
+COLUMNAS_OPCIONALES = ['Duracion_Opt', 'Duracion_Prob', 'Duracion_Pes', 'Duracion_Crash', 'Costo_Crash']
+TIPOS_RECETA = {
+    'Modelo': 'string', 'ID': 'string', 'Actividad': 'string', 'Predecesores': 'string',
+    'Recurso': 'category', 'Componente': 'category',
+}
+NOMBRE_PLAN = 'plan'
+NOMBRE_RECETAS = 'recetas'
+PREFIJO_RECETA = 'receta_'
+FILAS_POR_BLOQUE = 50_000
+EXTENSIONES = ('.csv', '.parquet', '.xlsx', '.xlsm', '.zip')
+
+
+class ErrorImportacion:
+    """Problema encontrado en una fila del archivo de origen"""
+
+    def __init__(self, origen, fila, mensaje):
+        self.origen = origen
+        self.fila = fila
+        self.mensaje = mensaje
+
+    def como_dict(self):
+        return {'Origen': self.origen, 'Fila': self.fila, 'Error': self.mensaje}
+
+
+class ResultadoImportacion:
+    """Recetas por modelo, plan (o None) y lista de errores"""
+
+    def __init__(self, recetas, plan, errores):
+        self.recetas = recetas
+        self.plan = plan
+        self.errores = errores
+
+    @property
+    def valido(self):
+        return not self.errores
+
+    def tabla_errores(self):
+        return pd.DataFrame([e.como_dict() for e in self.errores], columns=['Origen', 'Fila', 'Error'])
+
+
+# --- Lectura por bloques ---
+
+def _tipar(df):
+    """Aplica los tipos de columna de recetas; las duraciones inválidas quedan como NaN"""
+    for col, tipo in TIPOS_RECETA.items():
+        if col in df.columns:
+            df[col] = df[col].astype('string').str.strip().astype(tipo)
+    for col in ['Duracion_Min'] + COLUMNAS_OPCIONALES:
+        if col in df.columns:
+            df[col + '_crudo'] = df[col]
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def _concatenar(bloques):
+    bloques = list(bloques)
+    if not bloques:
+        return pd.DataFrame()
+    df = pd.concat(bloques, ignore_index=True)
+    for col, tipo in TIPOS_RECETA.items():
+        if col in df.columns and tipo == 'category':
+            df[col] = df[col].astype('category')
+    return df
+
+
+def _leer_csv(archivo, origen):
+    """Lee un CSV en bloques; agrega _origen y _fila (número de línea del archivo)"""
+    def bloques():
+        for bloque in pd.read_csv(archivo, dtype=str, keep_default_na=False, na_values=[''],
+                                  chunksize=FILAS_POR_BLOQUE):
+            bloque['_fila'] = bloque.index + 2  # la línea 1 es el encabezado
+            bloque['_origen'] = origen
+            yield _tipar(bloque)
+    return _concatenar(bloques())
+
+
+def _leer_parquet(archivo, origen):
+    import pyarrow.parquet as pq
+
+    def bloques():
+        inicio = 0
+        for lote in pq.ParquetFile(archivo).iter_batches(batch_size=FILAS_POR_BLOQUE):
+            bloque = lote.to_pandas()
+            bloque = bloque.astype({c: 'string' for c in bloque.columns if c in TIPOS_RECETA})
+            bloque['_fila'] = np.arange(inicio, inicio + len(bloque)) + 1
+            bloque['_origen'] = origen
+            inicio += len(bloque)
+            yield _tipar(bloque)
+    return _concatenar(bloques())
+
+
+def _leer_hojas_excel(archivo):
+    """Itera (nombre_hoja, DataFrame) leyendo cada hoja en modo streaming de openpyxl"""
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        for hoja in libro.worksheets:
+            filas = hoja.iter_rows(values_only=True)
+            encabezado = next(filas, None)
+            if encabezado is None:
+                continue
+            columnas = [str(c).strip() if c is not None else f"col_{i}" for i, c in enumerate(encabezado)]
+
+            def bloques(filas=filas, columnas=columnas, origen=hoja.title):
+                buffer, numero = [], 2
+                for fila in filas:
+                    buffer.append(fila)
+                    if len(buffer) == FILAS_POR_BLOQUE:
+                        yield _bloque_excel(buffer, columnas, numero, origen)
+                        numero += len(buffer)
+                        buffer = []
+                if buffer:
+                    yield _bloque_excel(buffer, columnas, numero, origen)
+            yield hoja.title, _concatenar(bloques())
+    finally:
+        libro.close()
+
+
+def _bloque_excel(filas, columnas, primera, origen):
+    bloque = pd.DataFrame(filas, columns=columnas, dtype=object)
+    bloque = bloque.dropna(how='all')
+    bloque['_fila'] = bloque.index + primera
+    bloque['_origen'] = origen
+    return _tipar(bloque)
+
+
+# --- Clasificación de tablas ---
+
+def _nombre_base(nombre):
+    return os.path.splitext(os.path.basename(nombre))[0]
+
+
+def _agregar_tabla(nombre, df, recetas, planes, es_plan=False):
+    """Clasifica una tabla leída: plan, receta larga (con Modelo) o receta de un modelo"""
+    base = _nombre_base(nombre)
+    if es_plan or base.lower() == NOMBRE_PLAN:
+        planes.append(df)
+    elif 'Modelo' in df.columns:
+        recetas.append(df)
+    else:
+        modelo = base[len(PREFIJO_RECETA):] if base.lower().startswith(PREFIJO_RECETA) else base
+        df.insert(0, 'Modelo', pd.array([modelo] * len(df), dtype='string'))
+        recetas.append(df)
+
+
+def _leer_tablas(archivo, nombre, es_plan=False, recetas=None, planes=None):
+    """Agrega a (recetas, planes) las tablas del archivo; es_plan fuerza a tratarlas como plan"""
+    recetas = [] if recetas is None else recetas
+    planes = [] if planes is None else planes
+    extension = os.path.splitext(nombre)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        for hoja, df in _leer_hojas_excel(archivo):
+            _agregar_tabla(hoja, df, recetas, planes, es_plan)
+    elif extension == '.zip':
+        with zipfile.ZipFile(archivo) as paquete:
+            for miembro in paquete.namelist():
+                ext = os.path.splitext(miembro)[1].lower()
+                if miembro.endswith('/') or ext not in ('.csv', '.parquet'):
+                    continue
+                with paquete.open(miembro) as f:
+                    df = _leer_csv(f, miembro) if ext == '.csv' else _leer_parquet(io.BytesIO(f.read()), miembro)
+                _agregar_tabla(miembro, df, recetas, planes, es_plan)
+    elif extension == '.parquet':
+        _agregar_tabla(nombre, _leer_parquet(archivo, nombre), recetas, planes, es_plan)
+    elif extension == '.csv':
+        _agregar_tabla(nombre, _leer_csv(archivo, nombre), recetas, planes, es_plan)
+    else:
+        raise ValueError(f"Formato no soportado: {extension or nombre}")
+    return recetas, planes
+
+
+# --- Validación vectorizada ---
+
+def _errores_de(df, mascara, mensaje):
+    filas = df.loc[mascara, ['_origen', '_fila']]
+    if callable(mensaje):
+        textos = mensaje(df.loc[mascara])
+        return [ErrorImportacion(o, int(f), t) for (o, f), t in zip(filas.itertuples(index=False), textos)]
+    return [ErrorImportacion(o, int(f), mensaje) for o, f in filas.itertuples(index=False)]
+
+
+def validar_recetas(df):
+    """Lista de ErrorImportacion del catálogo de recetas (formato largo con Modelo)"""
+    errores = []
+    faltantes = [c for c in COLUMNAS_RECETA if c not in df.columns]
+    if faltantes:
+        for origen in df['_origen'].unique() if '_origen' in df.columns else ['?']:
+            errores.append(ErrorImportacion(origen, 1, f"Faltan columnas: {', '.join(faltantes)}"))
+        return errores
+
+    sin_id = df['ID'].isna() | (df['ID'] == '')
+    errores += _errores_de(df, sin_id, "Actividad sin ID")
+    errores += _errores_de(df, df['Modelo'].isna() | (df['Modelo'] == ''), "Fila sin Modelo")
+
+    duracion_invalida = df['Duracion_Min'].isna() | (df['Duracion_Min'] < 0)
+    errores += _errores_de(df, duracion_invalida,
+                           lambda d: [f"Duración inválida: {v!r}" for v in d['Duracion_Min_crudo']])
+    for col in COLUMNAS_OPCIONALES:
+        if col in df.columns:
+            crudo = df[col + '_crudo']
+            invalida = df[col].isna() & crudo.notna() & (crudo.astype('string').str.strip() != '')
+            errores += _errores_de(df, invalida, f"{col} no numérica")
+
+    duplicado = df.duplicated(['Modelo', 'ID'], keep='first') & ~sin_id
+    errores += _errores_de(df, duplicado, lambda d: [f"ID duplicado en {m}: {i}" for m, i in zip(d['Modelo'], d['ID'])])
+
+    # Referencias de predecesores: una fila por (actividad, predecesor)
+    validos = df[~sin_id & ~duplicado]
+    refs = validos[['Modelo', 'ID', 'Predecesores', '_origen', '_fila']].copy()
+    refs['Pred'] = refs['Predecesores'].fillna('').str.split(',')
+    refs = refs.explode('Pred')
+    refs['Pred'] = refs['Pred'].str.strip()
+    refs = refs[refs['Pred'].notna() & (refs['Pred'] != '')]
+    # Claves "modelo␟id" indexadas una sola vez: get_indexer resuelve todas las referencias de golpe
+    clave_act = pd.Index((validos['Modelo'].astype('string') + '\x1f' + validos['ID'].astype('string')).to_numpy(object))
+    origen = clave_act.get_indexer((refs['Modelo'].astype('string') + '\x1f' + refs['Pred'].astype('string')).to_numpy(object))
+    existe = origen >= 0
+    errores += _errores_de(refs, ~existe,
+                           lambda d: [f"Predecesor inexistente en {m}: {p}" for m, p in zip(d['Modelo'], d['Pred'])])
+
+    # Ciclos: un único grafo con todas las actividades de todos los modelos
+    refs = refs[existe]
+    destino = clave_act.get_indexer((refs['Modelo'].astype('string') + '\x1f' + refs['ID'].astype('string')).to_numpy(object))
+    try:
+        RedCompilada(clave_act.tolist(), origen[existe], destino, np.zeros(len(clave_act)))
+    except CicloError as e:
+        en_ciclo = np.zeros(len(validos), dtype=bool)
+        en_ciclo[clave_act.get_indexer(e.ids_en_ciclo)] = True
+        errores += _errores_de(validos, en_ciclo,
+                               lambda d: [f"Actividad en un ciclo (o dependiente de uno) en {m}: {i}"
+                                          for m, i in zip(d['Modelo'], d['ID'])])
+    return errores
+
+
+def validar_plan(plan, modelos):
+    """Errores del plan: columna Modelo, cantidades enteras no negativas y modelos conocidos"""
+    if 'Modelo' not in plan.columns:
+        return [ErrorImportacion(o, 1, "El plan debe tener la columna Modelo") for o in plan['_origen'].unique()]
+    errores = []
+    semanas = [c for c in plan.columns if c not in ('Modelo', '_fila', '_origen') and not c.endswith('_crudo')]
+    for semana in semanas:
+        valores = pd.to_numeric(plan[semana], errors='coerce')
+        invalidos = valores.isna() | (valores < 0) | (valores % 1 != 0)
+        errores += _errores_de(plan, invalidos.to_numpy(), f"Cantidad inválida en {semana}")
+    desconocido = ~plan['Modelo'].astype(str).isin(list(modelos))
+    errores += _errores_de(plan, desconocido.to_numpy(),
+                           lambda d: [f"Modelo sin receta: {m}" for m in d['Modelo']])
+    errores += _errores_de(plan, plan['Modelo'].duplicated().to_numpy(),
+                           lambda d: [f"Modelo repetido en el plan: {m}" for m in d['Modelo']])
+    return errores
+
+
+def importar_catalogo(archivo, nombre, modelos_existentes=()):
+    """Importa un catálogo completo (Excel, ZIP o Parquet); retorna un ResultadoImportacion.
+
+    Las recetas se devuelven como DataFrames tipados por modelo, con las
+    columnas de receta en el orden estándar. modelos_existentes permite que el
+    plan haga referencia a modelos ya cargados en la app.
+    """
+    tablas_recetas, tablas_plan = _leer_tablas(archivo, nombre)
+    return _armar_resultado(tablas_recetas, tablas_plan, nombre, modelos_existentes)
+
+
+def importar_directorio(directorio, archivo_plan=None):
+    """Importa todos los CSV/Parquet/Excel/ZIP de un directorio y, opcionalmente, un archivo de plan.
+
+    Si el archivo de plan está dentro del directorio, se lee sólo como plan.
+    """
+    tablas_recetas, tablas_plan = [], []
+    ruta_plan = None if archivo_plan is None else os.path.realpath(archivo_plan)
+    for nombre in sorted(os.listdir(directorio)):
+        ruta = os.path.join(directorio, nombre)
+        if ruta_plan is not None and os.path.realpath(ruta) == ruta_plan:
+            continue
+        if os.path.isfile(ruta) and os.path.splitext(nombre)[1].lower() in EXTENSIONES:
+            _leer_tablas(ruta, nombre, recetas=tablas_recetas, planes=tablas_plan)
+    if archivo_plan is not None:
+        _leer_tablas(archivo_plan, os.path.basename(archivo_plan), es_plan=True, planes=tablas_plan)
+    return _armar_resultado(tablas_recetas, tablas_plan, directorio)
+
+
+def _armar_resultado(tablas_recetas, tablas_plan, nombre, modelos_existentes=()):
+    """Valida las tablas leídas y arma las recetas por modelo y el plan"""
+    errores = []
+    recetas = {}
+    modelos = set(modelos_existentes)
+    catalogo = _concatenar(tablas_recetas)
+    if not catalogo.empty:
+        if 'Modelo' in catalogo.columns:
+            modelos |= set(catalogo['Modelo'].dropna().astype(str))
+        errores += validar_recetas(catalogo)
+        columnas = COLUMNAS_RECETA + [c for c in COLUMNAS_OPCIONALES if c in catalogo.columns]
+        if not errores:
+            for modelo, receta in catalogo.groupby('Modelo', sort=False, observed=True):
+                receta = receta[columnas].reset_index(drop=True)
+                receta['Predecesores'] = receta['Predecesores'].fillna('')
+                recetas[str(modelo)] = receta
+
+    plan = None
+    if tablas_plan:
+        plan = pd.concat(tablas_plan, ignore_index=True)
+        errores += validar_plan(plan, modelos)
+        semanas = [c for c in plan.columns if c not in ('Modelo', '_fila', '_origen') and not c.endswith('_crudo')]
+        plan = plan[['Modelo'] + semanas].copy()
+        plan['Modelo'] = plan['Modelo'].astype(str)
+        for semana in semanas:
+            plan[semana] = pd.to_numeric(plan[semana], errors='coerce').fillna(0).astype('int64')
+
+    if not recetas and plan is None and not errores:
+        errores.append(ErrorImportacion(nombre, 0, "El archivo no contiene recetas ni plan"))
+    return ResultadoImportacion(recetas, plan, errores)
+
+
+def combinar_plan(plan_actual, plan_importado, modelos):
+    """Plan resultante tras una importación.
+
+    Si se importó un plan, sus filas y semanas reemplazan a las actuales; los
+    modelos que quedan sin fila (existentes o recién importados) se agregan con
+    cantidad 0 en todas las semanas.
+    """
+    plan = plan_actual if plan_importado is None else plan_importado
+    semanas = [c for c in plan.columns if c != 'Modelo']
+    faltantes = [m for m in modelos if m not in set(plan['Modelo'])]
+    if not faltantes:
+        return plan.reset_index(drop=True)
+    nuevas = pd.DataFrame({'Modelo': faltantes, **{s: 0 for s in semanas}})
+    return pd.concat([plan, nuevas], ignore_index=True)
@@ -0,0 +1,243 @@
+# Instrumentación de cada rerun de la app
+# Tramos con nombre (with tramo("pert.cpm"): ...) que miden tiempo y, si se
+# pide, memoria asignada con tracemalloc. Cada rerun de una sesión es una
+# corrida; la sesión acumula estadísticas por tramo y guarda sus últimas
+# corridas para encontrar las peores. Exporta a JSONL y a formato Chrome Trace
+# (chrome://tracing, Perfetto).
+#
+# tracemalloc es global al proceso: antes de cada reset_peak el pico se anota
+# en todos los tramos abiertos (de cualquier sesión), así ninguno lo pierde. El
+# lock sólo cubre esas lecturas, nunca el código medido. La memoria es la del
+# proceso: incluye lo que asignen a la vez otros hilos y sesiones.
+#
+# Deshabilitada (sin PERT_PERFIL) tramo() devuelve siempre el mismo contexto
+# vacío, sin tocar el reloj ni el estado por hilo.
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# "1" mide tiempos; "memoria" además memoria con tracemalloc; vacío o sin definir = apagado
+VARIABLE_PERFIL = "PERT_PERFIL"
+# Archivo JSONL donde se agrega cada corrida terminada; vacío o sin definir = sólo en memoria
+VARIABLE_ARCHIVO = "PERT_PERFIL_ARCHIVO"
+MAX_CORRIDAS = 50
+
+MODO = os.environ.get(VARIABLE_PERFIL, "").strip().lower()
+HABILITADA = MODO not in ("", "0")
+CON_MEMORIA = MODO == "memoria"
+
+_local = threading.local()
+_lock_memoria = threading.Lock()
+_abiertos_memoria = set()  # tramos con memoria en curso, de todos los hilos
+
+
+class _TramoNulo:
+    """Contexto vacío que se usa cuando la instrumentación está apagada"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _TramoNulo()
+
+
+class Tramo:
+    """Intervalo medido dentro de una corrida"""
+
+    def __init__(self, nombre, profundidad, inicio_ns):
+        self.nombre = nombre
+        self.profundidad = profundidad
+        self.inicio_ns = inicio_ns
+        self.duracion_ns = 0
+        self.memoria = None       # bytes asignados netos en el proceso (con tracemalloc)
+        self.memoria_pico = None  # pico del proceso sobre lo asignado al entrar
+        self._memoria_inicio = 0
+        self._pico_visto = 0
+
+    def como_dict(self):
+        return {"nombre": self.nombre, "profundidad": self.profundidad, "inicio_ns": self.inicio_ns,
+                "duracion_ms": self.duracion_ns / 1e6, "memoria": self.memoria, "memoria_pico": self.memoria_pico}
+
+
+class Corrida:
+    """Tramos de un rerun, en orden de inicio"""
+
+    def __init__(self, estadisticas):
+        self.estadisticas = estadisticas
+        self.sesion = estadisticas.sesion
+        self.hilo = threading.get_ident()
+        self.inicio = time.time()
+        self.inicio_ns = time.perf_counter_ns()
+        self.total_ns = 0
+        self.tramos = []
+        self.pila = []
+        self.terminada = False
+        self.rss_max = None
+
+    @property
+    def total_ms(self):
+        return self.total_ns / 1e6
+
+    def como_dict(self):
+        return {"sesion": self.sesion, "inicio": self.inicio, "total_ms": self.total_ms,
+                "terminada": self.terminada, "rss_max": self.rss_max,
+                "tramos": [t.como_dict() for t in self.tramos]}
+
+
+class _TramoActivo:
+    """Contexto que registra un Tramo en la corrida del hilo"""
+
+    __slots__ = ("corrida", "tramo")
+
+    def __init__(self, corrida, nombre):
+        self.corrida = corrida
+        self.tramo = Tramo(nombre, len(corrida.pila), 0)
+
+    def __enter__(self):
+        tramo, corrida = self.tramo, self.corrida
+        if CON_MEMORIA and tracemalloc.is_tracing():
+            with _lock_memoria:
+                actual, pico = tracemalloc.get_traced_memory()
+                for abierto in _abiertos_memoria:
+                    abierto._pico_visto = max(abierto._pico_visto, pico)
+                tracemalloc.reset_peak()
+                tramo._memoria_inicio = actual
+                _abiertos_memoria.add(tramo)
+        corrida.tramos.append(tramo)
+        corrida.pila.append(tramo)
+        tramo.inicio_ns = time.perf_counter_ns()
+        return tramo
+
+    def __exit__(self, *exc):
+        tramo, corrida = self.tramo, self.corrida
+        tramo.duracion_ns = time.perf_counter_ns() - tramo.inicio_ns
+        corrida.pila.pop()
+        if CON_MEMORIA:
+            with _lock_memoria:
+                medido = tramo in _abiertos_memoria
+                if medido:
+                    actual, pico = tracemalloc.get_traced_memory()
+                    _abiertos_memoria.discard(tramo)
+            if not medido:
+                return False
+            tramo.memoria = actual - tramo._memoria_inicio
+            tramo.memoria_pico = max(tramo._pico_visto, pico) - tramo._memoria_inicio
+        return False
+
+
+def tramo(nombre):
+    """Contexto que mide el bloque como un tramo de la corrida en curso del hilo"""
+    if not HABILITADA:
+        return _NULO
+    corrida = getattr(_local, "corrida", None)
+    if corrida is None:
+        return _NULO
+    return _TramoActivo(corrida, nombre)
+
+
+class EstadisticasSesion:
+    """Acumulado por tramo y últimas corridas de una sesión"""
+
+    def __init__(self, sesion, max_corridas=MAX_CORRIDAS):
+        self.sesion = sesion
+        self.corridas = deque(maxlen=max_corridas)
+        self.por_tramo = {}   # nombre -> [llamadas, total_ns, max_ns, ultimo_ns, memoria_pico_max]
+
+    def registrar(self, corrida):
+        self.corridas.append(corrida)
+        for t in corrida.tramos:
+            acumulado = self.por_tramo.setdefault(t.nombre, [0, 0, 0, 0, None])
+            acumulado[0] += 1
+            acumulado[1] += t.duracion_ns
+            acumulado[2] = max(acumulado[2], t.duracion_ns)
+            acumulado[3] = t.duracion_ns
+            if t.memoria_pico is not None:
+                acumulado[4] = max(acumulado[4] or 0, t.memoria_pico)
+
+    def tabla(self):
+        """Filas Tramo / Llamadas / Total_ms / Media_ms / Max_ms / Ultimo_ms / Memoria_Pico_KB, de mayor a menor total"""
+        filas = [{"Tramo": nombre, "Llamadas": n, "Total_ms": total / 1e6, "Media_ms": total / n / 1e6,
+                  "Max_ms": maximo / 1e6, "Ultimo_ms": ultimo / 1e6,
+                  "Memoria_Pico_KB": None if pico is None else pico / 1024}
+                 for nombre, (n, total, maximo, ultimo, pico) in self.por_tramo.items()]
+        return sorted(filas, key=lambda f: -f["Total_ms"])
+
+    def peores(self, n=5):
+        """Las n corridas más lentas guardadas"""
+        return sorted(self.corridas, key=lambda c: -c.total_ns)[:n]
+
+    def limpiar(self):
+        self.corridas.clear()
+        self.por_tramo.clear()
+
+
+def iniciar_corrida(estadisticas):
+    """Abre la corrida del rerun actual; retorna None si la instrumentación está apagada.
+
+    Una corrida anterior sin cerrar (st.rerun o st.stop a mitad del script)
+    se registra como interrumpida.
+    """
+    if not HABILITADA:
+        return None
+    anterior = getattr(_local, "corrida", None)
+    if anterior is not None:
+        _cerrar(anterior, terminada=False)
+    if CON_MEMORIA and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    corrida = Corrida(estadisticas)
+    _local.corrida = corrida
+    return corrida
+
+
+def terminar_corrida():
+    """Cierra la corrida del hilo, la suma a las estadísticas de la sesión y la retorna"""
+    corrida = getattr(_local, "corrida", None)
+    if corrida is not None:
+        _cerrar(corrida, terminada=True)
+    return corrida
+
+
+def _cerrar(corrida, terminada):
+    _local.corrida = None
+    corrida.total_ns = time.perf_counter_ns() - corrida.inicio_ns
+    corrida.terminada = terminada
+    if resource is not None:
+        corrida.rss_max = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    corrida.estadisticas.registrar(corrida)
+    archivo = os.environ.get(VARIABLE_ARCHIVO)
+    if archivo:
+        with open(archivo, "a", encoding="utf-8") as f:
+            f.write(json.dumps(corrida.como_dict(), ensure_ascii=False) + "\n")
+
+
+def a_jsonl(corridas):
+    """Texto JSONL con una corrida por línea"""
+    return "".join(json.dumps(c.como_dict(), ensure_ascii=False) + "\n" for c in corridas)
+
+
+def a_chrome_trace(corridas):
+    """Texto JSON en formato Chrome Trace: un evento completo ('X') por tramo y por corrida"""
+    eventos = []
+    for k, c in enumerate(corridas):
+        # Microsegundos de época: inicio de la corrida + desplazamiento en el reloj perf_counter
+        base = c.inicio * 1e6 - c.inicio_ns / 1e3
+        eventos.append({"name": f"rerun {k + 1}", "cat": "corrida", "ph": "X", "pid": str(c.sesion),
+                        "tid": c.hilo, "ts": c.inicio * 1e6, "dur": c.total_ns / 1e3,
+                        "args": {"terminada": c.terminada, "rss_max": c.rss_max}})
+        for t in c.tramos:
+            args = {} if t.memoria is None else {"memoria": t.memoria, "memoria_pico": t.memoria_pico}
+            eventos.append({"name": t.nombre, "cat": "tramo", "ph": "X", "pid": str(c.sesion), "tid": c.hilo,
+                            "ts": t.inicio_ns / 1e3 + base, "dur": t.duracion_ns / 1e3, "args": args})
+    return json.dumps({"traceEvents": eventos, "displayTimeUnit": "ms"}, ensure_ascii=False)
@@ -0,0 +1,286 @@
+# Motor CPM (Ruta Crítica) sin dependencias de Streamlit
+# Compila una receta (lista de dicts estilo RECETA_BASE o DataFrame) a arreglos
+# NumPy indexados por enteros y calcula ES/EF/LS/LF/Holgura por niveles
+# topológicos, procesando todos los nodos de un mismo nivel en una sola operación.
+
+import math
+
+import numpy as np
+
+TOLERANCIA_CRITICA = 0.001
+
+
+class CicloError(ValueError):
+    """Las dependencias de la receta forman un ciclo"""
+
+    def __init__(self, ids_en_ciclo):
+        self.ids_en_ciclo = list(ids_en_ciclo)
+        super().__init__(f"Ciclo detectado en dependencias: {', '.join(self.ids_en_ciclo)}")
+
+    def __reduce__(self):
+        # Copias y pickles (errores que vuelven del pool) se rearman con los IDs, no con el mensaje
+        return CicloError, (self.ids_en_ciclo,)
+
+
+def _es_vacio(valor):
+    """True si el valor es None, NaN o texto vacío"""
+    if valor is None:
+        return True
+    if isinstance(valor, float) and math.isnan(valor):
+        return True
+    return str(valor).strip() == ""
+
+
+def leer_columna(receta, nombre, defecto=None):
+    """Retorna una columna de la receta como lista (acepta lista de dicts o DataFrame)"""
+    if hasattr(receta, "columns"):
+        if nombre in receta.columns:
+            return receta[nombre].tolist()
+        return [defecto] * len(receta)
+    return [actividad.get(nombre, defecto) for actividad in receta]
+
+
+def leer_ids(receta):
+    """IDs de la receta como texto; lanza ValueError si hay vacíos o duplicados"""
+    ids = []
+    vistos = set()
+    for fila, valor in enumerate(leer_columna(receta, "ID")):
+        if _es_vacio(valor):
+            raise ValueError(f"Actividad sin ID en la fila {fila + 1}")
+        id_ = str(valor).strip()
+        if id_ in vistos:
+            raise ValueError(f"ID duplicado: {id_}")
+        vistos.add(id_)
+        ids.append(id_)
+    return ids
+
+
+def separar_predecesores(valor):
+    """Convierte 'A, B' en ['A', 'B'] ignorando vacíos y NaN"""
+    if _es_vacio(valor):
+        return []
+    return [p.strip() for p in str(valor).split(",") if p.strip() != ""]
+
+
+def valor_numerico(valor):
+    """Convierte a float; vacíos y NaN se vuelven NaN"""
+    if _es_vacio(valor):
+        return np.nan
+    return float(valor)
+
+
+def _rangos(inicios, fines):
+    """Concatena np.arange(i, f) para cada par sin bucles de Python"""
+    largos = fines - inicios
+    total = int(largos.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    desplazamiento = np.repeat(inicios - np.cumsum(largos) + largos, largos)
+    return desplazamiento + np.arange(total, dtype=np.int64)
+
+
+def _csr(claves, valores, n):
+    """Agrupa valores por clave en formato CSR (punteros, índices)"""
+    orden = np.lexsort((valores, claves))
+    punteros = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(claves, minlength=n), out=punteros[1:])
+    return punteros, valores[orden].astype(np.int64)
+
+
+class RedCompilada:
+    """Topología de una receta en arreglos CSR con orden y niveles topológicos"""
+
+    def __init__(self, ids, origen, destino, duraciones):
+        n = len(ids)
+        self.ids = list(ids)
+        self.indice = {id_: i for i, id_ in enumerate(self.ids)}
+        self.n = n
+        self.origen = np.asarray(origen, dtype=np.int64)
+        self.destino = np.asarray(destino, dtype=np.int64)
+        self.duraciones = np.asarray(duraciones, dtype=np.float64)
+
+        self.pred_ptr, self.pred_idx = _csr(self.destino, self.origen, n)
+        self.succ_ptr, self.succ_idx = _csr(self.origen, self.destino, n)
+
+        self.nivel = self._calcular_niveles()
+        self.orden = np.argsort(self.nivel, kind="stable")
+        self.n_niveles = int(self.nivel.max()) + 1 if n else 0
+        limites = np.searchsorted(self.nivel[self.orden], np.arange(self.n_niveles + 1))
+        self.nivel_ptr = limites.astype(np.int64)
+        self._pasos = self._preparar_pasos()
+
+    def _calcular_niveles(self):
+        """Algoritmo de Kahn por frentes; lanza CicloError si sobran nodos"""
+        grado = np.diff(self.pred_ptr).copy()
+        nivel = np.full(self.n, -1, dtype=np.int64)
+        frontera = np.flatnonzero(grado == 0)
+        k = 0
+        while frontera.size:
+            nivel[frontera] = k
+            sucesores = self.succ_idx[_rangos(self.succ_ptr[frontera], self.succ_ptr[frontera + 1])]
+            np.subtract.at(grado, sucesores, 1)
+            candidatos = np.unique(sucesores)
+            frontera = candidatos[grado[candidatos] == 0]
+            k += 1
+        if (nivel < 0).any():
+            raise CicloError(self.ids[i] for i in np.flatnonzero(nivel < 0))
+        return nivel
+
+    def _preparar_pasos(self):
+        """Precalcula, por nivel, los grupos de aristas para reduceat"""
+        pasos = []
+        for k in range(self.n_niveles):
+            nodos = self.orden[self.nivel_ptr[k]:self.nivel_ptr[k + 1]]
+            pasos.append((nodos, self._grupos(nodos, self.pred_ptr, self.pred_idx),
+                          self._grupos(nodos, self.succ_ptr, self.succ_idx)))
+        return pasos
+
+    @staticmethod
+    def _grupos(nodos, punteros, indices):
+        largos = punteros[nodos + 1] - punteros[nodos]
+        con_vecinos = nodos[largos > 0]
+        if con_vecinos.size == 0:
+            return None
+        largos = largos[largos > 0]
+        vecinos = indices[_rangos(punteros[con_vecinos], punteros[con_vecinos + 1])]
+        inicios = np.concatenate(([0], np.cumsum(largos)[:-1]))
+        return con_vecinos, vecinos, inicios
+
+    def aristas(self):
+        """Lista de aristas (predecesor, sucesor) por ID"""
+        return [(self.ids[u], self.ids[v]) for u, v in zip(self.origen, self.destino)]
+
+    def predecesores(self, i):
+        return self.pred_idx[self.pred_ptr[i]:self.pred_ptr[i + 1]]
+
+    def sucesores(self, i):
+        return self.succ_idx[self.succ_ptr[i]:self.succ_ptr[i + 1]]
+
+
+class ResultadoCPM:
+    """Tiempos CPM por actividad (en el orden de la receta)"""
+
+    def __init__(self, red, duraciones, es, ef, ls, lf):
+        self.red = red
+        self.duraciones = duraciones
+        self.es = es
+        self.ef = ef
+        self.ls = ls
+        self.lf = lf
+        self.holgura = ls - es
+        self.critica = np.abs(self.holgura) < TOLERANCIA_CRITICA
+        self.duracion_proyecto = float(ef.max()) if ef.size else 0.0
+
+    @property
+    def ruta_critica(self):
+        """IDs de las actividades críticas en el orden de la receta"""
+        return [self.red.ids[i] for i in np.flatnonzero(self.critica)]
+
+
+def compilar_receta(receta):
+    """Compila una receta a una RedCompilada (IDs, aristas CSR, orden topológico y duraciones)"""
+    ids = leer_ids(receta)
+    indice = {id_: i for i, id_ in enumerate(ids)}
+
+    origen, destino = [], []
+    for j, valor in enumerate(leer_columna(receta, "Predecesores")):
+        # Predecesores inexistentes se ignoran, igual que en la versión con networkx
+        for i in dict.fromkeys(indice[p] for p in separar_predecesores(valor) if p in indice):
+            origen.append(i)
+            destino.append(j)
+
+    duraciones = [valor_numerico(d) for d in leer_columna(receta, "Duracion_Min")]
+    return RedCompilada(ids, origen, destino, duraciones)
+
+
+def _pasada_cpm(red, d):
+    """Pasadas hacia adelante y hacia atrás; d tiene forma (..., n).
+
+    Internamente se trabaja con la actividad como primer eje para que las
+    muestras de cada actividad queden contiguas en memoria.
+    """
+    dt = np.ascontiguousarray(np.moveaxis(d, -1, 0))
+    es = np.zeros_like(dt)
+    ef = np.zeros_like(dt)
+    for nodos, preds, _ in red._pasos:
+        if preds is not None:
+            destinos, fuentes, inicios = preds
+            es[destinos] = np.maximum.reduceat(ef[fuentes], inicios, axis=0)
+        ef[nodos] = es[nodos] + dt[nodos]
+
+    duracion = ef.max(axis=0) if red.n else np.zeros(dt.shape[1:])
+    lf = np.broadcast_to(duracion, dt.shape).copy()
+    ls = np.empty_like(dt)
+    for nodos, _, succs in reversed(red._pasos):
+        if succs is not None:
+            origenes, destinos, inicios = succs
+            lf[origenes] = np.minimum.reduceat(ls[destinos], inicios, axis=0)
+        ls[nodos] = lf[nodos] - dt[nodos]
+    return tuple(np.moveaxis(x, 0, -1) for x in (es, ef, ls, lf))
+
+
+def calcular_cpm(red, duraciones=None):
+    """Calcula ES/EF/LS/LF/Holgura para una red compilada"""
+    d = red.duraciones if duraciones is None else np.asarray(duraciones, dtype=np.float64)
+    if d.shape != (red.n,):
+        raise ValueError(f"Se esperaban {red.n} duraciones, se recibieron {d.shape}")
+    es, ef, ls, lf = _pasada_cpm(red, d)
+    return ResultadoCPM(red, d, es, ef, ls, lf)
+
+
+class ResultadoLote:
+    """Tiempos CPM de muchas filas de duraciones sobre una misma topología"""
+
+    def __init__(self, red, duraciones, es, ef, ls, lf):
+        self.red = red
+        self.duraciones = duraciones
+        self.es = es
+        self.ef = ef
+        self.ls = ls
+        self.lf = lf
+        self.holgura = ls - es
+        self.critica = np.abs(self.holgura) < TOLERANCIA_CRITICA
+        self.lead_times = ef.max(axis=-1) if red.n else np.zeros(duraciones.shape[0])
+
+    def fila(self, k):
+        """ResultadoCPM de la fila k"""
+        return ResultadoCPM(self.red, self.duraciones[k], self.es[k], self.ef[k], self.ls[k], self.lf[k])
+
+
+def calcular_cpm_lote(red, duraciones):
+    """Calcula CPM para una matriz de duraciones (filas x actividades) en una sola pasada"""
+    d = np.asarray(duraciones, dtype=np.float64)
+    if d.ndim != 2 or d.shape[1] != red.n:
+        raise ValueError(f"Se esperaba una matriz (filas, {red.n}), se recibió {d.shape}")
+    es, ef, ls, lf = _pasada_cpm(red, d)
+    return ResultadoLote(red, d, es, ef, ls, lf)
+
+
+def firma_topologia(receta):
+    """Clave hashable con IDs y predecesores; recetas con la misma firma comparten red"""
+    return tuple(zip((str(i).strip() for i in leer_columna(receta, "ID")),
+                     (tuple(separar_predecesores(p)) for p in leer_columna(receta, "Predecesores"))))
+
+
+def cpm_modelos(recetas):
+    """Agrupa los modelos por topología y calcula el CPM de cada grupo en lote.
+
+    Retorna {modelo: ResultadoCPM}.
+    """
+    grupos = {}
+    for modelo, receta in recetas.items():
+        grupos.setdefault(firma_topologia(receta), []).append(modelo)
+
+    resultados = {}
+    for modelos in grupos.values():
+        red = compilar_receta(recetas[modelos[0]])
+        matriz = np.array([[valor_numerico(d) for d in leer_columna(recetas[m], "Duracion_Min")] for m in modelos])
+        lote = calcular_cpm_lote(red, matriz)
+        for k, modelo in enumerate(modelos):
+            resultados[modelo] = lote.fila(k)
+    return resultados
+
+
+def cpm_receta(receta):
+    """Atajo: compila la receta y calcula su CPM"""
+    return calcular_cpm(compilar_receta(receta))
@@ -0,0 +1,111 @@
+# Optimizador de capacidad: turnos y máquinas mínimos para cumplir el plan
+# Para cada recurso y semana busca la configuración (turnos x máquinas en
+# paralelo) más barata que deja la utilización bajo el objetivo. Todas las
+# combinaciones se evalúan de una vez con broadcasting: la carga semanal
+# (semanas x recursos) contra la capacidad de cada configuración candidata.
+
+import numpy as np
+import pandas as pd
+
+from carga_recursos import UMBRAL_ALERTA
+from simulacion_planta import Turno
+
+TURNOS_MAX = 3
+MAQUINAS_MAX = 10
+COSTO_TURNO = 1.0     # costo semanal de operar una máquina durante un turno
+COSTO_MAQUINA = 5.0   # costo semanal de cada máquina adicional a las disponibles
+
+
+def grilla_configuraciones(dias_sem, horas_turno, turnos_max=TURNOS_MAX, maquinas_max=MAQUINAS_MAX):
+    """Arreglos (turnos, maquinas, minutos_semana) de todas las combinaciones candidatas.
+
+    Ordenadas por máquinas y luego turnos: ante empate de costo gana la de
+    menos máquinas.
+    """
+    maquinas, turnos = np.meshgrid(np.arange(1, maquinas_max + 1), np.arange(1, turnos_max + 1), indexing='ij')
+    turnos, maquinas = turnos.ravel(), maquinas.ravel()
+    por_turno = np.array([Turno(dias_sem, horas_turno, t).minutos_semana for t in range(turnos_max + 1)])
+    return turnos, maquinas, por_turno[turnos] * maquinas
+
+
+class ResultadoOptimizacion:
+    """Configuración elegida por semana y recurso (arreglos de forma semanas x recursos)"""
+
+    def __init__(self, semanas, recursos, carga, turnos, maquinas, capacidad, costo, factible, evaluadas):
+        self.semanas = semanas
+        self.recursos = recursos
+        self.carga = carga
+        self.turnos = turnos
+        self.maquinas = maquinas
+        self.capacidad = capacidad
+        self.costo = costo
+        self.factible = factible
+        self.evaluadas = evaluadas
+
+    @property
+    def utilizacion(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.capacidad > 0, self.carga / self.capacidad * 100, 0.0)
+
+    def tabla(self):
+        """Tabla larga Semana / Recurso / Carga_Min / Turnos / Maquinas / Capacidad_Min / Utilizacion_% / Costo / Factible.
+
+        Sólo incluye los recursos con carga, como tabla_carga.
+        """
+        tabla = pd.DataFrame({
+            'Semana': np.repeat(self.semanas, len(self.recursos)),
+            'Recurso': np.tile(self.recursos, len(self.semanas)),
+            'Carga_Min': self.carga.ravel(),
+            'Turnos': self.turnos.ravel(),
+            'Maquinas': self.maquinas.ravel(),
+            'Capacidad_Min': self.capacidad.ravel(),
+            'Utilizacion_%': self.utilizacion.ravel(),
+            'Costo': self.costo.ravel(),
+            'Factible': self.factible.ravel(),
+        })
+        return tabla[tabla['Carga_Min'] > 0].reset_index(drop=True)
+
+    def resumen_semanal(self):
+        """Costo total, turnos máximos, máquinas totales y recursos sin solución por semana"""
+        return pd.DataFrame({
+            'Semana': self.semanas,
+            'Costo': self.costo.sum(axis=1),
+            'Turnos_Max': self.turnos.max(axis=1, initial=0),
+            'Maquinas_Total': self.maquinas.sum(axis=1),
+            'Sin_Solucion': (~self.factible).sum(axis=1),
+        })
+
+
+def optimizar_capacidad(semanas, recursos, carga, dias_sem=5, horas_turno=8.55,
+                        utilizacion_objetivo=UMBRAL_ALERTA, turnos_max=TURNOS_MAX, maquinas_max=MAQUINAS_MAX,
+                        costo_turno=COSTO_TURNO, costo_maquina=COSTO_MAQUINA, maquinas_base=None):
+    """ResultadoOptimizacion con la configuración más barata de cada recurso y semana.
+
+    (semanas, recursos, carga) en el orden que devuelve carga_por_semana;
+    carga en minutos (semanas x recursos).
+    maquinas_base: {recurso: máquinas disponibles sin costo de adquisición}; por defecto 1.
+    Si ninguna configuración alcanza el objetivo se elige la de mayor capacidad
+    y se marca como no factible. Los recursos sin carga quedan en 0 turnos.
+    """
+    carga = np.asarray(carga, dtype=np.float64).reshape(len(semanas), len(recursos))
+    turnos, maquinas, capacidad = grilla_configuraciones(dias_sem, horas_turno, turnos_max, maquinas_max)
+    base = np.array([1 if maquinas_base is None else maquinas_base.get(r, 1) for r in recursos], dtype=np.float64)
+
+    # Costo (recursos x configuraciones) y factibilidad (semanas x recursos x configuraciones)
+    costo = maquinas * turnos * costo_turno + np.maximum(maquinas - base[:, None], 0) * costo_maquina
+    factible = carga[:, :, None] <= capacidad * (utilizacion_objetivo / 100)
+    elegida = np.where(factible, costo[None, :, :], np.inf).argmin(axis=2)
+    hay_solucion = factible.any(axis=2)
+    elegida = np.where(hay_solucion, elegida, int(np.argmax(capacidad)))
+
+    con_carga = carga > 0
+    fila = np.arange(len(recursos))[None, :]
+    return ResultadoOptimizacion(
+        list(semanas), list(recursos), carga,
+        np.where(con_carga, turnos[elegida], 0),
+        np.where(con_carga, maquinas[elegida], 0),
+        np.where(con_carga, capacidad[elegida], 0.0),
+        np.where(con_carga, costo[fila, elegida], 0.0),
+        hay_solucion | ~con_carga,
+        factible.size,
+    )
@@ -0,0 +1,185 @@
+# Perfil de carga en el tiempo: ASAP vs ALAP y nivelación dentro de la holgura
+# Cada unidad de la secuencia Heijunka aporta sus actividades desplazadas al
+# minuto de liberación. La carga por recurso en cada intervalo de la grilla se
+# obtiene con un barrido: el tiempo ocupado acumulado hasta t es
+# Σ clip(t - inicio, 0, duración), que con los inicios y fines ordenados y sus
+# sumas acumuladas se evalúa en todos los bordes con searchsorted, sin recorrer
+# intervalo por intervalo.
+
+import numpy as np
+import pandas as pd
+
+from motor_cpm import cpm_modelos, leer_columna
+from simulacion_planta import secuencia_plan
+
+PASO_MINUTOS = 30
+FRACCIONES_NIVELACION = 11
+
+
+class Cronograma:
+    """Actividades de todas las unidades en arreglos planos, agrupadas por unidad"""
+
+    def __init__(self, recursos, unidad, recurso, duracion, temprano, tardio):
+        self.recursos = recursos    # nombres; recurso guarda el código de cada actividad
+        self.unidad = unidad
+        self.recurso = recurso
+        self.duracion = duracion
+        self.temprano = temprano    # liberación + ES
+        self.tardio = tardio        # liberación + LS
+        # Punteros CSR: actividades de la unidad u en [ptr[u], ptr[u + 1])
+        self.ptr = np.searchsorted(unidad, np.arange(int(unidad.max()) + 2 if unidad.size else 1))
+
+    @property
+    def horizonte(self):
+        return float((self.tardio + self.duracion).max()) if self.duracion.size else 0.0
+
+
+def cronograma_unidades(recetas, secuencia, liberaciones, resultados_cpm=None):
+    """Cronograma con el ES/LS de cada actividad de cada unidad de la secuencia.
+
+    liberaciones: minuto de liberación de cada unidad (p. ej. de secuencia_plan).
+    resultados_cpm: {modelo: ResultadoCPM} ya calculado; si falta se calcula.
+    """
+    modelos = np.asarray(secuencia, dtype=object)
+    liberaciones = np.asarray(liberaciones, dtype=np.float64)
+    if resultados_cpm is None:
+        resultados_cpm = cpm_modelos({m: recetas[m] for m in dict.fromkeys(secuencia)})
+    recursos = {}
+    partes = []
+    for modelo in dict.fromkeys(secuencia):
+        unidades = np.flatnonzero(modelos == modelo)
+        cpm = resultados_cpm[modelo]
+        codigos = np.array([recursos.setdefault(r, len(recursos)) for r in leer_columna(recetas[modelo], 'Recurso')],
+                           dtype=np.int64)
+        base = liberaciones[unidades][:, None]
+        partes.append((np.repeat(unidades, len(codigos)), np.tile(codigos, len(unidades)),
+                       np.tile(np.nan_to_num(cpm.duraciones), len(unidades)),
+                       (base + cpm.es).ravel(), (base + cpm.ls).ravel()))
+    if not partes:
+        vacio = np.zeros(0)
+        return Cronograma([], vacio.astype(np.int64), vacio.astype(np.int64), vacio, vacio, vacio)
+    unidad, recurso, duracion, temprano, tardio = (np.concatenate(c) for c in zip(*partes))
+    orden = np.argsort(unidad, kind='stable')
+    return Cronograma(list(recursos), unidad[orden], recurso[orden], duracion[orden], temprano[orden], tardio[orden])
+
+
+def bordes_grilla(horizonte, paso=PASO_MINUTOS):
+    """Bordes de los intervalos de paso minutos que cubren [0, horizonte]"""
+    return np.arange(int(np.ceil(horizonte / paso)) + 1) * float(paso)
+
+
+def _ocupado_acumulado(inicios, fines, t):
+    """Minutos ocupados acumulados hasta cada t: Σ clip(t - inicio, 0, duración)"""
+    s, e = np.sort(inicios), np.sort(fines)
+    suma_s = np.concatenate(([0.0], np.cumsum(s)))
+    suma_e = np.concatenate(([0.0], np.cumsum(e)))
+    ks = np.searchsorted(s, t, side='right')
+    ke = np.searchsorted(e, t, side='right')
+    return (t * ks - suma_s[ks]) - (t * ke - suma_e[ke])
+
+
+def perfil_carga(inicios, duraciones, recurso, n_recursos, bordes):
+    """Minutos ocupados de cada recurso en cada intervalo de la grilla (recursos x intervalos)"""
+    carga = np.zeros((n_recursos, max(len(bordes) - 1, 0)))
+    orden = np.argsort(recurso, kind='stable')
+    limites = np.searchsorted(recurso[orden], np.arange(n_recursos + 1))
+    for r in range(n_recursos):
+        sel = orden[limites[r]:limites[r + 1]]
+        if sel.size:
+            carga[r] = np.diff(_ocupado_acumulado(inicios[sel], inicios[sel] + duraciones[sel], bordes))
+    return carga
+
+
+def _interpolar(acumulado, filas, t, paso):
+    """Valor del acumulado de cada fila (lineal dentro de cada intervalo) en los instantes t"""
+    posicion = t / paso
+    k = np.clip(posicion.astype(np.int64), 0, acumulado.shape[1] - 2)
+    fraccion = posicion - k
+    return acumulado[filas, k] * (1 - fraccion) + acumulado[filas, k + 1] * fraccion
+
+
+def nivelar(cronograma, bordes, fracciones=FRACCIONES_NIVELACION):
+    """Inicios nivelados: cada unidad elige qué fracción de su holgura usar.
+
+    Todas las actividades de una unidad se desplazan la misma fracción α de su
+    holgura (inicio = ES + α·(LS - ES)), lo que respeta las precedencias. Las
+    unidades se colocan en orden de secuencia eligiendo el α cuyas actividades
+    caen sobre la menor carga ya acumulada (aplana los picos). Sobre el
+    acumulado por recurso, la carga que cubre una actividad es
+    acumulado(fin) - acumulado(inicio), así que cada α se evalúa sin recorrer la grilla.
+    """
+    alfas = np.linspace(0.0, 1.0, fracciones)
+    paso = bordes[1] - bordes[0] if len(bordes) > 1 else 1.0
+    acumulado = np.zeros((len(cronograma.recursos), max(len(bordes), 2)))
+    inicios = cronograma.temprano.copy()
+    ptr = cronograma.ptr
+    for u in range(len(ptr) - 1):
+        a, b = ptr[u], ptr[u + 1]
+        if a == b:
+            continue
+        temprano, tardio = cronograma.temprano[a:b], cronograma.tardio[a:b]
+        duracion, recurso = cronograma.duracion[a:b], cronograma.recurso[a:b]
+        candidatos = temprano[None, :] + alfas[:, None] * (tardio - temprano)[None, :]
+        cubierta = (_interpolar(acumulado, recurso, candidatos + duracion, paso)
+                    - _interpolar(acumulado, recurso, candidatos, paso))
+        elegidos = candidatos[int(np.argmin(cubierta.sum(axis=1)))]
+        inicios[a:b] = elegidos
+
+        # Suma el aporte de la unidad al acumulado desde su primer intervalo
+        k0 = int(elegidos.min() // paso)
+        usados, posicion = np.unique(recurso, return_inverse=True)
+        aporte = np.clip(bordes[None, k0:] - elegidos[:, None], 0.0, duracion[:, None])
+        acumulado[usados, k0:k0 + aporte.shape[1]] += (
+            (posicion[None, :] == np.arange(len(usados))[:, None]).astype(np.float64) @ aporte)
+    return inicios
+
+
+class PerfilCarga:
+    """Carga por recurso e intervalo de los perfiles ASAP, ALAP y (opcional) nivelado"""
+
+    def __init__(self, recursos, bordes, perfiles):
+        self.recursos = recursos
+        self.bordes = bordes
+        self.perfiles = perfiles    # {'ASAP': minutos (recursos x intervalos), ...}
+
+    @property
+    def paso(self):
+        return self.bordes[1] - self.bordes[0] if len(self.bordes) > 1 else 1.0
+
+    def tabla(self):
+        """Tabla larga Minuto / Recurso / Perfil / Maquinas (máquinas ocupadas en promedio en el intervalo)"""
+        n = len(self.bordes) - 1
+        partes = [pd.DataFrame({
+            'Minuto': np.tile(self.bordes[:-1], len(self.recursos)),
+            'Recurso': np.repeat(self.recursos, n),
+            'Perfil': nombre,
+            'Maquinas': (carga / self.paso).ravel(),
+        }) for nombre, carga in self.perfiles.items()]
+        return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+
+    def picos(self):
+        """Máquinas ocupadas máximas por recurso en cada perfil"""
+        picos = pd.DataFrame({'Recurso': self.recursos})
+        for nombre, carga in self.perfiles.items():
+            picos[f'Pico_{nombre}'] = carga.max(axis=1, initial=0) / self.paso
+        return picos
+
+
+def perfiles_carga(cronograma, paso=PASO_MINUTOS, nivelado=False, fracciones=FRACCIONES_NIVELACION):
+    """PerfilCarga del cronograma con los inicios ASAP (ES), ALAP (LS) y opcionalmente nivelados"""
+    bordes = bordes_grilla(cronograma.horizonte, paso)
+    n = len(cronograma.recursos)
+    c = cronograma
+    perfiles = {
+        'ASAP': perfil_carga(c.temprano, c.duracion, c.recurso, n, bordes),
+        'ALAP': perfil_carga(c.tardio, c.duracion, c.recurso, n, bordes),
+    }
+    if nivelado:
+        perfiles['Nivelado'] = perfil_carga(nivelar(c, bordes, fracciones), c.duracion, c.recurso, n, bordes)
+    return PerfilCarga(c.recursos, bordes, perfiles)
+
+
+def perfil_semana(recetas, plan, semana, turno, contenido=None, paso=PASO_MINUTOS, nivelado=False):
+    """PerfilCarga de las unidades de una semana del plan, liberadas a takt en secuencia Heijunka"""
+    secuencia, liberaciones = secuencia_plan(plan, recetas, turno, [semana], contenido)
+    return perfiles_carga(cronograma_unidades(recetas, secuencia, liberaciones), paso, nivelado)
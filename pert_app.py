@@ -1,15 +1,48 @@
 import streamlit as st
 import pandas as pd
-import networkx as nx
 import plotly.express as px
 import plotly.graph_objects as go
-import graphviz
 import io
-import copy
+import uuid
+from datetime import date
+import numpy as np
+
+from almacen_recetas import catalogo_compartido
+from bom import COLUMNAS_BOM, bom_desde_recetas, completar_bom, explosion_plan
+from config_modelos import FACTORES_ESCALA, FAMILIAS, RECETA_BASE
+from crashing import COSTO_MINUTO, REDUCCION_MAXIMA, curva_crashing, limites_crash, sensibilidad_modelos
+from motor_cpm import TOLERANCIA_CRITICA, CicloError, cpm_modelos
+from cpm_incremental import CPMIncremental
+from cache_analisis import cache_compartida, huella
+from carga_recursos import UMBRAL_ALERTA, carga_por_semana, columnas_semana, matriz_modelo_recurso, tabla_carga
+from heijunka import desviacion_secuencia, secuencia_heijunka
+from horizonte import (GRANULARIDADES, VENTANA_DEFECTO, agregar_modelos, avanzar_horizonte, dias_por_periodo,
+                       etiquetas_periodos, extender_plan, granularidad_de, plan_vacio, siguientes_periodos,
+                       tabla_por_bloques, ventana)
+from instrumentacion import (CON_MEMORIA as PERFIL_CON_MEMORIA, HABILITADA as PERFIL_HABILITADO, EstadisticasSesion,
+                             a_chrome_trace, a_jsonl, iniciar_corrida, terminar_corrida, tramo)
+from optimizador_capacidad import COSTO_MAQUINA, COSTO_TURNO, optimizar_capacidad
+from perfil_carga import perfil_semana
+from simulacion_planta import Turno, secuencia_plan, simular_planta
+from rcpsp import REGLAS, programar_rcpsp
+from render_pert import MAX_NODOS_EN_PAGINA, VISTAS, exportador_compartido, fuente_pert
+from repositorio import repositorio_compartido
+from servicio_computo import ESPERA_SINCRONA, servicio_compartido
+
+cache = cache_compartida()
+repositorio = repositorio_compartido()
+exportador = exportador_compartido(cache)
+servicio = servicio_compartido(cache)
 
 # --- CONFIGURACIÓN INICIAL ---
 st.set_page_config(page_title="RK Power - Sistema Multi-Modelo con Heijunka", layout="wide", page_icon="⚙️")
 
+# Instrumentación opcional (PERT_PERFIL): cada rerun es una corrida con tramos medidos
+if PERFIL_HABILITADO:
+    if 'perfil_sesion' not in st.session_state:
+        st.session_state.perfil_sesion = EstadisticasSesion(uuid.uuid4().hex[:8])
+    iniciar_corrida(st.session_state.perfil_sesion)
+
 # --- ESTILOS CSS ---
 st.markdown("""
 <style>
@@ -37,84 +70,15 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# --- CONFIGURACIÓN DE FAMILIAS Y MODELOS ---
-FAMILIAS = {
-    "A": ["80-100KW"],
-    "B": ["130-150KW", "180-230KW"],
-    "C": ["250-275KW", "300-400KW"],
-    "D": ["500KW", "600KW"]
-}
-
-# Factores de escala respecto al modelo base (80-100KW)
-FACTORES_ESCALA = {
-    "80-100KW": 1.0,
-    "130-150KW": 1.25,
-    "180-230KW": 1.7,
-    "250-275KW": 2.0,
-    "300-400KW": 2.5,
-    "500KW": 3.5,
-    "600KW": 4.0
-}
-
-# Receta base (80-100KW)
-RECETA_BASE = [
-    {'ID': 'A', 'Actividad': 'Corte Tanque + Soporteria', 'Duracion_Min': 210.0, 'Predecesores': '', 'Recurso': 'Corte Láser', 'Componente': 'Tanque'},
-    {'ID': 'B', 'Actividad': 'Corte Cabina', 'Duracion_Min': 65.0, 'Predecesores': '', 'Recurso': 'Corte Láser', 'Componente': 'Cabina'},
-    {'ID': 'C', 'Actividad': 'Corte Sist. Escape', 'Duracion_Min': 91.0, 'Predecesores': 'B', 'Recurso': 'Corte Láser', 'Componente': 'Sistema Escape'},
-    {'ID': 'D', 'Actividad': 'Corte Caja Breaker', 'Duracion_Min': 14.3, 'Predecesores': 'C', 'Recurso': 'Corte Láser', 'Componente': 'Caja Breaker'},
-    {'ID': 'E', 'Actividad': 'Plegado Tanque', 'Duracion_Min': 408.0, 'Predecesores': 'A', 'Recurso': 'Plegadora', 'Componente': 'Tanque'},
-    {'ID': 'F', 'Actividad': 'Soldadura Tanque', 'Duracion_Min': 328.2, 'Predecesores': 'E', 'Recurso': 'Soldadura', 'Componente': 'Tanque'},
-    {'ID': 'G', 'Actividad': 'Plegado Cabina', 'Duracion_Min': 510.0, 'Predecesores': 'B', 'Recurso': 'Plegadora', 'Componente': 'Cabina'},
-    {'ID': 'H', 'Actividad': 'Soldadura Cabina', 'Duracion_Min': 360.0, 'Predecesores': 'G', 'Recurso': 'Soldadura', 'Componente': 'Cabina'},
-    {'ID': 'I', 'Actividad': 'Plegado Caja', 'Duracion_Min': 45.0, 'Predecesores': 'D', 'Recurso': 'Plegadora', 'Componente': 'Caja Breaker'},
-    {'ID': 'J', 'Actividad': 'Soldadura Caja', 'Duracion_Min': 90.0, 'Predecesores': 'I', 'Recurso': 'Soldadura', 'Componente': 'Caja Breaker'},
-    {'ID': 'K', 'Actividad': 'Pintura Tanque', 'Duracion_Min': 220.0, 'Predecesores': 'F', 'Recurso': 'Pintura (Auto)', 'Componente': 'Tanque'},
-    {'ID': 'L', 'Actividad': 'Pintura Cabina', 'Duracion_Min': 545.0, 'Predecesores': 'H', 'Recurso': 'Pintura (Semi)', 'Componente': 'Cabina'},
-    {'ID': 'M', 'Actividad': 'Ensamble Mecánico', 'Duracion_Min': 160.0, 'Predecesores': 'K,L', 'Recurso': 'Ensamble', 'Componente': 'Equipo Completo'},
-    {'ID': 'N', 'Actividad': 'Ensamble Eléctrico', 'Duracion_Min': 210.0, 'Predecesores': 'M,J', 'Recurso': 'Ensamble', 'Componente': 'Equipo Completo'},
-    {'ID': 'O', 'Actividad': 'Pruebas Carga', 'Duracion_Min': 37.5, 'Predecesores': 'N', 'Recurso': 'Pruebas', 'Componente': 'Equipo Completo'},
-    {'ID': 'P', 'Actividad': 'Empaque Final', 'Duracion_Min': 15.0, 'Predecesores': 'O', 'Recurso': 'Empaque', 'Componente': 'Equipo Completo'}
-]
-
-def generar_receta_escalada(modelo):
-    """Genera una receta escalada basada en el factor del modelo"""
-    factor = FACTORES_ESCALA.get(modelo, 1.0)
-    receta_escalada = []
-    for actividad in RECETA_BASE:
-        act_escalada = copy.deepcopy(actividad)
-        act_escalada['Duracion_Min'] = round(actividad['Duracion_Min'] * factor, 1)
-        receta_escalada.append(act_escalada)
-    return receta_escalada
-
-def crear_recetas_default():
-    """Crea todas las recetas para los modelos configurados"""
-    recetas = {}
-    for familia, modelos in FAMILIAS.items():
-        for modelo in modelos:
-            recetas[modelo] = generar_receta_escalada(modelo)
-    return recetas
-
-def get_familia_modelo(modelo):
-    """Retorna la familia a la que pertenece un modelo"""
-    for familia, modelos in FAMILIAS.items():
-        if modelo in modelos:
-            return familia
-    return "Otros"
-
-# --- GESTIÓN DE ESTADO ---
-if 'recetas' not in st.session_state:
-    st.session_state.recetas = crear_recetas_default()
-
-if 'modelo_activo' not in st.session_state:
-    st.session_state.modelo_activo = "80-100KW"
-
-if 'plan_produccion' not in st.session_state:
+# --- MODELOS Y PERSISTENCIA ---
+def plan_default():
+    """Plan de 4 semanas de ejemplo para los modelos configurados"""
     modelos_orden = []
     for fam in ["A", "B", "C", "D"]:
         if fam in FAMILIAS:
             modelos_orden.extend(FAMILIAS[fam])
     
-    st.session_state.plan_produccion = pd.DataFrame({
+    return pd.DataFrame({
         'Modelo': modelos_orden,
         'Sem1': [2, 1, 0, 1, 0, 0, 0],
         'Sem2': [3, 1, 1, 0, 1, 0, 0],
@@ -122,19 +86,113 @@ if 'plan_produccion' not in st.session_state:
         'Sem4': [1, 0, 1, 0, 0, 0, 1]
     })
 
+def familias_modelos():
+    """Familia de cada modelo de la sesión ("Otros" si no pertenece a ninguna); una consulta por rerun"""
+    if repositorio is not None:
+        registradas = repositorio.familias()
+    else:
+        registradas = {m: familia for familia, modelos in FAMILIAS.items() for m in modelos}
+    return {m: registradas.get(m) or "Otros" for m in st.session_state.recetas}
+
+def guardar_receta(modelo, receta):
+    """Actualiza la receta en la sesión y en el repositorio (sólo filas modificadas)"""
+    st.session_state.recetas[modelo] = receta
+    if repositorio is not None:
+        repositorio.guardar_receta(modelo, receta)
+
+def guardar_plan(plan):
+    """Actualiza el plan en la sesión y en el repositorio"""
+    st.session_state.plan_produccion = plan
+    if repositorio is not None:
+        repositorio.guardar_plan(plan)
+
+def obtener_cpm_incremental(modelo, receta):
+    """CPM del modelo reutilizando su cronograma previo; sólo repropaga lo editado"""
+    cronogramas = st.session_state.cronogramas_cpm
+    if modelo in cronogramas:
+        cronogramas[modelo].aplicar_receta(receta)
+    else:
+        cronogramas[modelo] = CPMIncremental(receta)
+    return cronogramas[modelo].resultado()
+
+def recetas_planas(modelos=None):
+    """Recetas como dict simple de DataFrames, para enviarlas al pool de procesos"""
+    recetas = st.session_state.recetas
+    return {m: recetas[m] for m in (recetas if modelos is None else dict.fromkeys(modelos)) if m in recetas}
+
+@st.fragment(run_every=1.0)
+def mostrar_progreso(espacio, clave, mensaje):
+    """Avance de un cálculo en el pool; al terminar vuelve a ejecutar la página"""
+    estado, segundos = servicio.estado(espacio, clave)
+    if estado == 'pendiente':
+        st.info(f"⏳ {mensaje} ({segundos:.0f} s, {servicio.en_curso()} cálculos en curso en el servidor)")
+    else:
+        st.rerun()
+
+def estado_en_fondo(espacio, clave, mensaje="Calculando..."):
+    """Valor de un cálculo ya solicitado; si sigue en curso muestra el progreso y retorna None.
+
+    Si falló, ofrece reintentarlo y relanza el error para que lo muestre quien llamó.
+    """
+    estado, valor = servicio.esperar(espacio, clave, ESPERA_SINCRONA)
+    if estado == 'error':
+        if st.button("🔄 Reintentar cálculo", key=f"reintentar_{espacio}_{clave}"):
+            servicio.descartar_error(espacio, clave)
+            st.rerun()
+        raise valor
+    if estado == 'pendiente':
+        mostrar_progreso(espacio, clave, mensaje)
+        return None
+    return valor
+
+def resultado_en_fondo(espacio, clave, funcion, *args, preparar=None, mensaje="Calculando..."):
+    """Solicita funcion(*args) al pool compartido y retorna su valor si termina a tiempo (si no, None).
+
+    preparar(): argumentos que sólo se arman si el resultado no está en la caché.
+    """
+    servicio.solicitar(espacio, clave, funcion, *args, preparar=preparar)
+    return estado_en_fondo(espacio, clave, mensaje)
+
+# --- GESTIÓN DE ESTADO ---
+with tramo('estado'):
+    if repositorio is not None and repositorio.vacio():
+        repositorio.inicializar(FAMILIAS, FACTORES_ESCALA, RECETA_BASE, plan_default())
+
+    if 'recetas' not in st.session_state:
+        # Con repositorio, la sesión sólo conoce los modelos; cada receta se lee al usarla.
+        # Sin él, comparte las recetas del catálogo por defecto hasta editarlas.
+        st.session_state.recetas = catalogo_compartido().derivar() if repositorio is None else repositorio.almacen()
+
+    if 'cronogramas_cpm' not in st.session_state:
+        st.session_state.cronogramas_cpm = {}
+
+    if 'modelo_activo' not in st.session_state:
+        st.session_state.modelo_activo = "80-100KW"
+
+    if 'plan_produccion' not in st.session_state:
+        st.session_state.plan_produccion = plan_default() if repositorio is None else repositorio.cargar_plan()
+
+    if 'periodos_cerrados' not in st.session_state:
+        st.session_state.periodos_cerrados = pd.DataFrame(columns=['Modelo'])
+
+    if 'bom' not in st.session_state:
+        # Sólo los renglones editados; los modelos sin renglones usan la BOM derivada de su receta
+        st.session_state.bom = pd.DataFrame(columns=COLUMNAS_BOM)
+
 # --- SIDEBAR: CONFIGURACIÓN GLOBAL ---
-with st.sidebar:
+with st.sidebar, tramo('sidebar'):
     st.header("⚙️ Configuración Global")
     
     st.subheader("📦 Gestión de Modelos")
     
     # Selector de modelo agrupado por familia
     modelos_agrupados = {}
-    for familia, modelos in FAMILIAS.items():
-        for modelo in modelos:
-            if modelo in st.session_state.recetas:
-                etiqueta = f"[Fam {familia}] {modelo}"
-                modelos_agrupados[etiqueta] = modelo
+    # Se calcula una vez por rerun: crear o eliminar modelos hace st.rerun
+    familia_de = familias_modelos()
+    for modelo in sorted(st.session_state.recetas, key=familia_de.get):
+        familia = familia_de[modelo]
+        etiqueta = f"[Fam {familia}] {modelo}" if familia != "Otros" else f"[Otros] {modelo}"
+        modelos_agrupados[etiqueta] = modelo
     
     modelo_seleccionado_label = st.selectbox(
         "Modelo Activo:",
@@ -153,10 +211,11 @@ with st.sidebar:
         
         if st.button("✅ Crear Modelo", use_container_width=True):
             if nuevo_nombre and nuevo_nombre not in st.session_state.recetas:
-                st.session_state.recetas[nuevo_nombre] = copy.deepcopy(st.session_state.recetas[modelo_base])
+                st.session_state.recetas.duplicar(modelo_base, nuevo_nombre)
+                if repositorio is not None:
+                    repositorio.duplicar_modelo(modelo_base, nuevo_nombre)
                 # Agregar al plan
-                nueva_fila = pd.DataFrame({'Modelo': [nuevo_nombre], 'Sem1': [0], 'Sem2': [0], 'Sem3': [0], 'Sem4': [0]})
-                st.session_state.plan_produccion = pd.concat([st.session_state.plan_produccion, nueva_fila], ignore_index=True)
+                guardar_plan(agregar_modelos(st.session_state.plan_produccion, [nuevo_nombre]))
                 st.success(f"Modelo {nuevo_nombre} creado")
                 st.rerun()
             else:
@@ -170,6 +229,9 @@ with st.sidebar:
         if st.button("❌ Confirmar Eliminación", use_container_width=True):
             if len(st.session_state.recetas) > 1:
                 del st.session_state.recetas[modelo_eliminar]
+                if repositorio is not None:
+                    repositorio.eliminar_modelo(modelo_eliminar)
+                st.session_state.cronogramas_cpm.pop(modelo_eliminar, None)
                 st.session_state.plan_produccion = st.session_state.plan_produccion[
                     st.session_state.plan_produccion['Modelo'] != modelo_eliminar
                 ]
@@ -185,15 +247,20 @@ with st.sidebar:
     dias_sem = st.number_input("Días/Semana", 1, 7, 5)
     horas_dia = st.number_input("Horas/Turno", 1.0, 24.0, 8.55)
     turnos = st.number_input("Cant. Turnos", 1, 3, 1)
-    tiempo_disponible = dias_sem * horas_dia * turnos * 60  # Minutos totales
+    # Capacidad por período del plan: la semana, o un día si el plan es diario
+    granularidad_plan = granularidad_de(columnas_semana(st.session_state.plan_produccion))
+    dias_periodo = dias_por_periodo(granularidad_plan, dias_sem)
+    turno_periodo = Turno(dias_periodo, horas_dia, turnos, 1 if granularidad_plan == 'dia' else 7)
+    tiempo_disponible = dias_periodo * horas_dia * turnos * 60  # Minutos totales
     
-    st.metric("Tiempo Disponible (Semanal)", f"{tiempo_disponible:,.0f} min")
+    st.metric(f"Tiempo Disponible ({'Diario' if granularidad_plan == 'dia' else 'Semanal'})",
+              f"{tiempo_disponible:,.0f} min")
     
     st.divider()
     st.subheader("💾 Gestión de Recetas")
     
     # Descargar receta del modelo activo
-    df_receta_activa = pd.DataFrame(st.session_state.recetas[st.session_state.modelo_activo])
+    df_receta_activa = st.session_state.recetas[st.session_state.modelo_activo]
     csv_receta = df_receta_activa.to_csv(index=False).encode('utf-8')
     st.download_button(
         f"⬇️ Descargar {st.session_state.modelo_activo}",
@@ -210,7 +277,7 @@ with st.sidebar:
             df_nueva_receta = pd.read_csv(uploaded_receta)
             required_cols = ['ID', 'Actividad', 'Duracion_Min', 'Predecesores', 'Recurso', 'Componente']
             if all(col in df_nueva_receta.columns for col in required_cols):
-                st.session_state.recetas[st.session_state.modelo_activo] = df_nueva_receta.to_dict('records')
+                guardar_receta(st.session_state.modelo_activo, df_nueva_receta)
                 st.success(f"Receta cargada para {st.session_state.modelo_activo}")
                 st.rerun()
             else:
@@ -218,6 +285,31 @@ with st.sidebar:
         except Exception as e:
             st.error(f"Error: {e}")
 
+    # Importación masiva: catálogo completo de recetas y plan
+    with st.expander("📥 Importación Masiva"):
+        st.caption("Excel (una hoja por modelo o hoja 'Recetas' con columna Modelo, y hoja 'Plan'), "
+                   "ZIP de CSV/Parquet (receta_<modelo>.csv, recetas.csv, plan.csv) o Parquet con columna Modelo")
+        archivo_masivo = st.file_uploader("Archivo", type=["xlsx", "zip", "parquet"], key="upload_masivo")
+        if archivo_masivo is not None and st.button("📥 Importar", use_container_width=True, key="importar_masivo"):
+            from importacion import combinar_plan, importar_catalogo
+            try:
+                importado = importar_catalogo(archivo_masivo, archivo_masivo.name, st.session_state.recetas.keys())
+            except Exception as e:
+                st.error(f"No se pudo leer el archivo: {e}")
+            else:
+                if not importado.valido:
+                    st.error(f"{len(importado.errores)} errores; no se importó nada")
+                    st.dataframe(importado.tabla_errores().head(500), hide_index=True, use_container_width=True)
+                else:
+                    for modelo, receta in importado.recetas.items():
+                        guardar_receta(modelo, receta)
+                        st.session_state.cronogramas_cpm.pop(modelo, None)
+                    guardar_plan(combinar_plan(
+                        st.session_state.plan_produccion, importado.plan, list(st.session_state.recetas)))
+                    st.success(f"Importados {len(importado.recetas)} modelos"
+                               + (" y el plan de producción" if importado.plan is not None else ""))
+                    st.rerun()
+
 # --- PÁGINA PRINCIPAL ---
 st.title("🏭 RK Power: Sistema Multi-Modelo con Heijunka")
 st.caption(f"Modelos activos: {len(st.session_state.recetas)} | Familias: A, B, C, D")
@@ -232,12 +324,12 @@ tab_editor, tab_planificacion, tab_componentes, tab_capacidad, tab_pert = st.tab
 ])
 
 # --- TAB 1: EDITOR DE RECETAS ---
-with tab_editor:
-    familia_activa = get_familia_modelo(st.session_state.modelo_activo)
+with tab_editor, tramo('editor'):
+    familia_activa = familia_de.get(st.session_state.modelo_activo, "Otros")
     st.markdown(f"### 🛠️ Familia **{familia_activa}**: {st.session_state.modelo_activo}")
     st.info("Edita los tiempos y secuencias. Los cambios afectarán solo este modelo.")
     
-    df_modelo_actual = pd.DataFrame(st.session_state.recetas[st.session_state.modelo_activo])
+    df_modelo_actual = st.session_state.recetas.editable(st.session_state.modelo_activo)
     
     edited_receta = st.data_editor(
         df_modelo_actual,
@@ -251,74 +343,112 @@ with tab_editor:
                 "Corte Láser", "Plegadora", "Soldadura", "Pintura (Auto)", 
                 "Pintura (Semi)", "Ensamble", "Pruebas", "Empaque", "Otros"
             ], required=True),
-            "Componente": st.column_config.TextColumn("Componente")
+            "Componente": st.column_config.TextColumn("Componente"),
+            "Duracion_Opt": st.column_config.NumberColumn("Optimista (min)", min_value=0.0, format="%.1f"),
+            "Duracion_Prob": st.column_config.NumberColumn("Más probable (min)", min_value=0.0, format="%.1f"),
+            "Duracion_Pes": st.column_config.NumberColumn("Pesimista (min)", min_value=0.0, format="%.1f"),
+            "Duracion_Crash": st.column_config.NumberColumn("Mínima comprimida (min)", min_value=0.0, format="%.1f"),
+            "Costo_Crash": st.column_config.NumberColumn("Costo por min acortado", min_value=0.0, format="%.2f")
         },
         use_container_width=True,
         key=f"editor_{st.session_state.modelo_activo}"
     )
     
     if not edited_receta.equals(df_modelo_actual):
-        st.session_state.recetas[st.session_state.modelo_activo] = edited_receta.to_dict('records')
+        guardar_receta(st.session_state.modelo_activo, edited_receta)
         st.rerun()
 
+# Las recetas ya no cambian en este rerun (el editor hace st.rerun al modificarlas)
+with tramo('matriz_carga'):
+    huella_recetas = huella(st.session_state.recetas)
+    matriz_carga = cache.memoizar('matriz_carga', huella_recetas,
+                                  lambda: matriz_modelo_recurso(st.session_state.recetas) if repositorio is None
+                                  else repositorio.matriz_carga())
+
 # --- TAB 2: PLANIFICACIÓN ---
-with tab_planificacion:
+with tab_planificacion, tramo('planificacion'):
     st.markdown("### 📅 Plan de Producción Multi-Modelo")
     st.info("Define cuántos equipos de cada modelo producir por semana. El sistema calculará la carga total y secuencia Heijunka.")
     
-    # Editor de demanda
+    periodos_plan = columnas_semana(st.session_state.plan_produccion)
+    
+    with st.expander(f"🗓️ Horizonte del Plan ({len(periodos_plan)} períodos)"):
+        col_h1, col_h2, col_h3 = st.columns(3)
+        extender_k = col_h1.number_input("Períodos a agregar", 1, 366, 1, key="extender_k")
+        if col_h1.button("➕ Extender horizonte", use_container_width=True):
+            guardar_plan(extender_plan(st.session_state.plan_produccion, int(extender_k), granularidad_plan))
+            st.rerun()
+        cerrar_k = col_h2.number_input("Períodos a cerrar", 1, max(len(periodos_plan), 1), 1, key="cerrar_k")
+        if col_h2.button("⏩ Cerrar y avanzar", use_container_width=True, disabled=not periodos_plan,
+                         help="Archiva los primeros períodos y agrega la misma cantidad al final"):
+            abierto, cerrados = avanzar_horizonte(st.session_state.plan_produccion, int(cerrar_k), granularidad_plan)
+            st.session_state.periodos_cerrados = st.session_state.periodos_cerrados.merge(cerrados, on='Modelo',
+                                                                                        how='outer')
+            guardar_plan(abierto)
+            st.rerun()
+        
+        granularidad_nueva = col_h3.selectbox("Granularidad", GRANULARIDADES, key="granularidad_nueva",
+                                              format_func=lambda g: "Semanal" if g == 'semana' else "Diaria")
+        largo_nuevo = col_h3.number_input("Períodos", 1, 731, 52 if granularidad_nueva == 'semana' else 365,
+                                          key=f"largo_nuevo_{granularidad_nueva}")
+        inicio_nuevo = col_h3.date_input("Desde", date.today(), key="inicio_nuevo")
+        if col_h3.button("🆕 Nuevo horizonte vacío", use_container_width=True,
+                         help="Reemplaza el plan por uno con demanda 0 en todos los períodos"):
+            guardar_plan(plan_vacio(st.session_state.plan_produccion['Modelo'],
+                                    etiquetas_periodos(inicio_nuevo, int(largo_nuevo), granularidad_nueva)))
+            st.rerun()
+        
+        if len(st.session_state.periodos_cerrados.columns) > 1:
+            st.markdown(f"**Períodos cerrados** ({len(st.session_state.periodos_cerrados.columns) - 1})")
+            st.dataframe(st.session_state.periodos_cerrados, use_container_width=True, hide_index=True)
+    
+    # Ventana visible: el editor y los análisis sólo trabajan sobre estos períodos
+    col_w1, col_w2 = st.columns([3, 1])
+    largo_ventana = col_w2.number_input("Períodos visibles", 1, max(len(periodos_plan), 1),
+                                        min(VENTANA_DEFECTO, max(len(periodos_plan), 1)), key="largo_ventana")
+    inicio_ventana = col_w1.slider("Inicio de la ventana", 0, len(periodos_plan) - int(largo_ventana), 0,
+                                   key="inicio_ventana") if len(periodos_plan) > largo_ventana else 0
+    ventana_plan = ventana(periodos_plan, inicio_ventana, int(largo_ventana))
+    
+    # Editor de demanda de la ventana
+    plan_ventana = st.session_state.plan_produccion[['Modelo'] + ventana_plan]
     plan_editado = st.data_editor(
-        st.session_state.plan_produccion,
+        plan_ventana,
         column_config={
             "Modelo": st.column_config.TextColumn("Modelo", disabled=True),
-            "Sem1": st.column_config.NumberColumn("Semana 1", min_value=0, format="%d"),
-            "Sem2": st.column_config.NumberColumn("Semana 2", min_value=0, format="%d"),
-            "Sem3": st.column_config.NumberColumn("Semana 3", min_value=0, format="%d"),
-            "Sem4": st.column_config.NumberColumn("Semana 4", min_value=0, format="%d"),
+            **{p: st.column_config.NumberColumn(p, min_value=0, format="%d") for p in ventana_plan},
         },
         use_container_width=True,
         hide_index=True,
         key="plan_produccion_editor"
     )
     
-    if not plan_editado.equals(st.session_state.plan_produccion):
-        st.session_state.plan_produccion = plan_editado
+    if not plan_editado.equals(plan_ventana):
+        plan_nuevo = st.session_state.plan_produccion.copy()
+        plan_nuevo[ventana_plan] = plan_editado[ventana_plan].fillna(0).to_numpy()
+        guardar_plan(plan_nuevo)
         st.rerun()
     
     st.divider()
     
+    semana_sel = st.selectbox("Período a analizar:", ventana_plan, index=0)
+    
+    # Carga de los bloques de períodos que tocan la ventana (cada bloque cacheado por contenido)
+    with tramo('planificacion.carga'):
+        df_carga_semanas = tabla_por_bloques(
+            servicio.calcular, 'carga', huella(huella_recetas, tiempo_disponible), st.session_state.plan_produccion,
+            ventana_plan, tabla_carga, None, tiempo_disponible, None, matriz_carga
+        )
+        df_carga = df_carga_semanas[df_carga_semanas['Semana'] == semana_sel].drop(columns='Semana')
+        carga_total = dict(zip(df_carga['Recurso'], df_carga['Carga_Min']))
+    
     # Calcular carga total por recurso
     col_vista1, col_vista2 = st.columns([2, 1])
     
     with col_vista1:
-        st.subheader("Carga Agregada por Recurso (Semana 1)")
-        
-        # Calcular para Semana 1
-        carga_total = {}
-        for idx, row in st.session_state.plan_produccion.iterrows():
-            modelo = row['Modelo']
-            cantidad = row['Sem1']
-            
-            if cantidad > 0 and modelo in st.session_state.recetas:
-                receta = st.session_state.recetas[modelo]
-                for actividad in receta:
-                    recurso = actividad['Recurso']
-                    tiempo = actividad['Duracion_Min'] * cantidad
-                    
-                    if recurso in carga_total:
-                        carga_total[recurso] += tiempo
-                    else:
-                        carga_total[recurso] = tiempo
+        st.subheader(f"Carga Agregada por Recurso ({semana_sel})")
         
         if carga_total:
-            df_carga = pd.DataFrame([
-                {'Recurso': k, 'Carga_Min': v} for k, v in carga_total.items()
-            ])
-            df_carga['Capacidad_%'] = (df_carga['Carga_Min'] / tiempo_disponible) * 100
-            df_carga['Estado'] = df_carga['Capacidad_%'].apply(
-                lambda x: "🔴 Sobrecarga" if x > 100 else ("🟡 Alerta" if x > 85 else "🟢 OK")
-            )
-            
             fig = go.Figure()
             fig.add_trace(go.Bar(
                 x=df_carga['Recurso'],
@@ -342,80 +472,158 @@ with tab_planificacion:
             fig.update_layout(yaxis_title="Minutos", showlegend=True)
             st.plotly_chart(fig, use_container_width=True)
         else:
-            st.warning("No hay demanda planificada para Semana 1")
+            st.warning(f"No hay demanda planificada para {semana_sel}")
     
     with col_vista2:
-        st.subheader("Secuencia Heijunka (Sem 1)")
+        st.subheader(f"Secuencia Heijunka ({semana_sel})")
         
         # Generar secuencia nivelada
-        total_sem1 = st.session_state.plan_produccion['Sem1'].sum()
+        total_sem1 = st.session_state.plan_produccion[semana_sel].sum()
         if total_sem1 > 0:
-            secuencia = []
             demanda_dict = dict(zip(
                 st.session_state.plan_produccion['Modelo'],
-                st.session_state.plan_produccion['Sem1']
+                st.session_state.plan_produccion[semana_sel]
             ))
             
-            # Algoritmo de nivelación simple (repetir hasta completar)
-            while sum(demanda_dict.values()) > 0:
-                for modelo, cant in demanda_dict.items():
-                    if cant > 0:
-                        secuencia.append(modelo)
-                        demanda_dict[modelo] -= 1
+            # Mínima desviación con goal-chasing sobre el contenido de trabajo por recurso
+            contenido = {m: matriz_carga.minutos[i] for i, m in enumerate(matriz_carga.modelos)}
+            with tramo('planificacion.heijunka'):
+                secuencia = cache.memoizar(
+                    'heijunka', huella(huella_recetas, demanda_dict),
+                    lambda: secuencia_heijunka(demanda_dict, contenido)
+                )
             
             st.write(f"**Total:** {total_sem1} equipos")
             st.write("**Orden de producción:**")
             # Mostrar primeros 15 con nombres cortos
             seq_display = [m.replace("KW", "") for m in secuencia[:15]]
             st.code(" → ".join(seq_display) + ("..." if len(secuencia) > 15 else ""))
+            st.caption(f"Desviación máx. vs. mezcla ideal: {desviacion_secuencia(secuencia, demanda_dict):.2f} equipos")
             
             st.metric("WIP Recomendado", f"{min(3, total_sem1)} equipos", 
                      help="Máximo de equipos en proceso simultáneo")
         else:
             st.info("Sin producción esta semana")
+    
+    if not df_carga_semanas.empty:
+        st.subheader("Utilización por Período y Recurso")
+        utilizacion = df_carga_semanas.pivot(index='Recurso', columns='Semana', values='Capacidad_%')
+        utilizacion = utilizacion.reindex(columns=ventana_plan).fillna(0)
+        fig_util = px.imshow(
+            utilizacion, text_auto='.0f', aspect='auto',
+            color_continuous_scale=[[0, '#28a745'], [0.85 / 1.5, '#ffc107'], [1 / 1.5, '#ff4b4b'], [1, '#8b0000']],
+            range_color=[0, 150], labels=dict(color='Capacidad %')
+        )
+        st.plotly_chart(fig_util, use_container_width=True)
+        
+        # Perfil de carga en el tiempo de las unidades de la semana (liberadas a takt en secuencia Heijunka)
+        st.subheader(f"📈 Perfil de Carga ASAP vs ALAP ({semana_sel})")
+        col_pf1, col_pf2, col_pf3 = st.columns(3)
+        paso_perfil = col_pf1.selectbox("Intervalo (min)", [15, 30, 60, 120], index=1, key="paso_perfil")
+        nivelar_perfil = col_pf2.checkbox("Nivelar dentro de la holgura", value=True, key="nivelar_perfil",
+                                          help="Desplaza cada unidad dentro de su holgura para aplanar los picos")
+        contenido_perfil = {m: matriz_carga.minutos[i] for i, m in enumerate(matriz_carga.modelos)}
+        plan_semana = st.session_state.plan_produccion[['Modelo', semana_sel]]
+        modelos_semana = plan_semana.loc[plan_semana[semana_sel] > 0, 'Modelo']
+        try:
+            perfil = resultado_en_fondo(
+                'perfil_carga', huella(huella_recetas, plan_semana, dias_periodo, horas_dia, turnos,
+                                       paso_perfil, nivelar_perfil),
+                perfil_semana, mensaje="Calculando perfil de carga...",
+                preparar=lambda: (recetas_planas(modelos_semana), plan_semana, semana_sel, turno_periodo,
+                                  contenido_perfil, paso_perfil, nivelar_perfil)
+            )
+        except CicloError:
+            st.warning("No se puede calcular el perfil: hay un ciclo en alguna receta")
+        else:
+            if perfil is not None and perfil.recursos:
+                recurso_perfil = col_pf3.selectbox("Recurso:", perfil.recursos, key="recurso_perfil")
+                df_perfil = perfil.tabla()
+                fig_perfil = px.line(
+                    df_perfil[df_perfil['Recurso'] == recurso_perfil], x='Minuto', y='Maquinas', color='Perfil',
+                    line_shape='hv', color_discrete_map={'ASAP': '#1f77b4', 'ALAP': '#ff7f0e', 'Nivelado': '#28a745'}
+                )
+                fig_perfil.update_layout(xaxis_title="Minutos hábiles desde el inicio del período",
+                                         yaxis_title="Máquinas ocupadas (promedio)")
+                st.plotly_chart(fig_perfil, use_container_width=True)
+                st.dataframe(perfil.picos(), use_container_width=True, hide_index=True)
+            elif perfil is not None:
+                st.info(f"Sin unidades en {semana_sel}")
 
 # --- TAB 3: COMPONENTES ---
-with tab_componentes:
-    st.markdown("### 🔩 Vista por Componentes (Semana 1)")
-    st.info("Desglosa la producción a nivel de componente individual (Tanque, Cabina, etc.)")
-    
-    componentes_totales = {}
+with tab_componentes, tramo('componentes'):
+    st.markdown("### 🔩 Requerimientos de Componentes por Período")
+    st.info("Explota el plan completo a través de la lista de materiales (BOM): cantidades por equipo, "
+            "subensambles y semanas de anticipación de cada componente.")
+
+    bom_defecto = cache.memoizar('bom_recetas', huella_recetas, lambda: bom_desde_recetas(st.session_state.recetas))
+    bom_efectiva = completar_bom(st.session_state.bom, bom_defecto)
+
+    with st.expander("🧩 Lista de Materiales"):
+        st.caption("Una fila por componente de cada padre (modelo o subensamble). Los modelos sin filas "
+                   "usan una unidad de cada componente de su receta.")
+        bom_editada = st.data_editor(
+            bom_efectiva,
+            column_config={
+                "Padre": st.column_config.TextColumn("Padre", required=True),
+                "Componente": st.column_config.TextColumn("Componente", required=True),
+                "Cantidad": st.column_config.NumberColumn("Cantidad por unidad", min_value=0.0, default=1.0),
+                "Desfase_Semanas": st.column_config.NumberColumn("Semanas de anticipación", min_value=0,
+                                                                 default=0, format="%d"),
+            },
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            key="bom_editor"
+        )
+        if not bom_editada.equals(bom_efectiva):
+            st.session_state.bom = bom_editada.dropna(subset=['Padre', 'Componente']).reset_index(drop=True)
+            st.rerun()
+
+    try:
+        # Sólo se explota hasta el final de la ventana (más la anticipación de la BOM)
+        explosion = servicio.calcular(
+            'bom', huella(bom_efectiva, st.session_state.plan_produccion, ventana_plan[-1]),
+            explosion_plan, bom_efectiva, st.session_state.plan_produccion, None, None, ventana_plan[-1]
+        ) if ventana_plan else None
+    except CicloError as e:
+        st.error(f"❌ La lista de materiales tiene un ciclo: {', '.join(e.ids_en_ciclo)}")
+        explosion = None
+
+    if explosion is not None:
+        df_req = explosion.tabla(semanas=ventana_plan)
+        if not df_req.empty:
+            resumen_bom = explosion.resumen(semanas=ventana_plan)
+            col_b1, col_b2, col_b3 = st.columns(3)
+            col_b1.metric("Componentes", len(resumen_bom))
+            col_b2.metric("Niveles de la BOM", explosion.lista.niveles - 1)
+            col_b3.metric("Unidades atrasadas", f"{resumen_bom['Atrasado'].sum():,.0f}",
+                          help="Requerimientos que por su anticipación caen antes del primer período del plan")
+
+            st.dataframe(resumen_bom, use_container_width=True, hide_index=True)
+
+            fig_comp = px.bar(df_req, x='Semana', y='Requerido', color='Articulo',
+                              title="Requerimientos de Componentes por Período")
+            st.plotly_chart(fig_comp, use_container_width=True)
+            st.download_button("⬇️ Requerimientos (CSV)", df_req.to_csv(index=False).encode('utf-8'),
+                               file_name="requerimientos_componentes.csv", mime="text/csv")
+        else:
+            st.warning("No hay producción planificada")
     
-    for idx, row in st.session_state.plan_produccion.iterrows():
-        modelo = row['Modelo']
-        cantidad_sem1 = row['Sem1']
-        
-        if cantidad_sem1 > 0 and modelo in st.session_state.recetas:
-            receta = st.session_state.recetas[modelo]
-            for actividad in receta:
-                comp = actividad['Componente']
-                if comp not in componentes_totales:
-                    componentes_totales[comp] = {'cantidad': 0, 'modelos': set()}
-                componentes_totales[comp]['cantidad'] += cantidad_sem1
-                componentes_totales[comp]['modelos'].add(modelo)
-    
-    if componentes_totales:
-        df_comp = pd.DataFrame([
-            {
-                'Componente': k,
-                'Cantidad Total': v['cantidad'],
-                'Modelos': ', '.join(v['modelos'])
-            }
-            for k, v in componentes_totales.items()
-        ])
-        
-        st.dataframe(df_comp, use_container_width=True, hide_index=True)
-        
-        # Gráfico de componentes
-        fig_comp = px.bar(df_comp, x='Componente', y='Cantidad Total', 
-                          title="Demanda de Componentes - Semana 1")
-        st.plotly_chart(fig_comp, use_container_width=True)
-    else:
-        st.warning("No hay producción planificada")
+    # Consultas indexadas sobre todo el catálogo persistido
+    if repositorio is not None:
+        with st.expander("🔎 Consultar Catálogo"):
+            col_q1, col_q2 = st.columns(2)
+            componente_q = col_q1.selectbox("Actividades del componente:", repositorio.componentes(), key="consulta_componente")
+            if componente_q:
+                col_q1.dataframe(repositorio.actividades_por_componente(componente_q), use_container_width=True, hide_index=True)
+            recurso_q = col_q2.selectbox("Modelos que usan el recurso:", repositorio.recursos(), key="consulta_recurso")
+            if recurso_q:
+                col_q2.write(", ".join(repositorio.modelos_por_recurso(recurso_q)))
 
 # --- TAB 4: ANÁLISIS DE CAPACIDAD ---
-with tab_capacidad:
-    st.markdown("### 📊 Análisis de Capacidad Multi-Modelo")
+with tab_capacidad, tramo('capacidad'):
+    st.markdown(f"### 📊 Análisis de Capacidad Multi-Modelo ({semana_sel})")
     
     # Mostrar tabla detallada
     if carga_total:
@@ -437,133 +645,438 @@ with tab_capacidad:
             st.success("✅ Todos los recursos tienen capacidad suficiente")
     else:
         st.info("Configura demanda en el tab Planificación")
+    
+    with st.expander("🧮 Optimizar Turnos y Máquinas", expanded=bool(carga_total) and not sobrecargas.empty):
+        st.caption("Busca, por recurso y semana, la combinación más barata de turnos y máquinas en paralelo "
+                   "que deja la utilización bajo el objetivo. Usa los días y horas por turno de la barra lateral.")
+        col_op1, col_op2, col_op3, col_op4, col_op5 = st.columns(5)
+        objetivo_opt = col_op1.number_input("Utilización objetivo %", 10, 100, UMBRAL_ALERTA, key="objetivo_opt")
+        turnos_max_opt = col_op2.number_input("Turnos máx.", 1, 3, 3, key="turnos_max_opt")
+        maquinas_max_opt = col_op3.number_input("Máquinas máx.", 1, 50, 10, key="maquinas_max_opt")
+        costo_turno_opt = col_op4.number_input("Costo máquina-turno", 0.0, 1e6, COSTO_TURNO, key="costo_turno_opt",
+                                               help="Costo semanal de operar una máquina durante un turno")
+        costo_maquina_opt = col_op5.number_input("Costo máquina extra", 0.0, 1e6, COSTO_MAQUINA, key="costo_maquina_opt",
+                                                 help="Costo semanal de cada máquina adicional a la disponible")
+        
+        parametros_opt = (dias_periodo, horas_dia, objetivo_opt, turnos_max_opt, maquinas_max_opt,
+                          costo_turno_opt, costo_maquina_opt)
+        optimizacion = cache.memoizar(
+            'optimizacion_capacidad', huella(huella_recetas, plan_ventana, parametros_opt),
+            lambda: optimizar_capacidad(*carga_por_semana(plan_ventana, st.session_state.recetas,
+                                                          matriz=matriz_carga), *parametros_opt)
+        )
+        df_opt = optimizacion.tabla()
+        df_opt_sem = df_opt[df_opt['Semana'] == semana_sel].drop(columns='Semana')
+        
+        if df_opt_sem.empty:
+            st.info(f"Sin carga en {semana_sel}")
+        else:
+            sin_solucion = df_opt_sem[~df_opt_sem['Factible']]
+            col_m1, col_m2, col_m3 = st.columns(3)
+            col_m1.metric(f"Costo {semana_sel}", f"{df_opt_sem['Costo'].sum():,.1f}")
+            col_m2.metric("Turnos máx. requeridos", int(df_opt_sem['Turnos'].max()))
+            col_m3.metric("Máquinas totales", int(df_opt_sem['Maquinas'].sum()))
+            st.dataframe(df_opt_sem, use_container_width=True, hide_index=True,
+                         column_config={"Utilizacion_%": st.column_config.NumberColumn("Utilización %", format="%.0f")})
+            if not sin_solucion.empty:
+                st.warning(f"{len(sin_solucion)} recursos no alcanzan el objetivo ni con {turnos_max_opt} turnos "
+                           f"y {maquinas_max_opt} máquinas: {', '.join(sin_solucion['Recurso'])}")
+        
+        st.markdown("**Resumen por semana**")
+        st.dataframe(optimizacion.resumen_semanal(), use_container_width=True, hide_index=True)
+        st.caption(f"{optimizacion.evaluadas:,} combinaciones evaluadas")
+    
+    st.divider()
+    st.subheader("🏭 Simulación de Planta (capacidad finita)")
+    st.caption("Simula todas las semanas del plan en secuencia Heijunka, liberando equipos a takt. "
+               "Los recursos se comparten entre actividades y equipos, por lo que aparecen colas reales.")
+    
+    col_sim1, col_sim2 = st.columns([2, 1])
+    with col_sim1:
+        df_maquinas = st.data_editor(
+            pd.DataFrame({'Recurso': matriz_carga.recursos, 'Máquinas': [1] * len(matriz_carga.recursos)}),
+            column_config={
+                "Recurso": st.column_config.TextColumn("Recurso", disabled=True),
+                "Máquinas": st.column_config.NumberColumn("Máquinas en paralelo", min_value=1, max_value=20, format="%d")
+            },
+            use_container_width=True, hide_index=True, key="maquinas_simulacion"
+        )
+    with col_sim2:
+        wip_limite = st.number_input("Límite WIP (0 = sin límite)", 0, 500, 0)
+        simular = st.button("▶️ Simular Planta", use_container_width=True)
+    
+    if simular:
+        turno_sim = turno_periodo
+        contenido_sim = {m: matriz_carga.minutos[i] for i, m in enumerate(matriz_carga.modelos)}
+        secuencia_sim, liberaciones_sim = secuencia_plan(st.session_state.plan_produccion, st.session_state.recetas,
+                                                         turno_sim, ventana_plan, contenido_sim)
+        if secuencia_sim:
+            argumentos_sim = (secuencia_sim, turno_sim, dict(zip(df_maquinas['Recurso'], df_maquinas['Máquinas'])),
+                              liberaciones_sim, wip_limite or None)
+            st.session_state.clave_planta = huella(huella_recetas, *argumentos_sim)
+            st.session_state.periodos_planta = list(ventana_plan)
+            servicio.solicitar('planta', st.session_state.clave_planta, simular_planta,
+                               preparar=lambda: (recetas_planas(secuencia_sim),) + argumentos_sim)
+        else:
+            st.warning("No hay demanda planificada")
+    
+    resultado_planta = None
+    if st.session_state.get('clave_planta') is not None:
+        resultado_planta = estado_en_fondo('planta', st.session_state.clave_planta, "Simulando planta...")
+    if resultado_planta is not None:
+        # La simulación arranca en el primer período de la ventana y puede terminar después de ella
+        throughput = resultado_planta.throughput_periodo
+        periodos_sim = st.session_state.periodos_planta[:len(throughput)]
+        periodos_sim += siguientes_periodos(periodos_sim, len(throughput) - len(periodos_sim))
+        unidad_sim = 'día' if granularidad_de(periodos_sim) == 'dia' else 'sem'
+        col_r1, col_r2, col_r3, col_r4 = st.columns(4)
+        col_r1.metric("Equipos terminados", f"{resultado_planta.completadas}",
+                      help=f"En {len(periodos_sim)} períodos simulados")
+        col_r2.metric("Throughput medio", f"{resultado_planta.completadas / max(len(periodos_sim), 1):.1f} /{unidad_sim}")
+        col_r3.metric("Lead Time medio", f"{np.nanmean(resultado_planta.lead_time_calendario) / 60:.1f} h",
+                      help="Tiempo calendario entre liberación y término")
+        col_r4.metric("WIP medio / máx.", f"{resultado_planta.wip_medio:.1f} / {resultado_planta.wip_max}")
+        
+        df_sim = pd.DataFrame({
+            'Recurso': resultado_planta.recursos,
+            'Utilización_%': resultado_planta.utilizacion * 100,
+            'Cola_Media': resultado_planta.cola_media,
+            'Cola_Máx': resultado_planta.cola_max
+        })
+        col_g1, col_g2 = st.columns(2)
+        col_g1.plotly_chart(px.bar(df_sim, x='Recurso', y='Cola_Media', title="Cola media por recurso"),
+                            use_container_width=True)
+        col_g2.plotly_chart(px.bar(x=periodos_sim, y=throughput, labels={'x': 'Período', 'y': 'Equipos'},
+                                   title="Equipos terminados por período"),
+                            use_container_width=True)
+        st.dataframe(df_sim, use_container_width=True, hide_index=True)
 
 # --- TAB 5: RED PERT (del modelo activo) ---
-with tab_pert:
-    familia_pert = get_familia_modelo(st.session_state.modelo_activo)
+with tab_pert, tramo('pert'):
+    familia_pert = familia_de.get(st.session_state.modelo_activo, "Otros")
     st.markdown(f"### 🕸️ Red PERT: Familia **{familia_pert}** - {st.session_state.modelo_activo}")
     
-    receta_activa = st.session_state.recetas[st.session_state.modelo_activo]
-    edited_df = pd.DataFrame(receta_activa)
-    
-    G = nx.DiGraph()
-    
-    for _, row in edited_df.iterrows():
-        G.add_node(row['ID'], duration=row['Duracion_Min'], desc=row['Actividad'])
+    edited_df = st.session_state.recetas[st.session_state.modelo_activo]
     
     try:
-        for _, row in edited_df.iterrows():
-            if pd.notna(row['Predecesores']) and str(row['Predecesores']).strip() != "":
-                preds = [p.strip() for p in str(row['Predecesores']).split(',')]
-                for p in preds:
-                    if p in G.nodes:
-                        G.add_edge(p, row['ID'])
+        huella_receta_activa = st.session_state.recetas.receta(st.session_state.modelo_activo).huella()
+        with tramo('pert.cpm'):
+            cpm = cache.memoizar('cpm', huella_receta_activa,
+                                 lambda: obtener_cpm_incremental(st.session_state.modelo_activo, edited_df))
+        red = cpm.red
+        ids = red.ids
+        descripciones = dict(zip(ids, edited_df['Actividad']))
+        duraciones = dict(zip(ids, cpm.duraciones))
+        ES = dict(zip(ids, cpm.es)); EF = dict(zip(ids, cpm.ef))
+        LS = dict(zip(ids, cpm.ls)); LF = dict(zip(ids, cpm.lf))
+        Slack = dict(zip(ids, cpm.holgura))
+        criticas = dict(zip(ids, cpm.critica))
+        project_duration = cpm.duracion_proyecto
+    except CicloError:
+        st.error("❌ Ciclo detectado en dependencias")
+    except Exception as e:
+        st.warning(f"Error en cálculo PERT: {e}")
+    else:
+        # KPIs
+        ruta_critica_ids = cpm.ruta_critica
         
-        if not nx.is_directed_acyclic_graph(G):
-            st.error("❌ Ciclo detectado en dependencias")
-        else:
-            # Cálculo CPM
-            ES = {}; EF = {}
-            for n in nx.topological_sort(G):
-                dur = G.nodes[n]['duration']
-                preds = list(G.predecessors(n))
-                start = max([EF[p] for p in preds]) if preds else 0
-                ES[n] = start
-                EF[n] = start + dur
+        col_k1, col_k2, col_k3 = st.columns(3)
+        col_k1.metric("🕐 Lead Time", f"{project_duration:.1f} min")
+        col_k2.metric("🔴 Tareas Críticas", f"{len(ruta_critica_ids)} de {len(ids)}")
+        col_k3.metric("🛣️ Ruta Crítica", " → ".join(ruta_critica_ids))
+        
+        sub_pert, sub_gantt, sub_datos, sub_modelos, sub_montecarlo, sub_rcpsp, sub_crashing = st.tabs(["🕸️ Red PERT", "📅 Gantt", "📋 Datos CPM", "📊 Comparativa Modelos", "🎲 Monte Carlo", "🏗️ Recursos Limitados", "⚡ Compresión"])
+        
+        with sub_pert, tramo('pert.red'):
+            col_v1, col_v2 = st.columns(2)
+            orientacion = col_v1.radio("Orientación:", ["Horizontal", "Vertical (Móvil)"], horizontal=True)
+            rankdir_val = 'TB' if 'Vertical' in orientacion else 'LR'
+            vista_sel = col_v2.selectbox("Nivel de detalle:", list(VISTAS), format_func=VISTAS.get, key="vista_pert")
+            nodo_sel, radio_sel = None, 1
+            if vista_sel == 'vecindario':
+                col_n1, col_n2 = st.columns(2)
+                nodo_sel = col_n1.selectbox("Actividad:", ids, key="nodo_vecindario")
+                radio_sel = col_n2.slider("Radio (saltos)", 1, 5, 1, key="radio_vecindario")
             
-            project_duration = max(EF.values()) if EF else 0
+            with tramo('pert.red.dot'):
+                fuente_red, n_nodos_vista = cache.memoizar(
+                    'pert_dot', huella(huella_receta_activa, rankdir_val, vista_sel, nodo_sel, radio_sel),
+                    lambda: fuente_pert(cpm, edited_df, vista_sel, rankdir_val, nodo_sel, radio_sel)
+                )
+            if n_nodos_vista <= MAX_NODOS_EN_PAGINA:
+                st.graphviz_chart(fuente_red, use_container_width=True)
+            else:
+                st.info(f"La vista tiene {n_nodos_vista} nodos: elige una vista agrupada, la ruta crítica o un vecindario, "
+                        "o genera el SVG para verla completa.")
+            st.caption("🟠 Naranja: Cuello de Botella | 🔴 Rojo: Ruta Crítica")
             
-            LS = {}; LF = {}; Slack = {}
-            for n in reversed(list(nx.topological_sort(G))):
-                dur = G.nodes[n]['duration']
-                succs = list(G.successors(n))
-                finish = min([LS[s] for s in succs]) if succs else project_duration
-                LF[n] = finish
-                LS[n] = finish - dur
-                Slack[n] = LS[n] - ES[n]
-                G.nodes[n]['Critical'] = (abs(Slack[n]) < 0.001)
+            # Exportación bajo pedido, generada en segundo plano
+            estados = {fmt: exportador.estado(fuente_red, fmt) for fmt in ('png', 'svg')}
+            if all(estado is None for estado, _ in estados.values()):
+                if st.button("🖼️ Generar PNG/SVG", key="exportar_pert"):
+                    for fmt in estados:
+                        exportador.solicitar(fuente_red, fmt)
+                    st.rerun()
+            else:
+                col_d1, col_d2, col_d3 = st.columns(3)
+                for col, (fmt, mime) in zip((col_d1, col_d2), (('png', 'image/png'), ('svg', 'image/svg+xml'))):
+                    estado, datos = estados[fmt]
+                    if estado == 'listo':
+                        col.download_button(f"⬇️ Descargar Red PERT ({fmt.upper()})", data=datos,
+                                            file_name=f"pert_{st.session_state.modelo_activo}_{vista_sel}.{fmt}", mime=mime)
+                    elif estado == 'pendiente':
+                        col.caption(f"⏳ Generando {fmt.upper()}...")
+                    else:
+                        col.caption("ℹ️ Instala Graphviz para descargar PNG/SVG")
+                if any(estado == 'pendiente' for estado, _ in estados.values()):
+                    col_d3.button("🔄 Actualizar", key="refrescar_exportacion")
+        
+        with sub_gantt, tramo('pert.gantt'):
+            gantt_data = []
+            for n in ids:
+                gantt_data.append({
+                    'Tarea': f"{n} - {descripciones[n]}",
+                    'Inicio': ES[n],
+                    'Fin': EF[n],
+                    'Duración': duraciones[n],
+                    'Crítica': 'Sí' if criticas[n] else 'No'
+                })
             
-            # KPIs
-            ruta_critica_ids = [n for n in G.nodes if G.nodes[n]['Critical']]
+            df_gantt = pd.DataFrame(gantt_data)
             
-            col_k1, col_k2, col_k3 = st.columns(3)
-            col_k1.metric("🕐 Lead Time", f"{project_duration:.1f} min")
-            col_k2.metric("🔴 Tareas Críticas", f"{len(ruta_critica_ids)} de {len(G.nodes)}")
-            col_k3.metric("🛣️ Ruta Crítica", " → ".join(ruta_critica_ids))
+            if not df_gantt.empty:
+                fig_gantt = px.bar(
+                    df_gantt, 
+                    x='Duración', 
+                    y='Tarea', 
+                    base='Inicio',
+                    orientation='h',
+                    color='Crítica',
+                    color_discrete_map={'Sí': '#ff4b4b', 'No': '#adb5bd'},
+                    title=f"Cronograma: {st.session_state.modelo_activo}"
+                )
+                fig_gantt.update_layout(xaxis_title="Minutos Acumulados")
+                st.plotly_chart(fig_gantt, use_container_width=True)
+        
+        with sub_datos, tramo('pert.datos'):
+            tabla_cpm = []
+            for n in ids:
+                tabla_cpm.append({
+                    'ID': n, 'Actividad': descripciones[n],
+                    'Duración': duraciones[n],
+                    'ES': ES[n], 'EF': EF[n], 'LS': LS[n], 'LF': LF[n],
+                    'Holgura': Slack[n],
+                    '¿Crítica?': '✅' if criticas[n] else '❌'
+                })
+            st.dataframe(tabla_cpm, use_container_width=True, hide_index=True)
+        
+        with sub_modelos, tramo('pert.modelos'):
+            try:
+                resultados_modelos = resultado_en_fondo('cpm_modelos', huella_recetas, cpm_modelos,
+                                                        preparar=lambda: (recetas_planas(),),
+                                                        mensaje="Calculando CPM de todos los modelos...")
+            except Exception as e:
+                st.warning(f"No se pudo comparar modelos: {e}")
+            else:
+                if resultados_modelos is not None:
+                    df_modelos = pd.DataFrame([
+                        {
+                            'Modelo': modelo,
+                            'Familia': familia_de.get(modelo, "Otros"),
+                            'Lead Time (min)': res.duracion_proyecto,
+                            'Tareas Críticas': int(res.critica.sum()),
+                            'Ruta Crítica': " → ".join(res.ruta_critica)
+                        }
+                        for modelo, res in resultados_modelos.items()
+                    ])
+                    st.dataframe(df_modelos, use_container_width=True, hide_index=True)
+                    fig_modelos = px.bar(df_modelos, x='Modelo', y='Lead Time (min)', color='Familia',
+                                         title="Lead Time por Modelo")
+                    st.plotly_chart(fig_modelos, use_container_width=True)
+        
+        with sub_montecarlo, tramo('pert.montecarlo'):
+            st.caption("Usa las columnas opcionales Duracion_Opt / Duracion_Prob / Duracion_Pes de la receta. "
+                       "Las actividades sin estimación usan Duracion_Min ± la variabilidad indicada.")
+            col_mc1, col_mc2, col_mc3 = st.columns(3)
+            distribucion_mc = col_mc1.selectbox("Distribución:", ["beta", "triangular"],
+                                                format_func=lambda x: "Beta-PERT" if x == "beta" else "Triangular")
+            iteraciones_mc = col_mc2.select_slider("Iteraciones:", options=[1_000, 10_000, 100_000, 1_000_000], value=10_000)
+            variabilidad_mc = col_mc3.slider("Variabilidad por defecto (±%)", 0, 50, 10) / 100
             
-            sub_pert, sub_gantt, sub_datos = st.tabs(["🕸️ Red PERT", "📅 Gantt", "📋 Datos CPM"])
+            if st.button("▶️ Simular", key="simular_montecarlo"):
+                from simulacion_pert import simular_pert
+                # En el pool compartido corre en un solo proceso para no acaparar los núcleos
+                clave_mc = huella(huella_receta_activa, iteraciones_mc, distribucion_mc, variabilidad_mc)
+                st.session_state.clave_montecarlo = (st.session_state.modelo_activo, clave_mc)
+                servicio.solicitar('montecarlo', clave_mc, simular_pert, edited_df, iteraciones_mc,
+                                   distribucion_mc, variabilidad_mc, None, 1)
             
-            with sub_pert:
-                orientacion = st.radio("Orientación:", ["Horizontal", "Vertical (Móvil)"], horizontal=True)
-                rankdir_val = 'TB' if 'Vertical' in orientacion else 'LR'
-                
-                nodos_dur = {n: G.nodes[n]['duration'] for n in G.nodes}
-                cb_id = max(nodos_dur, key=nodos_dur.get)
-                
-                viz = graphviz.Digraph()
-                viz.attr(rankdir=rankdir_val, splines='ortho', nodesep='0.6')
-                viz.attr('node', shape='record', style='filled', fontname='Arial', fontsize='10')
-                
-                for n in G.nodes:
-                    d = G.nodes[n]
-                    color = '#ffcccc' if d['Critical'] else '#f0f0f0'
-                    if n == cb_id:
-                        color = '#ffe0b2'
-                    penwidth = '3.0' if d['Critical'] else '1.0'
-                    label = f"{{ {n}: {d['desc']} | {d['duration']:.1f} min }} | {{ ES: {ES[n]:.1f} | EF: {EF[n]:.1f} }} | {{ LS: {LS[n]:.1f} | LF: {LF[n]:.1f} }}"
-                    viz.node(n, label=label, fillcolor=color, penwidth=penwidth, color='red' if d['Critical'] else 'black')
-                
-                for u, v in G.edges():
-                    is_crit = G.nodes[u]['Critical'] and G.nodes[v]['Critical']
-                    viz.edge(u, v, color='red' if is_crit else 'gray', penwidth='2.0' if is_crit else '1.0')
-                
-                st.graphviz_chart(viz, use_container_width=True)
-                st.caption("🟠 Naranja: Cuello de Botella | 🔴 Rojo: Ruta Crítica")
-                
+            modelo_mc, clave_mc = st.session_state.get('clave_montecarlo', (None, None))
+            resultado_mc = None
+            if clave_mc is not None and modelo_mc == st.session_state.modelo_activo:
                 try:
-                    png_data = viz.pipe(format='png')
-                    st.download_button("⬇️ Descargar Red PERT (PNG)", data=png_data, file_name=f"pert_{st.session_state.modelo_activo}.png", mime="image/png")
-                except Exception:
-                    st.caption("ℹ️ Instala Graphviz para descargar PNG")
-            
-            with sub_gantt:
-                gantt_data = []
-                for n in G.nodes:
-                    gantt_data.append({
-                        'Tarea': f"{n} - {G.nodes[n]['desc']}",
-                        'Inicio': ES[n],
-                        'Fin': EF[n],
-                        'Duración': G.nodes[n]['duration'],
-                        'Crítica': 'Sí' if G.nodes[n]['Critical'] else 'No'
-                    })
+                    resultado_mc = estado_en_fondo('montecarlo', clave_mc, "Simulando Monte Carlo...")
+                except ValueError as e:
+                    st.warning(f"Error en simulación: {e}")
+            if resultado_mc is not None:
+                col_p1, col_p2, col_p3, col_p4 = st.columns(4)
+                col_p1.metric("P50", f"{resultado_mc.percentiles['P50']:.1f} min")
+                col_p2.metric("P80", f"{resultado_mc.percentiles['P80']:.1f} min")
+                col_p3.metric("P95", f"{resultado_mc.percentiles['P95']:.1f} min")
+                col_p4.metric("Determinístico", f"{project_duration:.1f} min")
                 
-                df_gantt = pd.DataFrame(gantt_data)
+                conteos, bordes = np.histogram(resultado_mc.lead_times, bins=60)
+                fig_mc = go.Figure(go.Bar(x=(bordes[:-1] + bordes[1:]) / 2, y=conteos, marker_color='#1f77b4'))
+                for nombre_p, valor_p in resultado_mc.percentiles.items():
+                    fig_mc.add_vline(x=valor_p, line_dash='dash', annotation_text=nombre_p)
+                fig_mc.update_layout(xaxis_title="Lead Time (min)", yaxis_title="Frecuencia",
+                                     title=f"Distribución de Lead Time ({resultado_mc.iteraciones:,} iteraciones)")
+                st.plotly_chart(fig_mc, use_container_width=True)
                 
-                if not df_gantt.empty:
-                    fig_gantt = px.bar(
-                        df_gantt, 
-                        x='Duración', 
-                        y='Tarea', 
-                        base='Inicio',
-                        orientation='h',
-                        color='Crítica',
-                        color_discrete_map={'Sí': '#ff4b4b', 'No': '#adb5bd'},
-                        title=f"Cronograma: {st.session_state.modelo_activo}"
+                df_criticidad = pd.DataFrame({
+                    'ID': resultado_mc.ids,
+                    'Actividad': [descripciones[n] for n in resultado_mc.ids],
+                    'Índice de Criticidad': resultado_mc.indice_criticidad
+                })
+                st.dataframe(df_criticidad.sort_values('Índice de Criticidad', ascending=False),
+                             use_container_width=True, hide_index=True,
+                             column_config={"Índice de Criticidad": st.column_config.ProgressColumn(
+                                 "Índice de Criticidad", min_value=0.0, max_value=1.0, format="%.2f")})
+        
+        with sub_rcpsp, tramo('pert.rcpsp'):
+            st.caption("Programa respetando que cada máquina atiende una actividad a la vez "
+                       "(máquinas por recurso según la tabla de Simulación de Planta).")
+            col_rc1, col_rc2, col_rc3, col_rc4 = st.columns(4)
+            regla_rc = col_rc1.selectbox("Regla de prioridad:", list(REGLAS), format_func=lambda r: f"{r} - {REGLAS[r]}")
+            esquema_rc = col_rc2.selectbox("Esquema:", ["serie", "paralelo"], format_func=str.capitalize)
+            origen_rc = col_rc3.selectbox("Lote:", ["Modelo activo", f"Secuencia {semana_sel}"])
+            unidades_rc = col_rc4.number_input("Unidades", 1, 500, 1, disabled=origen_rc != "Modelo activo")
+            mejorar_rc = st.checkbox("Mejorar con justificación adelante-atrás", value=True)
+            
+            if origen_rc == "Modelo activo":
+                secuencia_rc = [st.session_state.modelo_activo] * int(unidades_rc)
+            else:
+                secuencia_rc = secuencia_plan(st.session_state.plan_produccion, st.session_state.recetas,
+                                              turno_periodo, [semana_sel])[0]
+            
+            if secuencia_rc:
+                maquinas_rc = dict(zip(df_maquinas['Recurso'], df_maquinas['Máquinas']))
+                programa = resultado_en_fondo(
+                    'rcpsp', huella(huella_recetas, secuencia_rc, maquinas_rc, regla_rc, esquema_rc, mejorar_rc),
+                    programar_rcpsp, mensaje="Programando con recursos limitados...",
+                    preparar=lambda: (recetas_planas(secuencia_rc), secuencia_rc, maquinas_rc,
+                                      regla_rc, esquema_rc, mejorar_rc)
+                )
+                if programa is not None:
+                    col_m1, col_m2 = st.columns(2)
+                    col_m1.metric("Makespan con recursos", f"{programa.makespan:.1f} min",
+                                  delta=f"{programa.makespan - project_duration:+.1f} vs CPM", delta_color="inverse")
+                    col_m2.metric("Unidades programadas", f"{len(secuencia_rc)}")
+                    
+                    df_programa = programa.tabla()
+                    df_programa['Tarea'] = df_programa['Recurso'] + " #" + df_programa['Máquina'].astype(str)
+                    fig_rc = px.bar(
+                        df_programa, x='Duración', y='Tarea', base='Inicio', orientation='h', color='Modelo',
+                        hover_data=['Unidad', 'ID'], title="Ocupación de máquinas"
                     )
-                    fig_gantt.update_layout(xaxis_title="Minutos Acumulados")
-                    st.plotly_chart(fig_gantt, use_container_width=True)
+                    fig_rc.update_layout(xaxis_title="Minutos", yaxis={'categoryorder': 'category descending'})
+                    st.plotly_chart(fig_rc, use_container_width=True)
+            else:
+                st.info(f"Sin producción en {semana_sel}")
+        
+        with sub_crashing, tramo('pert.crashing'):
+            st.caption("Usa las columnas opcionales Duracion_Crash (duración mínima) y Costo_Crash (costo por minuto "
+                       "acortado) de la receta; las actividades sin ellas usan los valores por defecto indicados.")
+            col_cr1, col_cr2, col_cr3 = st.columns(3)
+            reduccion_cr = col_cr1.slider("Reducción máxima por defecto (%)", 0, 90, int(REDUCCION_MAXIMA * 100), 5) / 100
+            costo_cr = col_cr2.number_input("Costo por minuto por defecto", 0.0, 1e6, COSTO_MINUTO, 0.5)
+            objetivo_cr = col_cr3.number_input("Lead Time objetivo (0 = mínimo posible)", 0.0, float(project_duration),
+                                               0.0, 10.0)
             
-            with sub_datos:
-                tabla_cpm = []
-                for n in G.nodes:
-                    tabla_cpm.append({
-                        'ID': n, 'Actividad': G.nodes[n]['desc'],
-                        'Duración': G.nodes[n]['duration'],
-                        'ES': ES[n], 'EF': EF[n], 'LS': LS[n], 'LF': LF[n],
-                        'Holgura': Slack[n],
-                        '¿Crítica?': '✅' if G.nodes[n]['Critical'] else '❌'
-                    })
-                st.dataframe(tabla_cpm, use_container_width=True, hide_index=True)
-    
-    except Exception as e:
-        st.warning(f"Error en cálculo PERT: {e}")
+            try:
+                normal_cr, minima_cr, costo_act_cr = limites_crash(edited_df, reduccion_cr, costo_cr)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+            else:
+                curva = resultado_en_fondo(
+                    'crashing', huella(huella_receta_activa, minima_cr, costo_act_cr, objetivo_cr),
+                    curva_crashing, edited_df, minima_cr, costo_act_cr, objetivo_cr,
+                    mensaje="Calculando curva tiempo-costo..."
+                )
+                if curva is not None:
+                    df_curva = curva.tabla()
+                    col_cm1, col_cm2, col_cm3 = st.columns(3)
+                    col_cm1.metric("Lead Time comprimido", f"{curva.lead_time_minimo:.1f} min",
+                                   delta=f"{curva.lead_time_minimo - project_duration:+.1f}", delta_color="inverse")
+                    col_cm2.metric("Costo total", f"{df_curva['Costo_Acumulado'].iloc[-1]:,.1f}")
+                    col_cm3.metric("Pasos", len(df_curva) - 1, help=curva.motivo)
+                    
+                    fig_curva = px.line(df_curva, x='Lead_Time', y='Costo_Acumulado', markers=True,
+                                        hover_data=['Paso', 'Acortadas', 'Alargadas'], title="Curva Tiempo-Costo")
+                    fig_curva.update_layout(xaxis_title="Lead Time (min)", yaxis_title="Costo acumulado",
+                                            xaxis_autorange='reversed')
+                    st.plotly_chart(fig_curva, use_container_width=True)
+                    
+                    if len(df_curva) > 1:
+                        punto_cr = st.select_slider("Punto de la curva:", options=list(range(len(df_curva))),
+                                                    value=len(df_curva) - 1,
+                                                    format_func=lambda k: f"{df_curva['Lead_Time'].iloc[k]:.1f} min")
+                        st.dataframe(curva.acortamientos(punto_cr), use_container_width=True, hide_index=True)
+                    with st.expander("Pasos de la compresión"):
+                        st.dataframe(df_curva, use_container_width=True, hide_index=True)
+            
+            st.divider()
+            st.markdown("#### 🎯 Sensibilidad en todos los modelos")
+            fraccion_sens = st.slider("Acortamiento evaluado por actividad (%)", 5, 100, 10, 5,
+                                      help="Cada actividad se acorta este porcentaje, una a la vez") / 100
+            sensibilidad = resultado_en_fondo(
+                'sensibilidad', huella(huella_recetas, fraccion_sens),
+                sensibilidad_modelos, preparar=lambda: (recetas_planas(), fraccion_sens),
+                mensaje="Evaluando sensibilidad de todos los modelos..."
+            )
+            if sensibilidad is not None:
+                impacto = sensibilidad[sensibilidad['Reduccion_Lead_Time'] > TOLERANCIA_CRITICA]
+                if impacto.empty:
+                    st.info("Ninguna actividad acorta el Lead Time")
+                else:
+                    matriz_sens = impacto.pivot_table(index='Modelo', columns='ID', values='Reduccion_Lead_Time',
+                                                      aggfunc='sum', fill_value=0.0)
+                    fig_sens = px.imshow(matriz_sens, aspect='auto', color_continuous_scale='Reds',
+                                         labels={'color': 'Min. ganados'},
+                                         title="Minutos de Lead Time ganados al acortar cada actividad")
+                    st.plotly_chart(fig_sens, use_container_width=True)
+                    st.dataframe(impacto.sort_values('Reduccion_Lead_Time', ascending=False),
+                                 use_container_width=True, hide_index=True,
+                                 column_config={"Sensibilidad": st.column_config.ProgressColumn(
+                                     "Sensibilidad", min_value=0.0, max_value=1.0, format="%.2f")})
+
+# --- PERFIL DE EJECUCIÓN (sólo con PERT_PERFIL) ---
+corrida = terminar_corrida()
+if corrida is not None:
+    perfil_sesion = st.session_state.perfil_sesion
+    with st.sidebar.expander("🩺 Perfil de Ejecución"):
+        st.metric("Último rerun", f"{corrida.total_ms:.0f} ms", help=f"Sesión {perfil_sesion.sesion}")
+        st.dataframe(pd.DataFrame([
+            {'Tramo': '· ' * t.profundidad + t.nombre, 'ms': t.duracion_ns / 1e6,
+             'Memoria_KB': None if t.memoria_pico is None else t.memoria_pico / 1024}
+            for t in corrida.tramos
+        ]), use_container_width=True, hide_index=True)
+        if PERFIL_CON_MEMORIA:
+            st.caption("Memoria_KB es el pico del proceso (tracemalloc): incluye lo que asignen otros hilos "
+                       "y sesiones fuera de sus tramos medidos.")
+        st.markdown("**Acumulado de la sesión**")
+        st.dataframe(pd.DataFrame(perfil_sesion.tabla()), use_container_width=True, hide_index=True)
+        st.markdown("**Reruns más lentos**")
+        st.dataframe(pd.DataFrame([
+            {'Inicio': pd.Timestamp(c.inicio, unit='s').strftime('%H:%M:%S'), 'ms': c.total_ms,
+             'Tramo más lento': max(c.tramos, key=lambda t: t.duracion_ns).nombre if c.tramos else '',
+             'Completo': c.terminada}
+            for c in perfil_sesion.peores()
+        ]), use_container_width=True, hide_index=True)
+        col_pe1, col_pe2 = st.columns(2)
+        col_pe1.download_button("⬇️ JSONL", a_jsonl(perfil_sesion.corridas), file_name="perfil_pert.jsonl",
+                                mime="application/json")
+        col_pe2.download_button("⬇️ Chrome Trace", a_chrome_trace(perfil_sesion.corridas),
+                                file_name="perfil_pert_trace.json", mime="application/json")
+        if st.button("🧹 Limpiar", key="limpiar_perfil"):
+            perfil_sesion.limpiar()
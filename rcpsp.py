@@ -0,0 +1,271 @@
+# Programación con recursos limitados (RCPSP)
+# Cada actividad ocupa una máquina de su Recurso durante toda su duración. Se
+# programan lotes de unidades (una receta por unidad) con esquemas de
+# generación serie o paralelo guiados por reglas de prioridad, y una fase
+# opcional de justificación adelante-atrás que compacta el cronograma.
+# Cada máquina guarda sus intervalos ocupados ordenados (búsqueda con bisect)
+# para encontrar huecos sin recorrer toda la línea de tiempo.
+
+import heapq
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+from motor_cpm import calcular_cpm, compilar_receta, leer_columna
+
+REGLAS = {
+    'LFT': "Menor fin tardío (LF)",
+    'LST': "Menor inicio tardío (LS)",
+    'MTS': "Más sucesores totales",
+    'GRPW': "Mayor peso posicional (duración + sucesores directos)",
+    'SPT': "Menor duración",
+    'EST': "Menor inicio temprano (ES)",
+}
+ESQUEMAS = ('serie', 'paralelo')
+
+
+def _valores_regla(red, cpm, regla):
+    """Valor por actividad de la receta; menor = más prioritario"""
+    d = cpm.duraciones
+    if regla == 'LFT':
+        return cpm.lf
+    if regla == 'LST':
+        return cpm.ls
+    if regla == 'EST':
+        return cpm.es
+    if regla == 'SPT':
+        return d
+    if regla == 'GRPW':
+        return -np.array([d[i] + d[red.sucesores(i)].sum() for i in range(red.n)])
+    if regla == 'MTS':
+        # Sucesores transitivos con bitsets, en orden topológico inverso
+        alcance = [0] * red.n
+        for i in red.orden[::-1]:
+            for s in red.sucesores(i):
+                alcance[i] |= alcance[s] | (1 << int(s))
+        return -np.array([bin(a).count('1') for a in alcance], dtype=np.float64)
+    raise ValueError(f"Regla desconocida: {regla}")
+
+
+class _Lote:
+    """Red plana de todas las unidades (CSR global), recursos y prioridades"""
+
+    def __init__(self, recetas, secuencia, regla):
+        plantillas = {}
+        codigo_recurso = {}
+        for modelo in dict.fromkeys(secuencia):
+            red = compilar_receta(recetas[modelo])
+            cpm = calcular_cpm(red)
+            recursos = [codigo_recurso.setdefault(r, len(codigo_recurso))
+                        for r in leer_columna(recetas[modelo], 'Recurso')]
+            plantillas[modelo] = (red, np.nan_to_num(cpm.duraciones), np.array(recursos, dtype=np.int64),
+                                  _valores_regla(red, cpm, regla))
+        self.recursos = list(codigo_recurso)
+
+        partes = [plantillas[m] for m in secuencia]
+        tamanos = np.array([p[0].n for p in partes], dtype=np.int64)
+        self.offset = np.concatenate(([0], np.cumsum(tamanos)))
+        self.n = int(self.offset[-1])
+        self.unidad = np.repeat(np.arange(len(secuencia)), tamanos)
+        self.actividad = np.concatenate([np.arange(p[0].n) for p in partes]) if partes else np.zeros(0, np.int64)
+        self.ids = [i for p in partes for i in p[0].ids]
+        self.duracion = np.concatenate([p[1] for p in partes]) if partes else np.zeros(0)
+        self.recurso = np.concatenate([p[2] for p in partes]) if partes else np.zeros(0, np.int64)
+        valor = np.concatenate([p[3] for p in partes]) if partes else np.zeros(0)
+        # Prioridad global: valor de la regla y, a igualdad, la unidad que va antes en la secuencia
+        self.prioridad = np.empty(self.n, dtype=np.int64)
+        self.prioridad[np.lexsort((self.actividad, self.unidad, valor))] = np.arange(self.n)
+
+        self.preds = self._csr_global(partes, 'pred')
+        self.succs = self._csr_global(partes, 'succ')
+
+    def _csr_global(self, partes, tipo):
+        if not partes:
+            return np.zeros(1, np.int64), np.zeros(0, np.int64)
+        punteros = [np.zeros(1, np.int64)]
+        indices = []
+        base_ptr = 0
+        for o, p in zip(self.offset[:-1], partes):
+            ptr, idx = getattr(p[0], f'{tipo}_ptr'), getattr(p[0], f'{tipo}_idx')
+            punteros.append(ptr[1:] + base_ptr)
+            indices.append(idx + o)
+            base_ptr += ptr[-1]
+        return np.concatenate(punteros), np.concatenate(indices)
+
+
+class _LineaMaquina:
+    """Intervalos ocupados de una máquina, ordenados por inicio"""
+
+    __slots__ = ('inicios', 'fines')
+
+    def __init__(self):
+        self.inicios = []
+        self.fines = []
+
+    def primer_hueco(self, desde, duracion):
+        """(inicio, posición) del primer hueco de largo duracion a partir de desde"""
+        i = bisect_right(self.fines, desde)
+        t = desde
+        while i < len(self.inicios) and self.inicios[i] < t + duracion:
+            t = max(t, self.fines[i])
+            i += 1
+        return t, i
+
+    def ocupar(self, posicion, inicio, fin):
+        self.inicios.insert(posicion, inicio)
+        self.fines.insert(posicion, fin)
+
+
+def _sgs_serie(n, preds, succs, duracion, recurso, capacidad, prioridad, liberacion):
+    """Esquema serie: programa cada actividad elegible en el primer hueco factible"""
+    pred_ptr, pred_idx = preds
+    succ_ptr, succ_idx = succs
+    pendientes = np.diff(pred_ptr).copy()
+    inicio = np.zeros(n)
+    fin = np.zeros(n)
+    maquina = np.zeros(n, dtype=np.int64)
+    lineas = [[_LineaMaquina() for _ in range(c)] for c in capacidad]
+
+    elegibles = [(prioridad[j], j) for j in np.flatnonzero(pendientes == 0)]
+    heapq.heapify(elegibles)
+    while elegibles:
+        _, j = heapq.heappop(elegibles)
+        desde = liberacion[j]
+        for p in pred_idx[pred_ptr[j]:pred_ptr[j + 1]]:
+            desde = max(desde, fin[p])
+        mejor = None
+        for k, linea in enumerate(lineas[recurso[j]]):
+            t, pos = linea.primer_hueco(desde, duracion[j])
+            if mejor is None or t < mejor[0]:
+                mejor = (t, pos, k)
+        t, pos, k = mejor
+        lineas[recurso[j]][k].ocupar(pos, t, t + duracion[j])
+        inicio[j], fin[j], maquina[j] = t, t + duracion[j], k
+        for s in succ_idx[succ_ptr[j]:succ_ptr[j + 1]]:
+            pendientes[s] -= 1
+            if pendientes[s] == 0:
+                heapq.heappush(elegibles, (prioridad[s], s))
+    return inicio, fin, maquina
+
+
+def _sgs_paralelo(n, preds, succs, duracion, recurso, capacidad, prioridad, liberacion):
+    """Esquema paralelo: avanza en el tiempo y arranca lo elegible mientras haya máquinas libres"""
+    pred_ptr, pred_idx = preds
+    succ_ptr, succ_idx = succs
+    pendientes = np.diff(pred_ptr).copy()
+    inicio = np.zeros(n)
+    fin = np.zeros(n)
+    maquina = np.zeros(n, dtype=np.int64)
+    libres = [list(range(c)) for c in capacidad]
+    colas = [[] for _ in capacidad]  # por recurso: (prioridad, actividad)
+    eventos = []  # (tiempo, tipo, actividad): tipo 0 = fin, 1 = disponible (liberación)
+
+    for j in np.flatnonzero(pendientes == 0):
+        heapq.heappush(eventos, (liberacion[j], 1, j))
+    while eventos:
+        t = eventos[0][0]
+        tocados = set()
+        while eventos and eventos[0][0] == t:
+            _, tipo, j = heapq.heappop(eventos)
+            if tipo == 0:
+                heapq.heappush(libres[recurso[j]], maquina[j])
+                tocados.add(recurso[j])
+                for s in succ_idx[succ_ptr[j]:succ_ptr[j + 1]]:
+                    pendientes[s] -= 1
+                    if pendientes[s] == 0:
+                        heapq.heappush(eventos, (max(t, liberacion[s]), 1, s))
+            else:
+                heapq.heappush(colas[recurso[j]], (prioridad[j], j))
+                tocados.add(recurso[j])
+        for r in tocados:
+            while libres[r] and colas[r]:
+                _, j = heapq.heappop(colas[r])
+                k = heapq.heappop(libres[r])
+                inicio[j], fin[j], maquina[j] = t, t + duracion[j], k
+                heapq.heappush(eventos, (fin[j], 0, j))
+    return inicio, fin, maquina
+
+
+def _rango(valores):
+    r = np.empty(len(valores), dtype=np.int64)
+    r[np.argsort(valores, kind='stable')] = np.arange(len(valores))
+    return r
+
+
+def _justificar(lote, capacidad, inicio, fin, liberacion, max_iter):
+    """Justificación adelante-atrás: alinea a la derecha y luego a la izquierda hasta no mejorar"""
+    sin_liberacion = np.zeros(lote.n)
+    mejor = (inicio, fin, None)
+    makespan = fin.max()
+    for _ in range(max_iter):
+        # Atrás: red invertida, prioridad por fin decreciente
+        ini_r, fin_r, _ = _sgs_serie(lote.n, lote.succs, lote.preds, lote.duracion, lote.recurso, capacidad,
+                                     _rango(-mejor[1]), sin_liberacion)
+        fin_der = makespan - ini_r
+        ini_der = fin_der - lote.duracion
+        # Adelante: prioridad por inicio creciente del cronograma alineado a la derecha
+        ini, fn, maq = _sgs_serie(lote.n, lote.preds, lote.succs, lote.duracion, lote.recurso, capacidad,
+                                  _rango(ini_der), liberacion)
+        if fn.max() >= makespan - 1e-9:
+            break
+        mejor = (ini, fn, maq)
+        makespan = fn.max()
+    return mejor
+
+
+class ResultadoRCPSP:
+    """Cronograma factible con recursos limitados"""
+
+    def __init__(self, lote, secuencia, inicio, fin, maquina, regla, esquema):
+        self.lote = lote
+        self.secuencia = secuencia
+        self.inicio = inicio
+        self.fin = fin
+        self.maquina = maquina
+        self.regla = regla
+        self.esquema = esquema
+        self.makespan = float(fin.max()) if fin.size else 0.0
+
+    def fin_unidades(self):
+        """Minuto de término de cada unidad"""
+        return np.maximum.reduceat(self.fin, self.lote.offset[:-1]) if self.fin.size else np.zeros(0)
+
+    def tabla(self):
+        lote = self.lote
+        return pd.DataFrame({
+            'Unidad': lote.unidad + 1,
+            'Modelo': [self.secuencia[u] for u in lote.unidad],
+            'ID': lote.ids,
+            'Recurso': [lote.recursos[r] for r in lote.recurso],
+            'Máquina': self.maquina + 1,
+            'Inicio': self.inicio,
+            'Fin': self.fin,
+            'Duración': lote.duracion,
+        })
+
+
+def programar_rcpsp(recetas, secuencia, maquinas=None, regla='LFT', esquema='serie',
+                    mejorar=True, max_iter_mejora=5, liberaciones=None):
+    """Programa las unidades de la secuencia respetando precedencias y máquinas por recurso.
+
+    maquinas: {recurso: cantidad} (1 por defecto). liberaciones: minuto más
+    temprano de inicio de cada unidad.
+    """
+    if esquema not in ESQUEMAS:
+        raise ValueError(f"Esquema desconocido: {esquema}")
+    maquinas = {} if maquinas is None else maquinas
+    secuencia = list(secuencia)
+    lote = _Lote(recetas, secuencia, regla)
+    capacidad = [max(1, int(maquinas.get(r, 1))) for r in lote.recursos]
+    liberacion = (np.zeros(lote.n) if liberaciones is None
+                  else np.asarray(liberaciones, dtype=np.float64)[lote.unidad])
+
+    generar = _sgs_serie if esquema == 'serie' else _sgs_paralelo
+    inicio, fin, maquina = generar(lote.n, lote.preds, lote.succs, lote.duracion, lote.recurso, capacidad,
+                                   lote.prioridad, liberacion)
+    if mejorar and lote.n:
+        ini_m, fin_m, maq_m = _justificar(lote, capacidad, inicio, fin, liberacion, max_iter_mejora)
+        if maq_m is not None:
+            inicio, fin, maquina = ini_m, fin_m, maq_m
+    return ResultadoRCPSP(lote, secuencia, inicio, fin, maquina, regla, esquema)
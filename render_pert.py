@@ -0,0 +1,240 @@
+# Dibujo de la red PERT con niveles de detalle
+# Arma la fuente DOT de la red completa o de vistas reducidas: agrupada por
+# Componente o Recurso, sólo la ruta crítica o el vecindario de un nodo. El
+# trazado ortogonal y las etiquetas tipo ficha se usan sólo en redes chicas.
+# Las exportaciones PNG/SVG se generan bajo pedido en hilos de fondo (graphviz
+# corre como subproceso) y se guardan en la caché por huella de la fuente.
+#
+# graphviz se importa recién al armar la fuente o exportar: quien sólo usa las
+# vistas (VISTAS, límites de tamaño) no lo carga.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cache_analisis import huella
+from motor_cpm import leer_columna
+
+VISTAS = {
+    'completa': "Red completa",
+    'componente': "Agrupada por componente",
+    'recurso': "Agrupada por recurso",
+    'critica': "Sólo ruta crítica",
+    'vecindario': "Vecindario de una actividad",
+}
+MAX_NODOS_ORTHO = 60       # splines ortogonales por encima de esto se vuelven inmanejables
+MAX_NODOS_DETALLE = 200    # etiquetas con ES/EF/LS/LF sólo hasta este tamaño
+MAX_NODOS_EN_PAGINA = 500  # más nodos no se dibujan en el navegador; sólo exportación
+HILOS_EXPORTACION = 2
+
+
+def _escapar(texto):
+    """Escapa los caracteres especiales de las etiquetas record de DOT"""
+    texto = str(texto)
+    for c in '\\{}|<>"':
+        texto = texto.replace(c, '\\' + c)
+    return texto
+
+
+class VistaRed:
+    """Nodos y aristas a dibujar; cada nodo es una actividad o un grupo de actividades"""
+
+    def __init__(self, nodos, aristas, agrupada):
+        self.nodos = nodos        # lista de dicts: clave, titulo, duracion, critica, es, ef, ls, lf
+        self.aristas = aristas    # lista de (origen, destino, critica, cantidad)
+        self.agrupada = agrupada
+
+    @property
+    def n_nodos(self):
+        return len(self.nodos)
+
+
+def _nodos_actividad(cpm, descripciones, indices):
+    return [{'clave': cpm.red.ids[i], 'titulo': f"{cpm.red.ids[i]}: {descripciones.get(cpm.red.ids[i], '')}",
+             'duracion': cpm.duraciones[i], 'critica': bool(cpm.critica[i]),
+             'es': cpm.es[i], 'ef': cpm.ef[i], 'ls': cpm.ls[i], 'lf': cpm.lf[i]} for i in indices]
+
+
+def _aristas_entre(cpm, incluidos):
+    red = cpm.red
+    origen, destino = red.origen, red.destino
+    mascara = incluidos[origen] & incluidos[destino]
+    return [(red.ids[u], red.ids[v], bool(cpm.critica[u] and cpm.critica[v]), 1)
+            for u, v in zip(origen[mascara], destino[mascara])]
+
+
+def vista_red(cpm, receta, vista='completa', nodo=None, radio=1):
+    """VistaRed del ResultadoCPM según el nivel de detalle elegido"""
+    red = cpm.red
+    descripciones = dict(zip(red.ids, leer_columna(receta, 'Actividad', '')))
+    if vista == 'completa':
+        return VistaRed(_nodos_actividad(cpm, descripciones, range(red.n)),
+                        _aristas_entre(cpm, np.ones(red.n, dtype=bool)), False)
+    if vista == 'critica':
+        incluidos = np.asarray(cpm.critica, dtype=bool)
+        return VistaRed(_nodos_actividad(cpm, descripciones, np.flatnonzero(incluidos)),
+                        _aristas_entre(cpm, incluidos), False)
+    if vista == 'vecindario':
+        if nodo not in red.indice:
+            raise ValueError(f"Actividad desconocida: {nodo}")
+        incluidos = np.zeros(red.n, dtype=bool)
+        frontera = np.array([red.indice[nodo]])
+        incluidos[frontera] = True
+        for _ in range(radio):
+            if frontera.size == 0:
+                # El vecindario se agotó antes de `radio` saltos
+                break
+            vecinos = np.concatenate([np.concatenate((red.predecesores(i), red.sucesores(i))) for i in frontera])
+            frontera = np.unique(vecinos[~incluidos[vecinos]]) if vecinos.size else vecinos
+            incluidos[frontera] = True
+        return VistaRed(_nodos_actividad(cpm, descripciones, np.flatnonzero(incluidos)),
+                        _aristas_entre(cpm, incluidos), False)
+    if vista in ('componente', 'recurso'):
+        return _vista_agrupada(cpm, leer_columna(receta, vista.capitalize(), ''))
+    raise ValueError(f"Vista desconocida: {vista}")
+
+
+def _vista_agrupada(cpm, etiquetas):
+    """Un nodo por grupo (suma de duraciones, ventana ES..LF) y una arista por par de grupos conectados"""
+    red = cpm.red
+    nombres, grupo = np.unique(np.array(['(sin asignar)' if e is None or e != e or e == '' else str(e)
+                                         for e in etiquetas], dtype=object), return_inverse=True)
+    k = len(nombres)
+    duracion = np.bincount(grupo, weights=np.nan_to_num(cpm.duraciones), minlength=k)
+    cantidad = np.bincount(grupo, minlength=k)
+    criticas = np.bincount(grupo, weights=np.asarray(cpm.critica, dtype=np.float64), minlength=k)
+    es = np.full(k, np.inf)
+    lf = np.full(k, -np.inf)
+    np.minimum.at(es, grupo, cpm.es)
+    np.maximum.at(lf, grupo, cpm.lf)
+    nodos = [{'clave': f"g{j}", 'titulo': f"{nombres[j]} ({cantidad[j]} act.)", 'duracion': duracion[j],
+              'critica': criticas[j] > 0, 'es': es[j], 'ef': None, 'ls': None, 'lf': lf[j]} for j in range(k)]
+
+    gu, gv = grupo[red.origen], grupo[red.destino]
+    distintos = gu != gv
+    critica = np.asarray(cpm.critica, dtype=bool)
+    arista_critica = critica[red.origen] & critica[red.destino]
+    pares, inversa, conteo = np.unique(np.stack((gu[distintos], gv[distintos]), axis=1), axis=0,
+                                       return_inverse=True, return_counts=True)
+    par_critico = np.zeros(len(pares), dtype=bool)
+    np.logical_or.at(par_critico, inversa.ravel(), arista_critica[distintos])
+    aristas = [(f"g{u}", f"g{v}", bool(c), int(n)) for (u, v), c, n in zip(pares, par_critico, conteo)]
+    return VistaRed(nodos, aristas, True)
+
+
+def fuente_dot(vista, rankdir='LR', cuello_botella=None):
+    """Fuente DOT de la vista; el estilo depende del tamaño de la red.
+
+    cuello_botella: clave del nodo a resaltar; en vistas agrupadas, por
+    defecto el grupo con más minutos.
+    """
+    n = vista.n_nodos
+    if cuello_botella is None and vista.agrupada and n:
+        cuello_botella = max(vista.nodos, key=lambda nodo: nodo['duracion'])['clave']
+    import graphviz
+
+    detalle = n <= MAX_NODOS_DETALLE
+    viz = graphviz.Digraph()
+    viz.attr(rankdir=rankdir, splines='ortho' if n <= MAX_NODOS_ORTHO else 'spline', nodesep='0.6')
+    viz.attr('node', shape='record' if detalle else 'box', style='filled', fontname='Arial', fontsize='10')
+    if not detalle:
+        viz.attr(outputorder='edgesfirst')
+
+    for nodo in vista.nodos:
+        color = '#ffcccc' if nodo['critica'] else '#f0f0f0'
+        if nodo['clave'] == cuello_botella:
+            color = '#ffe0b2'
+        if not detalle:
+            label = f"{nodo['titulo']}\\n{nodo['duracion']:.1f} min"
+        elif vista.agrupada:
+            label = (f"{{ {_escapar(nodo['titulo'])} | {nodo['duracion']:.1f} min }} | "
+                     f"{{ ES: {nodo['es']:.1f} | LF: {nodo['lf']:.1f} }}")
+        else:
+            label = (f"{{ {_escapar(nodo['titulo'])} | {nodo['duracion']:.1f} min }} | "
+                     f"{{ ES: {nodo['es']:.1f} | EF: {nodo['ef']:.1f} }} | {{ LS: {nodo['ls']:.1f} | LF: {nodo['lf']:.1f} }}")
+        viz.node(nodo['clave'], label=label, fillcolor=color, penwidth='3.0' if nodo['critica'] else '1.0',
+                 color='red' if nodo['critica'] else 'black')
+
+    for u, v, critica, cantidad in vista.aristas:
+        extra = {'label': str(cantidad)} if cantidad > 1 else {}
+        viz.edge(u, v, color='red' if critica else 'gray', penwidth='2.0' if critica else '1.0', **extra)
+    return viz.source
+
+
+def fuente_pert(cpm, receta, vista='completa', rankdir='LR', nodo=None, radio=1):
+    """(fuente DOT, cantidad de nodos) de la vista; resalta la actividad más larga como cuello de botella"""
+    red_vista = vista_red(cpm, receta, vista, nodo, radio)
+    cuello_botella = None
+    if not red_vista.agrupada and cpm.red.n:
+        cuello_botella = cpm.red.ids[int(np.nanargmax(cpm.duraciones))]
+    return fuente_dot(red_vista, rankdir, cuello_botella), red_vista.n_nodos
+
+
+class ExportadorPert:
+    """Genera PNG/SVG en hilos de fondo, sin repetir trabajos en curso; resultados en la caché"""
+
+    def __init__(self, cache, hilos=HILOS_EXPORTACION):
+        self.cache = cache
+        self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="export-pert")
+        self._en_curso = {}
+        self._errores = {}
+        self._lock = threading.Lock()
+
+    def _clave(self, fuente, formato):
+        return f'pert_{formato}', huella(fuente)
+
+    def solicitar(self, fuente, formato):
+        """Encola la exportación si no está lista ni en curso"""
+        espacio, clave = self._clave(fuente, formato)
+        with self._lock:
+            if (espacio, clave) in self._en_curso or self.cache.obtener(espacio, clave) is not None:
+                return
+            self._errores.pop((espacio, clave), None)
+            self._en_curso[(espacio, clave)] = self._pool.submit(self._generar, fuente, formato, espacio, clave)
+
+    def _generar(self, fuente, formato, espacio, clave):
+        import graphviz
+
+        try:
+            self.cache.guardar(espacio, clave, graphviz.Source(fuente).pipe(format=formato))
+        except Exception as e:
+            with self._lock:
+                self._errores[(espacio, clave)] = e
+        finally:
+            with self._lock:
+                self._en_curso.pop((espacio, clave), None)
+
+    def estado(self, fuente, formato):
+        """('listo', bytes), ('pendiente', None), ('error', excepción) o (None, None) si no se pidió"""
+        espacio, clave = self._clave(fuente, formato)
+        datos = self.cache.obtener(espacio, clave)
+        if datos is not None:
+            return 'listo', datos
+        with self._lock:
+            if (espacio, clave) in self._en_curso:
+                return 'pendiente', None
+            if (espacio, clave) in self._errores:
+                return 'error', self._errores[(espacio, clave)]
+        return None, None
+
+    def esperar(self, fuente, formato, timeout=None):
+        """Bloquea hasta que termine la exportación en curso (útil para scripts y pruebas)"""
+        with self._lock:
+            futuro = self._en_curso.get(self._clave(fuente, formato))
+        if futuro is not None:
+            futuro.result(timeout)
+        return self.estado(fuente, formato)
+
+
+_exportador_compartido = None
+_lock_global = threading.Lock()
+
+
+def exportador_compartido(cache):
+    """Instancia única por proceso: todas las sesiones comparten hilos y trabajos en curso"""
+    global _exportador_compartido
+    with _lock_global:
+        if _exportador_compartido is None:
+            _exportador_compartido = ExportadorPert(cache)
+        return _exportador_compartido
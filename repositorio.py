@@ -0,0 +1,329 @@
+# Repositorio persistente de modelos, recetas y planes (SQLite en modo WAL)
+# Familias, factores de escala, actividades y plan semanal viven en un archivo
+# SQLite compartido por todas las sesiones del proceso. Las sesiones cargan
+# cada receta recién cuando la usan (AlmacenRecetas con origen) y al guardar
+# sólo se escriben las filas que cambiaron. Las consultas "modelos que usan un
+# recurso" y "actividades de un componente" se resuelven con índices.
+# Las recetas leídas se guardan decodificadas por huella y se comparten entre
+# sesiones: cada contenido distinto se lee y codifica una sola vez por proceso.
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from almacen_recetas import AlmacenRecetas, RecetaColumnar, Vocabulario
+from carga_recursos import MatrizCarga
+from motor_cpm import leer_columna
+
+# Ruta del archivo SQLite; vacío = sin persistencia (sólo memoria de la sesión)
+VARIABLE_RUTA = "PERT_DB"
+RUTA_DEFECTO = "pert_cpm.db"
+# Recetas decodificadas que se conservan para compartir entre sesiones
+MAX_RECETAS_COMPARTIDAS = 256
+
+# Columna de la receta -> columna de la tabla actividades
+COLUMNAS = {
+    'ID': 'id', 'Actividad': 'actividad', 'Duracion_Min': 'duracion_min', 'Predecesores': 'predecesores',
+    'Recurso': 'recurso', 'Componente': 'componente',
+    'Duracion_Opt': 'duracion_opt', 'Duracion_Prob': 'duracion_prob', 'Duracion_Pes': 'duracion_pes',
+    'Duracion_Crash': 'duracion_crash', 'Costo_Crash': 'costo_crash',
+}
+COLUMNAS_BASE = ('ID', 'Actividad', 'Duracion_Min', 'Predecesores', 'Recurso', 'Componente')
+COLUMNAS_NUMERICAS = ('Duracion_Min', 'Duracion_Opt', 'Duracion_Prob', 'Duracion_Pes', 'Duracion_Crash', 'Costo_Crash')
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS modelos (
+    modelo TEXT PRIMARY KEY,
+    familia TEXT,
+    factor_escala REAL,
+    orden INTEGER NOT NULL,
+    huella TEXT
+);
+CREATE TABLE IF NOT EXISTS actividades (
+    modelo TEXT NOT NULL REFERENCES modelos(modelo) ON DELETE CASCADE,
+    posicion INTEGER NOT NULL,
+    id TEXT,
+    actividad TEXT,
+    duracion_min REAL,
+    predecesores TEXT,
+    recurso TEXT,
+    componente TEXT,
+    duracion_opt REAL,
+    duracion_prob REAL,
+    duracion_pes REAL,
+    duracion_crash REAL,
+    costo_crash REAL,
+    PRIMARY KEY (modelo, posicion)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_actividades_recurso ON actividades(recurso, modelo);
+CREATE INDEX IF NOT EXISTS ix_actividades_componente ON actividades(componente, modelo);
+CREATE TABLE IF NOT EXISTS plan (
+    modelo TEXT NOT NULL REFERENCES modelos(modelo) ON DELETE CASCADE,
+    semana TEXT NOT NULL,
+    orden INTEGER NOT NULL,
+    cantidad REAL NOT NULL,
+    PRIMARY KEY (modelo, semana)
+) WITHOUT ROWID;
+"""
+
+
+def _valor(valor, numerico):
+    """Valor listo para SQLite: None para vacíos, float para duraciones"""
+    if valor is None or valor is pd.NA or (isinstance(valor, float) and valor != valor):
+        return None
+    if numerico:
+        try:
+            return float(valor)
+        except (TypeError, ValueError):
+            return None
+    return str(valor)
+
+
+def _filas(receta):
+    """Lista de tuplas (valores en el orden de COLUMNAS) por actividad"""
+    columnas = [leer_columna(receta, c) for c in COLUMNAS]
+    return [tuple(_valor(v, c in COLUMNAS_NUMERICAS) for c, v in zip(COLUMNAS, fila)) for fila in zip(*columnas)]
+
+
+class RepositorioRecetas:
+    """Acceso a la base SQLite; una conexión por hilo (Streamlit atiende cada sesión en su hilo)"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        self.vocabulario = Vocabulario()
+        self._recetas = OrderedDict()   # huella -> RecetaColumnar inmutable
+        self._lock_recetas = threading.Lock()
+        with self._conexion() as con:
+            con.executescript(ESQUEMA)
+            # Bases creadas antes de agregar columnas opcionales a las actividades
+            existentes = {fila[1] for fila in con.execute("PRAGMA table_info(actividades)")}
+            for columna in COLUMNAS.values():
+                if columna not in existentes:
+                    con.execute(f"ALTER TABLE actividades ADD COLUMN {columna} REAL")
+
+    def _conexion(self):
+        """Conexión del hilo actual; usada como contexto hace commit al salir o rollback si falla"""
+        con = getattr(self._local, 'conexion', None)
+        if con is None:
+            con = sqlite3.connect(self.ruta, timeout=30)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute("PRAGMA foreign_keys=ON")
+            self._local.conexion = con
+        return con
+
+    # --- Modelos y familias ---
+
+    def vacio(self):
+        return self._conexion().execute("SELECT COUNT(*) FROM modelos").fetchone()[0] == 0
+
+    def inicializar(self, familias, factores, receta_base, plan):
+        """Carga el catálogo por defecto si la base está vacía"""
+        if not self.vacio():
+            return False
+        for familia, modelos in familias.items():
+            for modelo in modelos:
+                factor = factores.get(modelo, 1.0)
+                escalada = [dict(a, Duracion_Min=round(a['Duracion_Min'] * factor, 1)) for a in receta_base]
+                self.guardar_receta(modelo, escalada, familia=familia, factor_escala=factor)
+        self.guardar_plan(plan)
+        return True
+
+    def modelos(self):
+        """Nombres de modelos en orden de alta"""
+        return [m for m, in self._conexion().execute("SELECT modelo FROM modelos ORDER BY orden")]
+
+    def familias(self):
+        """{modelo: familia} (None si no pertenece a ninguna)"""
+        return dict(self._conexion().execute("SELECT modelo, familia FROM modelos ORDER BY orden"))
+
+    def factores_escala(self):
+        return dict(self._conexion().execute(
+            "SELECT modelo, factor_escala FROM modelos WHERE factor_escala IS NOT NULL ORDER BY orden"))
+
+    def huellas(self):
+        """{modelo: huella del contenido de su receta}"""
+        return dict(self._conexion().execute("SELECT modelo, huella FROM modelos ORDER BY orden"))
+
+    def almacen(self):
+        """AlmacenRecetas de una sesión: conoce todos los modelos pero no carga ninguna receta"""
+        recetas = AlmacenRecetas(self.vocabulario_vigente(), origen=self)
+        recetas.registrar_pendientes(self.huellas())
+        return recetas
+
+    def eliminar_modelo(self, modelo):
+        with self._conexion() as con:
+            con.execute("DELETE FROM modelos WHERE modelo = ?", (modelo,))
+
+    def duplicar_modelo(self, origen, nuevo):
+        """Copia las actividades del origen dentro de la base, sin pasar por Python"""
+        with self._conexion() as con:
+            con.execute("INSERT INTO modelos (modelo, familia, factor_escala, orden, huella) "
+                        "SELECT ?, NULL, NULL, (SELECT COALESCE(MAX(orden), -1) + 1 FROM modelos), huella "
+                        "FROM modelos WHERE modelo = ?", (nuevo, origen))
+            con.execute(f"INSERT INTO actividades (modelo, posicion, {', '.join(COLUMNAS.values())}) "
+                        f"SELECT ?, posicion, {', '.join(COLUMNAS.values())} FROM actividades WHERE modelo = ?",
+                        (nuevo, origen))
+
+    # --- Recetas ---
+
+    def cargar_receta(self, modelo):
+        """DataFrame de la receta; las columnas opcionales sólo aparecen si tienen algún valor"""
+        filas = self._conexion().execute(
+            f"SELECT {', '.join(COLUMNAS.values())} FROM actividades WHERE modelo = ? ORDER BY posicion",
+            (modelo,)).fetchall()
+        receta = pd.DataFrame(filas, columns=list(COLUMNAS)).astype(
+            {c: np.float64 for c in COLUMNAS_NUMERICAS})
+        opcionales = [c for c in COLUMNAS if c not in COLUMNAS_BASE and receta[c].notna().any()]
+        return receta[list(COLUMNAS_BASE) + opcionales]
+
+    def vocabulario_vigente(self):
+        """Vocabulario de la generación actual; lleno, empieza otra y olvida las recetas compartidas"""
+        with self._lock_recetas:
+            if self.vocabulario.lleno():
+                self.vocabulario = Vocabulario()
+                self._recetas.clear()
+            return self.vocabulario
+
+    def receta_compartida(self, modelo, huella=None):
+        """RecetaColumnar del modelo; la misma instancia para todas las sesiones que leen ese contenido"""
+        with self._lock_recetas:
+            receta = self._recetas.get(huella)
+            if receta is not None:
+                self._recetas.move_to_end(huella)
+                return receta
+        return self._compartir(RecetaColumnar.desde_tabla(self.vocabulario_vigente(), self.cargar_receta(modelo)))
+
+    def _compartir(self, receta):
+        # La clave es la huella del contenido leído, no la pedida: otra sesión pudo editarlo entretanto
+        with self._lock_recetas:
+            receta = self._recetas.setdefault(receta.huella(), receta)
+            self._recetas.move_to_end(receta.huella())
+            while len(self._recetas) > MAX_RECETAS_COMPARTIDAS:
+                self._recetas.popitem(last=False)
+            return receta
+
+    def guardar_receta(self, modelo, receta, familia=None, factor_escala=None):
+        """Escribe sólo las actividades nuevas, modificadas o eliminadas; retorna cuántas filas cambió"""
+        nuevas = _filas(receta)
+        with self._conexion() as con:
+            con.execute("INSERT OR IGNORE INTO modelos (modelo, familia, factor_escala, orden) "
+                        "VALUES (?, ?, ?, (SELECT COALESCE(MAX(orden), -1) + 1 FROM modelos))",
+                        (modelo, familia, factor_escala))
+            actuales = con.execute(
+                f"SELECT posicion, {', '.join(COLUMNAS.values())} FROM actividades WHERE modelo = ?",
+                (modelo,)).fetchall()
+            actuales = {fila[0]: tuple(fila[1:]) for fila in actuales}
+            cambios = [(modelo, k) + fila for k, fila in enumerate(nuevas) if actuales.get(k) != fila]
+            sobrantes = [(modelo, k) for k in actuales if k >= len(nuevas)]
+            if cambios:
+                con.executemany(
+                    f"INSERT OR REPLACE INTO actividades (modelo, posicion, {', '.join(COLUMNAS.values())}) "
+                    f"VALUES ({', '.join('?' * (len(COLUMNAS) + 2))})", cambios)
+            if sobrantes:
+                con.executemany("DELETE FROM actividades WHERE modelo = ? AND posicion = ?", sobrantes)
+            sin_huella = con.execute("SELECT huella IS NULL FROM modelos WHERE modelo = ?", (modelo,)).fetchone()[0]
+            if cambios or sobrantes or sin_huella:
+                con.execute("UPDATE modelos SET huella = ? WHERE modelo = ?",
+                            (self._huella_guardada(modelo), modelo))
+        return len(cambios) + len(sobrantes)
+
+    def _huella_guardada(self, modelo):
+        # Misma huella que tendrá la receta al cargarla desde la base; queda lista para compartir
+        return self._compartir(RecetaColumnar.desde_tabla(self.vocabulario_vigente(),
+                                                          self.cargar_receta(modelo))).huella()
+
+    # --- Plan semanal ---
+
+    def cargar_plan(self):
+        """Plan en formato ancho (Modelo + una columna por semana, en orden)"""
+        filas = self._conexion().execute(
+            "SELECT p.modelo, p.semana, p.orden, p.cantidad FROM plan p JOIN modelos m USING (modelo) "
+            "ORDER BY m.orden, p.orden").fetchall()
+        largo = pd.DataFrame(filas, columns=['Modelo', 'Semana', 'Orden', 'Cantidad'])
+        semanas = largo.drop_duplicates('Semana').sort_values('Orden', kind='stable')['Semana'].tolist()
+        plan = largo.pivot(index='Modelo', columns='Semana', values='Cantidad')
+        plan = plan.reindex(index=largo['Modelo'].unique(), columns=semanas).fillna(0)
+        plan = plan.astype(np.int64).rename_axis(index=None, columns=None).reset_index(names='Modelo')
+        return plan
+
+    def guardar_plan(self, plan):
+        """Reemplaza el plan escribiendo sólo las celdas que cambiaron; ignora modelos sin receta"""
+        semanas = [c for c in plan.columns if c != 'Modelo']
+        conocidos = set(self.modelos())
+        nuevas = {}
+        for modelo, valores in zip(plan['Modelo'], plan[semanas].to_numpy(dtype=np.float64, na_value=0.0)):
+            if modelo in conocidos:
+                for orden, (semana, cantidad) in enumerate(zip(semanas, valores)):
+                    nuevas[(modelo, str(semana))] = (orden, float(cantidad))
+        with self._conexion() as con:
+            actuales = {(m, s): (o, c) for m, s, o, c in
+                        con.execute("SELECT modelo, semana, orden, cantidad FROM plan")}
+            cambios = [(m, s, o, c) for (m, s), (o, c) in nuevas.items() if actuales.get((m, s)) != (o, c)]
+            sobrantes = [clave for clave in actuales if clave not in nuevas]
+            if cambios:
+                con.executemany("INSERT OR REPLACE INTO plan (modelo, semana, orden, cantidad) VALUES (?, ?, ?, ?)",
+                                cambios)
+            if sobrantes:
+                con.executemany("DELETE FROM plan WHERE modelo = ? AND semana = ?", sobrantes)
+        return len(cambios) + len(sobrantes)
+
+    # --- Consultas del catálogo ---
+
+    def modelos_por_recurso(self, recurso):
+        """Modelos con alguna actividad en el recurso"""
+        return [m for m, in self._conexion().execute(
+            "SELECT DISTINCT a.modelo FROM actividades a JOIN modelos m USING (modelo) "
+            "WHERE a.recurso = ? ORDER BY m.orden", (recurso,))]
+
+    def actividades_por_componente(self, componente):
+        """Actividades de todos los modelos que trabajan sobre el componente"""
+        filas = self._conexion().execute(
+            "SELECT a.modelo, a.id, a.actividad, a.recurso, a.duracion_min "
+            "FROM actividades a JOIN modelos m USING (modelo) "
+            "WHERE a.componente = ? ORDER BY m.orden, a.posicion", (componente,)).fetchall()
+        return pd.DataFrame(filas, columns=['Modelo', 'ID', 'Actividad', 'Recurso', 'Duracion_Min'])
+
+    def recursos(self):
+        return [r for r, in self._conexion().execute(
+            "SELECT DISTINCT recurso FROM actividades WHERE recurso IS NOT NULL ORDER BY recurso")]
+
+    def componentes(self):
+        return [c for c, in self._conexion().execute(
+            "SELECT DISTINCT componente FROM actividades WHERE componente IS NOT NULL ORDER BY componente")]
+
+    def matriz_carga(self):
+        """MatrizCarga de todos los modelos agregada en SQL, sin cargar las recetas"""
+        modelos = self.modelos()
+        filas = self._conexion().execute(
+            "SELECT a.modelo, a.recurso, SUM(COALESCE(a.duracion_min, 0)), MIN(m.orden), MIN(a.posicion) "
+            "FROM actividades a JOIN modelos m USING (modelo) GROUP BY a.modelo, a.recurso").fetchall()
+        # Recursos en orden de primera aparición, como matriz_modelo_recurso
+        recursos = list(dict.fromkeys(r for _, r, _, _, _ in sorted(filas, key=lambda f: (f[3], f[4]))))
+        indice_modelo = {m: i for i, m in enumerate(modelos)}
+        indice_recurso = {r: j for j, r in enumerate(recursos)}
+        minutos = np.zeros((len(modelos), len(recursos)))
+        for modelo, recurso, total, _, _ in filas:
+            minutos[indice_modelo[modelo], indice_recurso[recurso]] = total
+        return MatrizCarga(modelos, recursos, minutos)
+
+
+_repositorio_compartido = None
+_lock_global = threading.Lock()
+
+
+def repositorio_compartido():
+    """Instancia única por proceso; None si la persistencia está desactivada (PERT_DB vacío)"""
+    global _repositorio_compartido
+    ruta = os.environ.get(VARIABLE_RUTA, RUTA_DEFECTO)
+    if not ruta:
+        return None
+    with _lock_global:
+        if _repositorio_compartido is None:
+            _repositorio_compartido = RepositorioRecetas(ruta)
+        return _repositorio_compartido
@@ -0,0 +1,200 @@
+# Servicio de cómputo compartido por todas las sesiones
+# Los cálculos pesados (CPM de todo el catálogo, carga semanal, perfiles,
+# simulaciones, RCPSP) se envían a un único pool de procesos por instancia de
+# la app, fuera del hilo de cada sesión y sin competir por el GIL. Pedidos
+# idénticos en curso se unifican (la clave es la huella del contenido) y los
+# resultados quedan en la caché de análisis, donde los ve cualquier sesión.
+# Un cálculo que falló no se reintenta mientras su error siga registrado: la
+# clave ya cambia con las entradas, y el error sólo se descarta a pedido.
+# Se guarda sin traceback y cada consulta entrega una copia: relanzar siempre
+# el mismo objeto le encadenaría los frames de cada rerun y nunca se liberarían.
+
+import copy
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Procesos del pool; vacío o sin definir = uno por CPU, 0 = calcular en el hilo de la sesión
+VARIABLE_PROCESOS = "PERT_PROCESOS"
+# Segundos que una sesión espera antes de mostrar el progreso en lugar del resultado
+ESPERA_SINCRONA = 0.5
+# Errores recordados (los más viejos se descartan primero)
+MAX_ERRORES = 256
+
+# Distingue "no está en la caché" de un resultado que vale None
+_FALTANTE = object()
+
+
+def _sin_traceback(error):
+    """Excepción sin traceback ni excepciones encadenadas (que retendrían frames)"""
+    error.__traceback__ = None
+    error.__context__ = error.__cause__ = None
+    return error
+
+
+def _copia_error(error):
+    """Copia nueva de un error registrado, para relanzarla sin tocar el original"""
+    try:
+        return _sin_traceback(copy.copy(error))
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+@contextmanager
+def _principal_neutro():
+    """Mientras se lanzan procesos hijos, __main__ apunta a este módulo.
+
+    Streamlit registra el script de la app como __main__; con 'spawn' cada hijo
+    lo volvería a ejecutar completo al arrancar.
+    """
+    principal = sys.modules.get('__main__')
+    sys.modules['__main__'] = sys.modules[__name__]
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = principal
+
+
+class ServicioComputo:
+    """Pool de procesos con unificación de pedidos en curso; resultados en la caché"""
+
+    def __init__(self, cache, procesos=None):
+        self.cache = cache
+        self.procesos = (os.cpu_count() or 1) if procesos is None else procesos
+        self._pool = None
+        self._en_curso = {}    # (espacio, clave) -> (instante de envío, evento de término)
+        self._errores = OrderedDict()   # (espacio, clave) -> excepción del último intento, sin traceback
+        self._lock = threading.Lock()
+
+    def _en_cache(self, espacio, clave):
+        return self.cache.obtener(espacio, clave, _FALTANTE) is not _FALTANTE
+
+    def _registrar_error(self, llave, error):
+        with self._lock:
+            self._errores[llave] = _sin_traceback(error)
+            self._errores.move_to_end(llave)
+            while len(self._errores) > MAX_ERRORES:
+                self._errores.popitem(last=False)
+
+    def _obtener_pool(self):
+        # 'spawn': los hijos no heredan los hilos del servidor de Streamlit
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.procesos,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def _resuelto(self, llave):
+        # Con el lock tomado: en la caché, en curso o con error registrado
+        return llave in self._en_curso or llave in self._errores or self._en_cache(*llave)
+
+    def solicitar(self, espacio, clave, funcion, *args, preparar=None):
+        """Encola funcion(*args) si el resultado no está en la caché, en curso ni con error registrado.
+
+        funcion y args deben poder enviarse a otro proceso (funciones de módulo,
+        DataFrames, arreglos); con procesos=0 se calcula aquí mismo. Con
+        preparar, los argumentos son preparar() y sólo se arman si hay que
+        calcular (p. ej. recetas que habría que leer del repositorio).
+        """
+        llave = (espacio, clave)
+        if preparar is not None:
+            with self._lock:
+                if self._resuelto(llave):
+                    return
+            args = tuple(preparar())
+        with self._lock:
+            if self._resuelto(llave):
+                return
+            if self.procesos <= 0:
+                futuro = None
+            else:
+                # El pool lanza los hijos a medida que recibe trabajos
+                with _principal_neutro():
+                    try:
+                        futuro = self._obtener_pool().submit(funcion, *args)
+                    except BrokenProcessPool:
+                        # Un hijo murió: se descarta el pool y se crea uno nuevo
+                        self._pool = None
+                        futuro = self._obtener_pool().submit(funcion, *args)
+                self._en_curso[llave] = (time.monotonic(), threading.Event())
+        if futuro is None:
+            try:
+                self.cache.guardar(espacio, clave, funcion(*args))
+            except Exception as e:
+                self._registrar_error(llave, e)
+        else:
+            futuro.add_done_callback(lambda f: self._terminar(llave, f))
+
+    def _terminar(self, llave, futuro):
+        try:
+            self.cache.guardar(*llave, futuro.result())
+        except BrokenProcessPool:
+            # Falla del pool, no del cálculo: el próximo pedido lo reintenta
+            pass
+        except Exception as e:
+            self._registrar_error(llave, e)
+        finally:
+            with self._lock:
+                _, terminado = self._en_curso.pop(llave)
+            terminado.set()
+
+    def estado(self, espacio, clave):
+        """('listo', valor), ('pendiente', segundos en curso), ('error', copia de la excepción) o (None, None)"""
+        valor = self.cache.obtener(espacio, clave, _FALTANTE)
+        if valor is not _FALTANTE:
+            return 'listo', valor
+        llave = (espacio, clave)
+        with self._lock:
+            if llave in self._en_curso:
+                return 'pendiente', time.monotonic() - self._en_curso[llave][0]
+            if llave in self._errores:
+                return 'error', _copia_error(self._errores[llave])
+        return None, None
+
+    def esperar(self, espacio, clave, timeout=None):
+        """Bloquea hasta que termine el pedido en curso o venza el timeout; retorna el estado"""
+        with self._lock:
+            en_curso = self._en_curso.get((espacio, clave))
+        if en_curso is not None:
+            en_curso[1].wait(timeout)
+        return self.estado(espacio, clave)
+
+    def resultado(self, espacio, clave, funcion, *args, espera=ESPERA_SINCRONA):
+        """Solicita el cálculo y espera hasta `espera` segundos (None = sin límite); retorna el estado"""
+        self.solicitar(espacio, clave, funcion, *args)
+        return self.esperar(espacio, clave, espera)
+
+    def calcular(self, espacio, clave, funcion, *args):
+        """Como memoizar, pero calculando en el pool: bloquea hasta tener el valor o relanza el error"""
+        estado, valor = self.resultado(espacio, clave, funcion, *args, espera=None)
+        if estado == 'error':
+            raise valor
+        return valor
+
+    def descartar_error(self, espacio, clave):
+        """Olvida el error registrado para que el próximo pedido vuelva a calcular"""
+        with self._lock:
+            return self._errores.pop((espacio, clave), None) is not None
+
+    def en_curso(self):
+        with self._lock:
+            return len(self._en_curso)
+
+
+_servicio_compartido = None
+_lock_global = threading.Lock()
+
+
+def servicio_compartido(cache):
+    """Instancia única por proceso: todas las sesiones comparten el pool y los pedidos en curso"""
+    global _servicio_compartido
+    with _lock_global:
+        if _servicio_compartido is None:
+            valor = os.environ.get(VARIABLE_PROCESOS)
+            _servicio_compartido = ServicioComputo(cache, int(valor) if valor else None)
+        return _servicio_compartido
@@ -0,0 +1,126 @@
+# Simulación Monte Carlo PERT
+# Muestrea duraciones a partir de estimaciones de tres puntos (optimista, más
+# probable, pesimista) en bloques NumPy y corre el CPM en lote sobre todas las
+# muestras. Las corridas grandes se reparten en un pool de procesos.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from motor_cpm import calcular_cpm_lote, compilar_receta, leer_columna, valor_numerico
+
+COLUMNAS_TRES_PUNTOS = ('Duracion_Opt', 'Duracion_Prob', 'Duracion_Pes')
+DISTRIBUCIONES = ('beta', 'triangular')
+PERCENTILES = (50, 80, 95)
+
+# Elementos (muestras x actividades) por bloque; acota la memoria de cada pasada
+ELEMENTOS_POR_BLOQUE = 2_000_000
+# A partir de cuántas iteraciones conviene pagar el arranque del pool de procesos
+UMBRAL_PARALELO = 200_000
+
+
+def estimaciones_tres_puntos(receta, variabilidad=0.0):
+    """Retorna arreglos (optimista, más probable, pesimista) por actividad.
+
+    Las columnas opcionales vacías se completan con Duracion_Min; si se indica
+    una variabilidad (fracción, p. ej. 0.2 = ±20%) se usa para abrir el rango
+    de las actividades que no tienen estimación propia.
+    """
+    base = np.array([valor_numerico(d) for d in leer_columna(receta, 'Duracion_Min')], dtype=np.float64)
+    opt, prob, pes = (np.array([valor_numerico(v) for v in leer_columna(receta, col)], dtype=np.float64)
+                      for col in COLUMNAS_TRES_PUNTOS)
+    prob = np.where(np.isnan(prob), base, prob)
+    opt = np.where(np.isnan(opt), prob * (1 - variabilidad), opt)
+    pes = np.where(np.isnan(pes), prob * (1 + variabilidad), pes)
+
+    if np.isnan(prob).any():
+        raise ValueError("Hay actividades sin duración")
+    invalidas = (opt > prob) | (prob > pes) | (opt < 0)
+    if invalidas.any():
+        ids = [str(i) for i, malo in zip(leer_columna(receta, 'ID'), invalidas) if malo]
+        raise ValueError(f"Se requiere 0 ≤ optimista ≤ más probable ≤ pesimista en: {', '.join(ids)}")
+    return opt, prob, pes
+
+
+def muestrear_duraciones(rng, opt, prob, pes, n, distribucion='beta'):
+    """Matriz (n, actividades) de duraciones muestreadas"""
+    rango = pes - opt
+    variable = rango > 0
+    muestras = np.broadcast_to(opt, (n, opt.size)).copy()
+    if not variable.any():
+        return muestras
+
+    a, m, b, r = opt[variable], prob[variable], pes[variable], rango[variable]
+    if distribucion == 'beta':
+        alfa = 1 + 4 * (m - a) / r
+        beta = 1 + 4 * (b - m) / r
+        muestras[:, variable] = a + r * rng.beta(alfa, beta, size=(n, a.size))
+    elif distribucion == 'triangular':
+        # Inversa de la CDF; admite moda en cualquiera de los extremos
+        u = rng.random((n, a.size))
+        corte = (m - a) / r
+        izquierda = a + np.sqrt(u * r * (m - a))
+        derecha = b - np.sqrt((1 - u) * r * (b - m))
+        muestras[:, variable] = np.where(u < corte, izquierda, derecha)
+    else:
+        raise ValueError(f"Distribución desconocida: {distribucion}")
+    return muestras
+
+
+def _simular_bloque(red, opt, prob, pes, n, distribucion, semilla):
+    """Corre n iteraciones; retorna (lead_times, conteo de veces crítica por actividad)"""
+    rng = np.random.default_rng(semilla)
+    d = muestrear_duraciones(rng, opt, prob, pes, n, distribucion)
+    lote = calcular_cpm_lote(red, d)
+    return lote.lead_times, lote.critica.sum(axis=0)
+
+
+def _simular_bloque_args(args):
+    return _simular_bloque(*args)
+
+
+class ResultadoMonteCarlo:
+    """Distribución de lead time e índice de criticidad por actividad"""
+
+    def __init__(self, ids, lead_times, conteo_criticas):
+        self.ids = ids
+        self.lead_times = lead_times
+        self.iteraciones = lead_times.size
+        self.indice_criticidad = conteo_criticas / max(self.iteraciones, 1)
+        self.media = float(lead_times.mean())
+        self.desviacion = float(lead_times.std())
+        self.percentiles = {f"P{p}": float(v)
+                            for p, v in zip(PERCENTILES, np.percentile(lead_times, PERCENTILES))}
+
+
+def simular_pert(receta, iteraciones=10_000, distribucion='beta', variabilidad=0.0,
+                 semilla=None, procesos=None):
+    """Simulación Monte Carlo del lead time de una receta.
+
+    procesos=None usa un pool de procesos sólo a partir de UMBRAL_PARALELO
+    iteraciones; procesos=1 fuerza la ejecución en el proceso actual.
+    """
+    if distribucion not in DISTRIBUCIONES:
+        raise ValueError(f"Distribución desconocida: {distribucion}")
+    if iteraciones < 1:
+        raise ValueError("Se requiere al menos una iteración")
+    red = compilar_receta(receta)
+    opt, prob, pes = estimaciones_tres_puntos(receta, variabilidad)
+
+    tamano = max(1, ELEMENTOS_POR_BLOQUE // max(red.n, 1))
+    bloques = [min(tamano, iteraciones - i) for i in range(0, iteraciones, tamano)]
+    semillas = np.random.SeedSequence(semilla).spawn(len(bloques))
+    tareas = [(red, opt, prob, pes, n, distribucion, s) for n, s in zip(bloques, semillas)]
+
+    if procesos is None:
+        procesos = (os.cpu_count() or 1) if iteraciones >= UMBRAL_PARALELO else 1
+    if procesos > 1 and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(tareas))) as pool:
+            parciales = list(pool.map(_simular_bloque_args, tareas))
+    else:
+        parciales = [_simular_bloque(*t) for t in tareas]
+
+    lead_times = np.concatenate([p[0] for p in parciales])
+    conteo = np.sum([p[1] for p in parciales], axis=0)
+    return ResultadoMonteCarlo(red.ids, lead_times, conteo)
@@ -0,0 +1,219 @@
+# Simulación de eventos discretos del taller con capacidad finita
+# Cada Recurso es un pool de máquinas idénticas; las actividades de cada unidad
+# respetan las precedencias de su receta y esperan en cola FIFO (por orden de
+# liberación) cuando el recurso está ocupado. El reloj avanza en minutos
+# hábiles; el calendario de turnos sólo se usa para convertir a tiempo real.
+
+import heapq
+
+import numpy as np
+
+from carga_recursos import columnas_semana
+from heijunka import secuencia_heijunka
+from motor_cpm import compilar_receta, leer_columna
+
+MINUTOS_DIA = 24 * 60
+
+
+class Turno:
+    """Calendario por período: días hábiles, horas por turno y cantidad de turnos.
+
+    El período es la semana (7 días de calendario); en planes diarios se usa
+    dias_sem=1 y dias_calendario=1.
+    """
+
+    def __init__(self, dias_sem=5, horas_dia=8.55, turnos=1, dias_calendario=7):
+        self.dias_sem = dias_sem
+        self.horas_dia = horas_dia
+        self.turnos = turnos
+        self.dias_calendario = dias_calendario
+
+    def huella_contenido(self):
+        """Campos del calendario, para que dos turnos iguales tengan la misma huella en la caché"""
+        return {'dias_sem': self.dias_sem, 'horas_dia': self.horas_dia, 'turnos': self.turnos,
+                'dias_calendario': self.dias_calendario}
+
+    @property
+    def minutos_dia(self):
+        # Turnos que suman más de 24 h se recortan al día completo
+        return min(self.horas_dia * self.turnos, 24) * 60
+
+    @property
+    def minutos_semana(self):
+        return self.dias_sem * self.minutos_dia
+
+    def a_calendario(self, minutos_habiles):
+        """Convierte minutos hábiles (desde el lunes 00:00 de la semana 1) a minutos de calendario"""
+        t = np.asarray(minutos_habiles, dtype=np.float64)
+        dia, dentro = np.divmod(t, self.minutos_dia)
+        semana, dia_sem = np.divmod(dia, self.dias_sem)
+        return semana * self.dias_calendario * MINUTOS_DIA + dia_sem * MINUTOS_DIA + dentro
+
+
+class _Plantilla:
+    """Receta compilada de un modelo: precedencias, recurso y duración por actividad"""
+
+    def __init__(self, receta, codigo_recurso):
+        red = compilar_receta(receta)
+        self.n = red.n
+        self.n_preds = np.diff(red.pred_ptr).astype(np.int32)
+        self.succ_ptr = red.succ_ptr
+        self.succ_idx = red.succ_idx
+        self.duraciones = np.nan_to_num(red.duraciones)
+        self.recursos = np.array([codigo_recurso[r] for r in leer_columna(receta, 'Recurso')], dtype=np.int32)
+        self.fuentes = np.flatnonzero(self.n_preds == 0)
+        # Prioridad dentro de la unidad: orden topológico
+        self.rango = np.empty(self.n, dtype=np.int32)
+        self.rango[red.orden] = np.arange(self.n, dtype=np.int32)
+
+
+class ResultadoPlanta:
+    """Métricas de la simulación"""
+
+    def __init__(self, turno, recursos, maquinas, secuencia, liberacion, fin, ocupado,
+                 area_cola, cola_max, wip_tiempos, wip_valores, horizonte):
+        self.turno = turno
+        self.recursos = recursos
+        self.secuencia = secuencia
+        self.liberacion = liberacion
+        self.fin = fin
+        self.horizonte = horizonte
+        completadas = ~np.isnan(fin)
+        self.completadas = int(completadas.sum())
+        self.lead_time = fin - liberacion
+        self.lead_time_calendario = turno.a_calendario(fin) - turno.a_calendario(liberacion)
+        duracion = max(horizonte, 1e-9)
+        self.utilizacion = ocupado / (duracion * maquinas)
+        self.cola_media = area_cola / duracion
+        self.cola_max = cola_max
+        self.wip_tiempos = wip_tiempos
+        self.wip_valores = wip_valores
+        intervalos = np.diff(np.append(wip_tiempos, horizonte))
+        self.wip_medio = float((wip_valores * intervalos).sum() / duracion) if wip_valores.size else 0.0
+        self.wip_max = int(wip_valores.max()) if wip_valores.size else 0
+        # Equipos terminados en cada período del turno (semana o día), desde el inicio de la simulación
+        periodos = (fin[completadas] // turno.minutos_semana).astype(np.int64)
+        self.throughput_periodo = np.bincount(periodos) if periodos.size else np.zeros(0, dtype=np.int64)
+
+
+def simular_planta(recetas, secuencia, turno=None, maquinas=None, liberaciones=None, wip_max=None):
+    """Simula la producción de la secuencia de modelos.
+
+    liberaciones: minuto hábil en que se libera cada unidad (por defecto todas en 0).
+    wip_max: límite CONWIP de unidades en proceso; una unidad espera a su
+    liberación y a que haya cupo.
+    """
+    turno = Turno() if turno is None else turno
+    if wip_max is not None and wip_max < 1:
+        raise ValueError("wip_max debe ser al menos 1")
+    maquinas = {} if maquinas is None else maquinas
+    n_unidades = len(secuencia)
+    liberacion_plan = (np.zeros(n_unidades) if liberaciones is None
+                       else np.asarray(liberaciones, dtype=np.float64))
+
+    codigo_recurso = {}
+    for modelo in dict.fromkeys(secuencia):
+        for recurso in leer_columna(recetas[modelo], 'Recurso'):
+            codigo_recurso.setdefault(recurso, len(codigo_recurso))
+    recursos = list(codigo_recurso)
+    plantillas = {m: _Plantilla(recetas[m], codigo_recurso) for m in dict.fromkeys(secuencia)}
+    capacidad = np.array([int(maquinas.get(r, 1)) for r in recursos], dtype=np.int64)
+    libres = capacidad.copy()
+
+    # Estado compacto: un contador de predecesores pendientes por (unidad, actividad)
+    unidades = [plantillas[m] for m in secuencia]
+    desplazamiento = np.zeros(n_unidades + 1, dtype=np.int64)
+    np.cumsum([p.n for p in unidades], out=desplazamiento[1:])
+    pendientes = np.concatenate([p.n_preds for p in unidades]) if unidades else np.zeros(0, np.int32)
+    restantes = np.array([p.n for p in unidades], dtype=np.int64)
+
+    colas = [[] for _ in recursos]
+    ocupado = np.zeros(len(recursos))
+    area_cola = np.zeros(len(recursos))
+    cola_max = np.zeros(len(recursos), dtype=np.int64)
+    ultimo_cambio = np.zeros(len(recursos))
+    liberacion = np.full(n_unidades, np.nan)
+    fin = np.full(n_unidades, np.nan)
+    wip_tiempos, wip_valores = [], []
+    wip = 0
+
+    eventos = []  # (tiempo, tipo, unidad, actividad); tipo 0 = fin de actividad, 1 = liberación
+    limite = n_unidades if wip_max is None else min(n_unidades, wip_max)
+    for u in range(limite):
+        heapq.heappush(eventos, (liberacion_plan[u], 1, u, -1))
+    siguiente = limite
+
+    def registrar_cola(r, t):
+        area_cola[r] += len(colas[r]) * (t - ultimo_cambio[r])
+        ultimo_cambio[r] = t
+
+    def encolar(u, a, t):
+        plantilla = unidades[u]
+        r = plantilla.recursos[a]
+        registrar_cola(r, t)
+        heapq.heappush(colas[r], (u, plantilla.rango[a], a))
+        cola_max[r] = max(cola_max[r], len(colas[r]))
+        iniciar(r, t)
+
+    def iniciar(r, t):
+        while libres[r] > 0 and colas[r]:
+            registrar_cola(r, t)
+            u, _, a = heapq.heappop(colas[r])
+            libres[r] -= 1
+            duracion = unidades[u].duraciones[a]
+            ocupado[r] += duracion
+            heapq.heappush(eventos, (t + duracion, 0, u, a))
+
+    t = 0.0
+    while eventos:
+        t, tipo, u, a = heapq.heappop(eventos)
+        plantilla = unidades[u]
+        if tipo == 1:
+            liberacion[u] = t
+            wip += 1
+            wip_tiempos.append(t)
+            wip_valores.append(wip)
+            for fuente in plantilla.fuentes:
+                encolar(u, fuente, t)
+            continue
+
+        r = plantilla.recursos[a]
+        libres[r] += 1
+        base = desplazamiento[u]
+        for s in plantilla.succ_idx[plantilla.succ_ptr[a]:plantilla.succ_ptr[a + 1]]:
+            pendientes[base + s] -= 1
+            if pendientes[base + s] == 0:
+                encolar(u, s, t)
+        restantes[u] -= 1
+        if restantes[u] == 0:
+            fin[u] = t
+            wip -= 1
+            wip_tiempos.append(t)
+            wip_valores.append(wip)
+            if siguiente < n_unidades:
+                heapq.heappush(eventos, (max(t, liberacion_plan[siguiente]), 1, siguiente, -1))
+                siguiente += 1
+        iniciar(r, t)
+
+    for r in range(len(recursos)):
+        registrar_cola(r, t)
+    return ResultadoPlanta(turno, recursos, capacidad, list(secuencia), liberacion, fin, ocupado,
+                           area_cola, cola_max, np.array(wip_tiempos), np.array(wip_valores), t)
+
+
+def secuencia_plan(plan, recetas, turno, semanas=None, contenido=None):
+    """Secuencia Heijunka de todas las semanas y minuto hábil de liberación de cada unidad.
+
+    Las unidades de cada semana se liberan espaciadas a takt dentro de la semana.
+    """
+    semanas = columnas_semana(plan) if semanas is None else list(semanas)
+    secuencia, liberaciones = [], []
+    for k, semana in enumerate(semanas):
+        demanda = {m: c for m, c in zip(plan['Modelo'], plan[semana]) if m in recetas}
+        orden = secuencia_heijunka(demanda, contenido)
+        if not orden:
+            continue
+        takt = turno.minutos_semana / len(orden)
+        secuencia.extend(orden)
+        liberaciones.extend(k * turno.minutos_semana + takt * np.arange(len(orden)))
+    return secuencia, np.asarray(liberaciones, dtype=np.float64)